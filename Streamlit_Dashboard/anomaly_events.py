@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from boto3.dynamodb.conditions import Key
+from aws_clients import get_table
+from history_cache import HISTORY_TIMEZONE, get_history_cache, parse_timestamps, to_utc
+
+# 서버 이상 탐지기(websockets/outlier_detector.py)가 기록하는 이벤트 테이블 (키: loadcel, timestamp)
+ANOMALY_TABLE = os.environ.get("DYNAMODB_ANOMALY_TABLE", "loadcell_anomaly")
+# 이 시간(초)이 지나면 다음 조회 때 새 이벤트를 가져옵니다
+ANOMALY_SYNC_INTERVAL_SECONDS = float(os.environ.get("ANOMALY_SYNC_INTERVAL_SECONDS", "60"))
+
+ANOMALY_COLUMNS = ["loadcel", "timestamp", "kind", "severity", "direction", "current_weight", "diff", "score"]
+_NUMERIC_COLUMNS = ["current_weight", "diff", "score"]
+
+class AnomalyEvents:
+    """loadcell_anomaly 이벤트를 폴대별 키 조건 쿼리로 가져와 모든 세션이 공유합니다.
+
+    HistoryCache처럼 폴대별 하이 워터 마크를 두고 sync_interval마다 그 이후의 이벤트만 가져옵니다.
+    (백필로 하이 워터 마크보다 이전 이벤트가 추가되면 서버를 다시 시작해야 반영됩니다)
+    """
+
+    def __init__(self, table_name=ANOMALY_TABLE, sync_interval=ANOMALY_SYNC_INTERVAL_SECONDS, table=None):
+        self.table_name = table_name
+        self.sync_interval = sync_interval
+        # 테스트/벤치마크에서는 쿼리가 가능한 객체를 직접 넘길 수 있습니다
+        self._table = table
+        self.lock = threading.Lock()
+        self.last_sync = 0.0
+        self.frame = pd.DataFrame(columns=ANOMALY_COLUMNS)
+        # 폴대별로 마지막으로 받은 이벤트의 timestamp
+        self.high_water = {}
+        self.stats = {"syncs": 0, "queries": 0, "items": 0, "errors": 0}
+
+    @property
+    def table(self):
+        return self._table if self._table is not None else get_table(self.table_name)
+
+    def _query_new(self, loadcel):
+        """하이 워터 마크 이후의 이벤트만 페이지를 따라 끝까지 가져옵니다."""
+        condition = Key("loadcel").eq(loadcel)
+        if loadcel in self.high_water:
+            condition = condition & Key("timestamp").gt(self.high_water[loadcel])
+        kwargs = {"KeyConditionExpression": condition}
+        items = []
+        while True:
+            response = self.table.query(**kwargs)
+            self.stats["queries"] += 1
+            items.extend(response.get("Items", []))
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return items
+            kwargs["ExclusiveStartKey"] = last_key
+
+    def sync(self, loadcels, force=False):
+        """sync_interval이 지났으면(force면 항상) 폴대별로 새 이벤트만 가져와 목록에 추가합니다.
+
+        실패하면 그때까지 받은 폴대의 이벤트만 추가하고 나머지는 다음 동기화에 다시 가져옵니다.
+        """
+        with self.lock:
+            if not force and time.monotonic() - self.last_sync < self.sync_interval:
+                return
+            self.last_sync = time.monotonic()
+            fetched = {}
+            try:
+                for loadcel in map(str, loadcels):
+                    items = self._query_new(loadcel)
+                    if items:
+                        fetched[loadcel] = items
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[이상 이벤트] 동기화 오류: {e}")
+            if fetched:
+                items = [item for loadcel_items in fetched.values() for item in loadcel_items]
+                self._append(items)
+                # 목록에 추가한 뒤에 하이 워터 마크를 옮깁니다
+                for loadcel, loadcel_items in fetched.items():
+                    self.high_water[loadcel] = max(str(item["timestamp"]) for item in loadcel_items)
+                self.stats["items"] += len(items)
+            self.stats["syncs"] += 1
+
+    def _append(self, items):
+        new = self._to_frame(items)
+        frame = pd.concat([self.frame, new], ignore_index=True) if len(self.frame) else new
+        self.frame = frame.drop_duplicates(["loadcel", "timestamp"], keep="last")
+
+    @staticmethod
+    def _to_frame(items):
+        if not items:
+            return pd.DataFrame(columns=ANOMALY_COLUMNS)
+        frame = pd.DataFrame(items).reindex(columns=ANOMALY_COLUMNS)
+        # DynamoDB 숫자(Decimal)는 float으로 바꿉니다
+        for column in _NUMERIC_COLUMNS:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype(float)
+        frame["loadcel"] = frame["loadcel"].astype(str)
+        frame["timestamp"] = parse_timestamps(frame["timestamp"])
+        return frame.dropna(subset=["timestamp"])
+
+    def load(self, start=None, end=None, loadcels=None):
+        """구간 [start, end)와 폴대의 이벤트 (폴대, 시간순)"""
+        frame = self.frame
+        if start is not None:
+            frame = frame[frame["timestamp"] >= to_utc(start)]
+        if end is not None:
+            frame = frame[frame["timestamp"] < to_utc(end)]
+        if loadcels is not None:
+            frame = frame[frame["loadcel"].isin([str(l) for l in loadcels])]
+        frame = frame.sort_values(["loadcel", "timestamp"], ignore_index=True)
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True).dt.tz_convert(HISTORY_TIMEZONE)
+        return frame
+
+    def format_stats(self):
+        return f"[이상 이벤트] {len(self.frame)}개, {self.stats}"
+
+@st.cache_resource
+def get_anomaly_events():
+    """서버 프로세스당 하나의 이상 이벤트 목록을 만들어 모든 세션이 공유합니다."""
+    return AnomalyEvents()
+
+def load_anomalies(start=None, end=None, loadcels=None):
+    """이벤트를 (주기가 지났으면) 다시 가져온 뒤 구간/폴대의 이상 이벤트 DataFrame을 반환합니다."""
+    events = get_anomaly_events()
+    # 이벤트가 있을 수 있는 폴대는 히스토리 캐시가 아는 폴대입니다
+    events.sync(sorted(get_history_cache().high_water))
+    return events.load(start, end, loadcels)
@@ -0,0 +1,58 @@
+import os
+import threading
+from functools import lru_cache
+import boto3
+from botocore.config import Config
+
+AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
+# 프로세스 전체에서 공유하는 HTTP 연결 풀 크기 (동시에 실행되는 세션 수보다 크게)
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "32"))
+# 재시도 횟수 (첫 시도 포함), standard 모드는 스로틀링/일시 오류에 지수 백오프를 적용합니다
+AWS_MAX_ATTEMPTS = int(os.environ.get("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.environ.get("AWS_CONNECT_TIMEOUT", "3"))
+AWS_READ_TIMEOUT = float(os.environ.get("AWS_READ_TIMEOUT", "10"))
+
+BOTO_CONFIG = Config(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    # 유휴 연결이 끊기지 않도록 TCP keep-alive를 켭니다 (재실행마다 새 TLS 연결을 맺지 않도록)
+    tcp_keepalive=True,
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": "standard"}
+)
+
+# boto3 세션/클라이언트 생성은 스레드 안전하지 않으므로 만들 때마다 잠급니다
+_create_lock = threading.RLock()
+# boto3 리소스(Table 포함)는 스레드 간에 공유하면 안 되므로 세션 스레드마다 따로 만듭니다
+_local = threading.local()
+_session = None
+
+def get_session():
+    """프로세스당 하나의 boto3 세션"""
+    global _session
+    with _create_lock:
+        if _session is None:
+            _session = boto3.session.Session(region_name=AWS_REGION)
+        return _session
+
+@lru_cache(maxsize=None)
+def get_client(service="dynamodb"):
+    """프로세스당 하나의 저수준 클라이언트 (스레드 간 공유 가능)"""
+    with _create_lock:
+        return get_session().client(service, config=BOTO_CONFIG)
+
+def get_resource(service="dynamodb"):
+    """스레드당 하나의 리소스. 모델 로딩에 수십 ms가 걸리므로 페이지 재실행마다 만들지 않습니다."""
+    resources = _local.__dict__.setdefault("resources", {})
+    if service not in resources:
+        with _create_lock:
+            resources[service] = get_session().resource(service, config=BOTO_CONFIG)
+    return resources[service]
+
+def get_table(name):
+    """스레드당 하나의 DynamoDB Table 핸들 (put_item/query/scan처럼 상태 없는 호출에만 사용합니다)"""
+    tables = _local.__dict__.setdefault("tables", {})
+    if name not in tables:
+        tables[name] = get_resource("dynamodb").Table(name)
+    return tables[name]
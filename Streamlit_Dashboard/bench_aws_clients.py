@@ -0,0 +1,70 @@
+# AWS 연결 생성 벤치마크
+# 페이지가 재실행될 때마다 boto3.resource('dynamodb')와 Table 3개를 새로 만들던 방식(이전)과
+# aws_clients.get_table()로 스레드당 한 번 만든 핸들을 재사용하는 방식(현재)의
+# 첫 실행(시작) 비용과 재실행당 비용을 비교합니다. 네트워크 호출은 하지 않습니다.
+#
+# 실행: python bench_aws_clients.py [재실행 횟수]
+
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "bench")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+import boto3
+
+import aws_clients
+from aws_clients import AWS_REGION, get_resource, get_table
+
+TABLES = ("pole_stat", "loadcell", "tare")
+
+def before():
+    dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
+    return [dynamodb.Table(name) for name in TABLES]
+
+def after():
+    return [get_table(name) for name in TABLES]
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    started = time.perf_counter()
+    after()
+    startup = time.perf_counter() - started
+    # 이전 방식은 첫 실행도 재실행과 같은 일을 합니다 (boto3 모델 로딩 캐시가 데워진 뒤 측정)
+    before()
+    old = timed(before, runs)
+    new = timed(after, runs)
+    print(f"재실행당 연결 생성 (중앙값, {runs}회)")
+    print(f"  이전: boto3.resource + Table {len(TABLES)}개   {old * 1000:8.2f}ms")
+    print(f"  현재: 캐시된 get_table        {new * 1000:8.4f}ms")
+    print(f"  현재 방식의 시작 비용 (스레드당 1회) {startup * 1000:.1f}ms")
+    print(f"  1초마다 재실행 시 분당 절약: {(old - new) * 60 * 1000:.0f}ms")
+
+    # 같은 스레드에서 같은 이름은 항상 같은 핸들, 같은 연결 풀을 씁니다
+    assert get_table("loadcell") is get_table("loadcell")
+    assert get_table("loadcell").meta.client is get_resource("dynamodb").meta.client
+    config = get_resource("dynamodb").meta.client.meta.config
+    assert config.max_pool_connections == aws_clients.AWS_MAX_POOL_CONNECTIONS
+    assert config.retries["mode"] == "standard"
+    # 다른 스레드는 자기 핸들을 따로 만듭니다 (boto3 리소스는 스레드 안전하지 않습니다)
+    other = []
+    thread = threading.Thread(target=lambda: other.append(get_table("loadcell")))
+    thread.start()
+    thread.join()
+    assert other[0] is not get_table("loadcell")
+    print("핸들 재사용 확인 완료")
+
+if __name__ == "__main__":
+    main()
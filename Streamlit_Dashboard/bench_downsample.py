@@ -0,0 +1,63 @@
+# 다운샘플 벤치마크
+# 1초 간격 무게 히스토리(수액 여러 팩을 연달아 투여하는 계단/톱니 모양 + 잡음 + 드문 스파이크)를
+# 10^6개 만들어 lttb / minmax / minmax_lttb의 실행 시간과 모양 보존(최솟값/최댓값, 스파이크)을 비교합니다.
+#
+# 실행: python bench_downsample.py [점 개수] [픽셀 폭]
+
+import sys
+import time
+import numpy as np
+
+from downsample import DownsampleCache, downsample, downsample_cached, downsample_cache
+
+def make_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2025-01-01T00:00:00", "ms")
+    timestamps = start + np.arange(n, dtype=np.int64) * 1000
+    # 500g 팩을 2g/분 속도로 투여하고 다 되면 새 팩으로 교체
+    seconds = np.arange(n)
+    weights = 500 - (seconds % 15000) * (2 / 60)
+    weights = weights + rng.normal(0, 1.5, n)
+    # 팩 교체/흔들림으로 생기는 짧은 스파이크
+    spikes = rng.choice(n, size=max(1, n // 50000), replace=False)
+    weights[spikes] += rng.choice([-300, 300], size=len(spikes))
+    return timestamps, weights.astype(np.float32), spikes
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    width_px = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    timestamps, weights, spikes = make_series(n)
+    print(f"{n:,}개 점 -> 픽셀 폭 {width_px}")
+
+    for method in ("lttb", "minmax", "minmax_lttb"):
+        seconds, (x, y) = timed(lambda: downsample(timestamps, weights, width_px, method))
+        kept_spikes = np.isin(timestamps[spikes], x).sum()
+        assert x[0] == timestamps[0] and x[-1] == timestamps[-1], "첫 점/마지막 점이 빠졌습니다"
+        assert np.all(np.diff(x.astype(np.int64)) > 0), "시간 순서가 깨졌습니다"
+        print(f"  {method:<12} {seconds * 1000:8.1f}ms  {len(x):5d}점  "
+              f"최솟값 {y.min():7.1f}/{weights.min():7.1f}  최댓값 {y.max():7.1f}/{weights.max():7.1f}  "
+              f"스파이크 {kept_spikes}/{len(spikes)}")
+
+    # 같은 (로드셀, 구간, 해상도, 버전)은 캐시에서 바로 반환됩니다
+    downsample_cache.entries.clear()
+    first, _ = timed(lambda: downsample_cached(("1", "all", 0), timestamps, weights, width_px), repeat=1)
+    cached, _ = timed(lambda: downsample_cached(("1", "all", 0), timestamps, weights, width_px))
+    print(f"  캐시 미스 {first * 1000:.1f}ms -> 캐시 적중 {cached * 1000:.3f}ms")
+
+    # LRU 캐시는 가장 오래 쓰지 않은 항목부터 버립니다
+    cache = DownsampleCache(max_entries=2)
+    for key in ("a", "b", "a", "c"):
+        cache.get(key, lambda key=key: key)
+    assert list(cache.entries) == ["a", "c"], cache.entries
+    print("LRU 캐시 확인 완료")
+
+if __name__ == "__main__":
+    main()
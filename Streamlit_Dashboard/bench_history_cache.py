@@ -0,0 +1,137 @@
+# loadcell_history 로컬 캐시 벤치마크
+# 메모리 안의 가상 DynamoDB 테이블(1MB 페이지 대신 항목 수로 페이지를 나눔)로
+# 전체 scan + 문자열 DataFrame 변환(이전)과 Parquet 캐시의 첫 동기화 / 증분 동기화 / 불러오기(현재)를 비교합니다.
+# 실제 환경에서는 이전 방식의 scan이 네트워크로 수개월치 항목을 받으므로 차이가 더 큽니다.
+#
+# 실행: python bench_history_cache.py [폴대 수] [일수]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+import pandas as pd
+
+from history_cache import HISTORY_COMPACT_FILES, HistoryCache
+
+PAGE_ITEMS = 2000
+
+class MemoryHistoryTable:
+    """(loadcel, timestamp) 키의 query와 scan만 흉내 내는 가상 테이블"""
+
+    def __init__(self):
+        self.items = {}
+
+    def put(self, item):
+        self.items.setdefault(item["loadcel"], []).append(item)
+
+    def _page(self, items, start, **kwargs):
+        page = items[start:start + PAGE_ITEMS]
+        response = {"Items": page}
+        if start + PAGE_ITEMS < len(items):
+            response["LastEvaluatedKey"] = start + PAGE_ITEMS
+        return response
+
+    def query(self, KeyConditionExpression, ExclusiveStartKey=0):
+        expression = KeyConditionExpression.get_expression()
+        if expression["operator"] == "AND":
+            loadcel = expression["values"][0].get_expression()["values"][1]
+            after = expression["values"][1].get_expression()["values"][1]
+        else:
+            loadcel, after = expression["values"][1], None
+        items = self.items.get(loadcel, [])
+        if after is not None:
+            items = items[bisect_right([item["timestamp"] for item in items], after):]
+        return self._page(items, ExclusiveStartKey)
+
+    def scan(self, ExclusiveStartKey=0, ProjectionExpression=None):
+        if ProjectionExpression:
+            return {"Items": [{"loadcel": loadcel} for loadcel in self.items]}
+        if not ExclusiveStartKey:
+            self.scanned = [item for items in self.items.values() for item in items]
+        return self._page(self.scanned, ExclusiveStartKey)
+
+def reading(loadcel, moment, weight):
+    return {"loadcel": str(loadcel), "timestamp": moment.isoformat(timespec="seconds") + "+09:00",
+            "current_weight_history": f"{weight:.1f}", "remaining_sec_history": "3600"}
+
+def old_get_history_df(table):
+    # 이전 페이지의 get_history_df (페이지를 끝까지 따라간다고 가정)
+    items, start = [], 0
+    while True:
+        response = table.scan(ExclusiveStartKey=start)
+        items.extend(response["Items"])
+        if "LastEvaluatedKey" not in response:
+            break
+        start = response["LastEvaluatedKey"]
+    df = pd.DataFrame(items)
+    df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
+    df['remaining_sec_history'] = pd.to_numeric(df['remaining_sec_history'], errors='coerce')
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+def main():
+    pole_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 14
+    table = MemoryHistoryTable()
+    start = datetime(2025, 1, 1)
+    minutes = days * 24 * 60
+    for pole in range(1, pole_count + 1):
+        for minute in range(minutes):
+            table.put(reading(pole, start + timedelta(minutes=minute), 1000 - (minute % 240) * 3))
+    total = pole_count * minutes
+    print(f"폴대 {pole_count}개 × {days}일 (1분 간격) = {total:,}개 항목")
+
+    root = tempfile.mkdtemp()
+    try:
+        seconds, old_df = timed(lambda: old_get_history_df(table))
+        print(f"  이전: 전체 scan + DataFrame 변환       {seconds * 1000:8.1f}ms")
+
+        cache = HistoryCache(root=root, sync_interval=0, table=table, loadcell_table=table)
+        seconds, added = timed(lambda: cache.sync(force=True))
+        assert added == total, added
+        print(f"  첫 동기화 (폴대별 query)              {seconds * 1000:8.1f}ms, 쿼리 {cache.stats['queries']}회")
+
+        # 1분 뒤 새 읽기가 들어오면 하이 워터 마크 이후만 가져옵니다
+        for pole in range(1, pole_count + 1):
+            table.put(reading(pole, start + timedelta(minutes=minutes), 500))
+        queries = cache.stats["queries"]
+        seconds, added = timed(lambda: cache.sync(force=True))
+        assert added == pole_count and cache.stats["queries"] - queries == pole_count
+        print(f"  증분 동기화 (새 항목 {added}개)             {seconds * 1000:8.1f}ms")
+
+        seconds, df = timed(cache.load)
+        assert len(df) == total + pole_count
+        assert df["timestamp"].max() == old_df["timestamp"].max() + pd.Timedelta(minutes=1)
+        assert df["current_weight_history"].sum() == old_df["current_weight_history"].sum() + 500 * pole_count
+        print(f"  불러오기 (전체, 디스크)                {seconds * 1000:8.1f}ms")
+        seconds, _ = timed(cache.load)
+        print(f"  불러오기 (전체, 같은 버전 재사용)      {seconds * 1000:8.1f}ms")
+        day = pd.Timestamp(start + timedelta(days=days // 2))
+        seconds, one = timed(lambda: cache.load(day, day + pd.Timedelta(days=1), ["1"]))
+        assert len(one) == 24 * 60, len(one)
+        print(f"  불러오기 (폴대 1개, 하루)              {seconds * 1000:8.1f}ms")
+
+        # 작은 증분이 반복돼도 파티션의 파일 수는 압축 기준을 넘지 않습니다
+        for minute in range(1, HISTORY_COMPACT_FILES * 3):
+            table.put(reading(1, start + timedelta(minutes=minutes + minute), 400))
+            cache.sync(force=True)
+        last_day = (start + timedelta(minutes=minutes)).strftime("%Y-%m-%d")
+        files = os.listdir(os.path.join(root, f"day={last_day}", "loadcel=1"))
+        assert len(files) <= HISTORY_COMPACT_FILES, files
+        assert len(cache.load(loadcels=["1"])) == minutes + HISTORY_COMPACT_FILES * 3
+        # 다시 시작해도 하이 워터 마크가 유지되어 새로 가져올 항목이 없습니다
+        assert HistoryCache(root=root, sync_interval=0, table=table, loadcell_table=table).sync(force=True) == 0
+        print(cache.format_stats())
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# 세션당 서버 CPU 벤치마크
+# 실시간 대시보드 페이지를 streamlit AppTest로 실행하여
+# 매초 페이지 전체를 다시 실행하던 방식(이전, st_autorefresh)과
+# 프래그먼트별 주기로 자기 영역만 다시 실행하는 방식(현재)의 분당 CPU 시간을 비교합니다.
+#
+# 한 번의 전체 실행 비용은 이전 방식의 1초 비용과 같고(프래그먼트도 전체 실행 안에서 함께 실행됨),
+# 현재 방식의 비용은 ui_common.fragment_stats에 기록된 프래그먼트별 실행 비용 × 분당 실행 횟수로 계산합니다.
+#
+# 실행: python bench_session_cpu.py [전체 실행 횟수] [로드셀 수]
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("WS_URL", "ws://127.0.0.1:9")
+
+from streamlit.testing.v1 import AppTest
+
+from ui_common import ALERT_REFRESH_SECONDS, CHART_REFRESH_SECONDS, METRICS_REFRESH_SECONDS, fragment_stats
+from loadcell_store import HISTORY_LENGTH
+from ws_ingest import get_ingest_service
+
+PAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "1_실시간 대시보드.py")
+
+def reading(loadcel, second):
+    timestamp = (datetime(2025, 1, 1, 9) + timedelta(seconds=second)).isoformat()
+    return {"loadcel": str(loadcel), "current_weight": str(800 - second * 0.07), "remaining_sec": "3600", "timestamp": timestamp}
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pole_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    store = get_ingest_service().store
+    second = 0
+    for second in range(HISTORY_LENGTH):
+        store.ingest([reading(i + 1, second) for i in range(pole_count)])
+
+    app = AppTest.from_file(PAGE_PATH, default_timeout=30)
+    app.run()  # 모듈 import 등 첫 실행 비용은 제외합니다
+    fragment_stats.clear()
+
+    full_cpu = 0.0
+    for _ in range(runs):
+        # 1초마다 모든 로드셀에서 새 읽기가 들어온다고 가정합니다
+        second += 1
+        store.ingest([reading(i + 1, second) for i in range(pole_count)])
+        started = time.process_time()
+        app.run()
+        full_cpu += time.process_time() - started
+    full_run_ms = full_cpu / runs * 1000
+
+    def per_run_ms(name):
+        stats = fragment_stats.get(name)
+        return stats["cpu_sec"] / stats["runs"] * 1000 if stats and stats["runs"] else 0.0
+
+    # 분당 실행 횟수
+    schedule = {
+        "metrics": 60 / METRICS_REFRESH_SECONDS,
+        "charts": 60 / CHART_REFRESH_SECONDS,
+        "alerts": 60 / ALERT_REFRESH_SECONDS,
+        "loadcell_ids": 60 / METRICS_REFRESH_SECONDS,
+    }
+    before_ms = full_run_ms * 60
+    after_ms = sum(per_run_ms(name) * count for name, count in schedule.items())
+
+    print(f"로드셀 {pole_count}개, 히스토리 {HISTORY_LENGTH}개, 전체 실행 {runs}회")
+    print(f"전체 페이지 실행 1회: {full_run_ms:.2f}ms")
+    for name, count in schedule.items():
+        print(f"  프래그먼트 {name:<12} 1회 {per_run_ms(name):7.2f}ms × 분당 {count:.0f}회")
+    print(f"이전 (매초 전체 실행): 세션당 분당 CPU {before_ms:.0f}ms")
+    print(f"현재 (프래그먼트 갱신): 세션당 분당 CPU {after_ms:.0f}ms ({before_ms / max(after_ms, 1e-9):.1f}배 감소)")
+
+if __name__ == "__main__":
+    main()
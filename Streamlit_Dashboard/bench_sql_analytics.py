@@ -0,0 +1,74 @@
+# 히스토리 캐시 SQL 질의 벤치마크
+# 구간의 원시 읽기를 DataFrame으로 모두 불러와 pandas로 계산하는 방식(이전)과
+# DuckDB로 Parquet 파티션에 직접 질의해 결과 행만 가져오는 방식(현재)을
+# 보고서 그래프 점과 CSV 내보내기용 원시 읽기에 대해 비교하고 두 결과가 같은지 확인합니다.
+#
+# 실행: python bench_sql_analytics.py [폴대 수] [일수]
+
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from bench_usage_cube import make_history
+from downsample import downsample_frame
+from history_cache import HistoryCache
+from sql_analytics import SqlAnalytics
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+def old_readings(df):
+    # 이전 페이지: 불러온 읽기에 폴대별 직전 무게/사용량/변화량/시간대를 pandas로 계산
+    rows = df.sort_values(["loadcel", "timestamp"], ignore_index=True)
+    rows["prev_weight"] = rows.groupby("loadcel")["current_weight_history"].shift(1)
+    change = rows["prev_weight"] - rows["current_weight_history"]
+    return rows.assign(usage=change.clip(lower=0) / 1000, diff=change.abs(), hour=rows["timestamp"].dt.hour)
+
+def main():
+    pole_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    history = make_history(pole_count, days)
+    print(f"폴대 {pole_count}개 × {days}일 (1분 간격) = {len(history):,}개 읽기")
+
+    root = tempfile.mkdtemp()
+    try:
+        cache = HistoryCache(root=root, sync_interval=0, table=object(), loadcell_table=object())
+        for loadcel, part in history.groupby("loadcel"):
+            cache._append(loadcel, part.assign(timestamp=part["timestamp"].astype(str), remaining_sec_history=3600))
+        engine = SqlAnalytics(root)
+        start, end = pd.Timestamp("2025-01-08"), pd.Timestamp("2025-01-22")
+        poles = [str(p) for p in range(1, pole_count + 1, 2)]
+
+        def old():
+            rows = old_readings(cache._read(start, end, poles))
+            graph = downsample_frame(rows, "timestamp", "current_weight_history", "loadcel")
+            return rows, graph
+
+        def new():
+            return engine.graph(start, end, poles)
+
+        engine.graph(start, end, poles)
+        old_seconds, (rows, old_graph) = timed(old)
+        new_seconds, graph = timed(new)
+        # CSV 내보내기용 원시 읽기도 pandas 계산과 같습니다 (폴대 첫 읽기의 사용량은 SQL에서 0, pandas에서 NaN)
+        readings = engine.readings(start, end, poles)
+        assert readings["timestamp"].tolist() == rows["timestamp"].tolist()
+        for column in ("usage", "diff", "hour"):
+            assert np.allclose(readings[column].fillna(0).to_numpy(dtype=float), rows[column].fillna(0).to_numpy(dtype=float)), column
+        # 그래프는 구간별 최솟값/최댓값을 남기므로 폴대별 최솟값/최댓값이 원시 읽기와 같습니다
+        extremes = lambda df: df.groupby("loadcel")["current_weight_history"].agg(["min", "max"])
+        assert extremes(graph).equals(extremes(rows))
+        assert len(graph) <= 2 * len(old_graph), (len(graph), len(old_graph))
+        print(f"  폴대 {len(poles)}개 × 14일 구간")
+        print(f"  이전 (불러오기 + pandas)  {old_seconds * 1000:8.1f}ms, DataFrame {len(rows):,}행")
+        print(f"  현재 (DuckDB 질의)         {new_seconds * 1000:8.1f}ms, 그래프 점 {len(graph):,}개")
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# 사용량 롤업 벤치마크
+# 1분 간격 읽기로 통계 페이지의 카드/히트맵/랭킹과 보고서 페이지의 기간 목록/장비별 통계를
+# 원시 읽기에서 다시 계산하는 방식(이전)과 (폴대, 시간) 버킷 롤업에서 계산하는 방식(현재)으로 비교하고,
+# 두 결과가 같은지 확인합니다.
+#
+# 실행: python bench_usage_cube.py [폴대 수] [일수]
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from usage_cube import UsageCube
+
+def make_history(pole_count, days, seed=0):
+    rng = np.random.default_rng(seed)
+    minutes = days * 24 * 60
+    start = pd.Timestamp("2025-01-01", tz="Asia/Seoul")
+    frames = []
+    for pole in range(1, pole_count + 1):
+        # 4시간마다 수액팩을 교체하며 분당 1~3g씩 투여합니다
+        used = np.cumsum(rng.uniform(1, 3, minutes))
+        weights = 1000 - (used % 700)
+        frames.append(pd.DataFrame({
+            "loadcel": str(pole),
+            "timestamp": start + pd.to_timedelta(np.arange(minutes), unit="min"),
+            "current_weight_history": weights.round(1),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def raw_usage(df):
+    # 이전 통계 페이지의 사용량 계산
+    df = df.sort_values('timestamp')
+    df['prev_weight'] = df.groupby('loadcel')['current_weight_history'].shift(1)
+    df['usage'] = (df['prev_weight'] - df['current_weight_history']).clip(lower=0) / 1000
+    return df
+
+def timed(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    pole_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    df = make_history(pole_count, days)
+    print(f"폴대 {pole_count}개 × {days}일 (1분 간격) = {len(df):,}개 읽기")
+
+    cube = UsageCube()
+    started = time.perf_counter()
+    # 읽기가 들어오는 대로 하루치씩 나눠 넣어도 결과는 한 번에 넣은 것과 같습니다
+    for _, day in df.groupby(df["timestamp"].dt.date):
+        for loadcel, part in day.groupby("loadcel"):
+            cube.add(loadcel, part["timestamp"], part["current_weight_history"])
+    print(f"  롤업 갱신 (하루 단위 증분) {(time.perf_counter() - started) * 1000:8.1f}ms, 버킷 {len(cube.buckets):,}개")
+    assert cube.add("1", df["timestamp"][:10], df["current_weight_history"][:10]) == 0, "같은 읽기를 두 번 셌습니다"
+    cube.frame()
+
+    week_start = pd.Timestamp("2025-01-13", tz="Asia/Seoul")
+    start, end = pd.Timestamp("2025-01-10"), pd.Timestamp("2025-01-20")
+
+    def old_stats_page():
+        usage = raw_usage(df)
+        week = usage[usage['timestamp'] >= week_start]['usage'].sum()
+        filtered = usage[(usage['timestamp'] >= start.tz_localize("Asia/Seoul")) & (usage['timestamp'] < end.tz_localize("Asia/Seoul"))]
+        filtered = raw_usage(filtered.drop(columns=['prev_weight', 'usage']))
+        filtered['hour'] = filtered['timestamp'].dt.hour
+        heatmap = filtered.groupby(['hour', 'loadcel'])['usage'].sum().unstack('loadcel', fill_value=0)
+        ranking = filtered.groupby('loadcel')['usage'].sum().sort_values(ascending=False)
+        return week, heatmap, ranking
+
+    def new_stats_page():
+        return (cube.usage_total(start=week_start) / 1000, cube.hour_of_day(start, end),
+                cube.ranking(start, end).set_index("loadcel")["usage"])
+
+    old_seconds, (old_week, old_heatmap, old_ranking) = timed(old_stats_page)
+    new_seconds, (new_week, new_heatmap, new_ranking) = timed(new_stats_page)
+    assert abs(old_week - new_week) < 1e-6, (old_week, new_week)
+    # 이전 방식은 구간의 첫 읽기에서 직전 값을 모르므로 구간 경계 한 번만큼 차이가 날 수 있습니다
+    assert np.allclose(old_heatmap.round(1).to_numpy(), new_heatmap.to_numpy(), atol=0.01)
+    assert np.allclose(old_ranking.round(1).sort_index(), new_ranking.sort_index(), atol=0.01)
+    print(f"  통계 페이지 (카드+히트맵+랭킹)  이전 {old_seconds * 1000:8.1f}ms  현재 {new_seconds * 1000:6.1f}ms")
+
+    def old_report_page():
+        periods = df['timestamp'].dt.strftime('%Y-%U')
+        period = sorted(periods.unique(), reverse=True)[1]
+        return period, df[periods == period].groupby('loadcel')['current_weight_history'].agg(['count', 'mean', 'min', 'max', 'sum'])
+
+    def new_report_page():
+        period = cube.periods("week")[1]
+        return period, cube.period_stats("week", period)
+
+    old_seconds, (old_period, old_table) = timed(old_report_page)
+    new_seconds, (new_period, new_table) = timed(new_report_page)
+    assert old_period == new_period and np.allclose(old_table.to_numpy(), new_table.to_numpy())
+    print(f"  보고서 (기간 목록+장비별 통계)  이전 {old_seconds * 1000:8.1f}ms  현재 {new_seconds * 1000:6.1f}ms")
+
+    totals = cube.totals("month")
+    assert abs(totals["usage"].sum() - raw_usage(df)["usage"].sum()) < 1e-6
+    print(cube.format_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# 그래프 한 개의 가로 픽셀 예산. 픽셀당 한 점 이상은 화면에서 구분되지 않습니다
+CHART_WIDTH_PX = int(os.environ.get("CHART_WIDTH_PX", "1200"))
+# 다운샘플 방식: minmax_lttb(기본, 최솟값/최댓값 보존) | lttb | minmax
+DOWNSAMPLE_METHOD = os.environ.get("DOWNSAMPLE_METHOD", "minmax_lttb")
+# minmax_lttb에서 LTTB 전에 최솟값/최댓값으로 미리 줄일 배수 (n_out × 배수개)
+MINMAX_PRESELECT_RATIO = 4
+# 다운샘플 결과 캐시 크기 (항목 수)
+DOWNSAMPLE_CACHE_SIZE = int(os.environ.get("DOWNSAMPLE_CACHE_SIZE", "256"))
+
+def _as_float(x):
+    """datetime64 / 정수 / 실수 배열을 면적 계산용 float64 배열로 바꿉니다."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ms]").astype(np.int64)
+    return x.astype(np.float64)
+
+def _column_values(column):
+    """DataFrame 열을 numpy 배열로 바꿉니다. 시간대가 있는 시각은 UTC datetime64로 바꿉니다 (순서와 간격은 같음)."""
+    if isinstance(column.dtype, pd.DatetimeTZDtype):
+        return column.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+    return column.to_numpy()
+
+def _bucket_edges(start, stop, n_buckets):
+    return np.linspace(start, stop, n_buckets + 1).astype(np.int64)
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets로 남길 점의 인덱스 (첫 점과 마지막 점 포함)
+
+    버킷 평균과 후보 점 좌표는 한 번에 배열로 계산하고, 이전 버킷에서 고른 점에만
+    의존하는 마지막 선택만 버킷 수만큼 반복합니다.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xf, yf = _as_float(x), np.asarray(y, dtype=np.float64)
+    # 첫 점과 마지막 점을 제외한 구간을 n_out - 2개 버킷으로 나눕니다
+    edges = _bucket_edges(1, n - 1, n_out - 2)
+    counts = np.diff(edges)
+    sums_x = np.add.reduceat(xf[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(yf[1:n - 1], edges[:-1] - 1)
+    # 다음 버킷 평균 (마지막 버킷의 다음은 마지막 점)
+    next_x = np.append(sums_x[1:] / counts[1:], xf[-1])
+    next_y = np.append(sums_y[1:] / counts[1:], yf[-1])
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    ax, ay = xf[0], yf[0]
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        bx, by = xf[lo:hi], yf[lo:hi]
+        cx, cy = next_x[bucket], next_y[bucket]
+        area = np.abs((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+        best = lo + int(area.argmax())
+        selected[bucket + 1] = best
+        ax, ay = xf[best], yf[best]
+    return selected
+
+def minmax_indices(x, y, n_out):
+    """n_out / 2개 버킷마다 최솟값과 최댓값 점을 남기는 인덱스 (시간순, 완전 벡터화)"""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    yf = np.asarray(y, dtype=np.float64)
+    n_buckets = (n_out - 2) // 2
+    edges = _bucket_edges(1, n - 1, n_buckets)
+    # 버킷 크기가 최대 1 차이 나므로 가장 큰 크기로 맞춰 2차원 배열로 만듭니다 (남는 칸은 마지막 값 반복)
+    width = int(np.diff(edges).max())
+    offsets = edges[:-1, None] + np.arange(width)[None, :]
+    offsets = np.minimum(offsets, (edges[1:] - 1)[:, None])
+    values = yf[offsets]
+    rows = np.arange(n_buckets)
+    mins = offsets[rows, values.argmin(axis=1)]
+    maxs = offsets[rows, values.argmax(axis=1)]
+    inner = np.sort(np.stack([mins, maxs], axis=1), axis=1).ravel()
+    return np.unique(np.concatenate(([0], inner, [n - 1])))
+
+def minmax_lttb_indices(x, y, n_out, ratio=MINMAX_PRESELECT_RATIO):
+    """MinMaxLTTB: 최솟값/최댓값으로 n_out × ratio개까지 줄인 뒤 LTTB를 적용합니다."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    preselected = minmax_indices(x, y, n_out * ratio)
+    if len(preselected) <= n_out:
+        return preselected
+    x = np.asarray(x)
+    y = np.asarray(y)
+    return preselected[lttb_indices(x[preselected], y[preselected], n_out)]
+
+_METHODS = {
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+    "minmax_lttb": minmax_lttb_indices,
+}
+
+def downsample(x, y, width_px=CHART_WIDTH_PX, method=DOWNSAMPLE_METHOD):
+    """가로 width_px 픽셀에 그릴 만큼만 (x, y)를 줄입니다. 이미 작으면 그대로 반환합니다."""
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x) <= width_px:
+        return x, y
+    indices = _METHODS[method](x, y, width_px)
+    return x[indices], y[indices]
+
+class DownsampleCache:
+    """(로드셀, 구간, 해상도, 데이터 버전) -> 다운샘플 결과 LRU 캐시 (모든 세션이 공유)"""
+
+    def __init__(self, max_entries=DOWNSAMPLE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        value = build()
+        with self.lock:
+            self.misses += 1
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return value
+
+downsample_cache = DownsampleCache()
+
+def downsample_cached(key, x, y, width_px=CHART_WIDTH_PX, method=DOWNSAMPLE_METHOD):
+    """key에는 (로드셀, 구간, 데이터 버전)처럼 x, y를 구분할 수 있는 값을 넣습니다."""
+    if len(x) <= width_px:
+        return np.asarray(x), np.asarray(y)
+    return downsample_cache.get((key, width_px, method), lambda: downsample(x, y, width_px, method))
+
+def downsample_frame(df, x_col, y_col, group_col=None, width_px=CHART_WIDTH_PX, method=DOWNSAMPLE_METHOD, cache_key=None):
+    """DataFrame을 group_col(예: loadcel)별로 다운샘플합니다. df는 x_col 기준으로 정렬되어 있어야 합니다.
+
+    cache_key(구간, 데이터 버전 등)를 주면 그룹별 결과를 downsample_cache에 보관합니다.
+    """
+    groups = [(None, df)] if group_col is None else df.groupby(group_col, sort=False)
+    parts = []
+    for group, part in groups:
+        if len(part) <= width_px:
+            parts.append(part)
+            continue
+        build = lambda part=part: _METHODS[method](_column_values(part[x_col]), part[y_col].to_numpy(), width_px)
+        if cache_key is None:
+            indices = build()
+        else:
+            indices = downsample_cache.get((cache_key, group, x_col, y_col, width_px, method), build)
+        parts.append(part.iloc[indices])
+    if not parts:
+        return df
+    return pd.concat(parts) if len(parts) > 1 else parts[0]
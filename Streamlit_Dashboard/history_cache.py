@@ -0,0 +1,298 @@
+import json
+import os
+import threading
+import time
+import uuid
+from urllib.parse import quote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import streamlit as st
+from boto3.dynamodb.conditions import Key
+from aws_clients import get_table
+from usage_cube import UsageCube
+
+# loadcell_history 로컬 캐시 위치 (day=YYYY-MM-DD/loadcel=ID/part-*.parquet)
+HISTORY_CACHE_DIR = os.environ.get("HISTORY_CACHE_DIR", "history_cache")
+HISTORY_TABLE = os.environ.get("DYNAMODB_HISTORY_TABLE", "loadcell_history")
+# 폴대 목록을 얻는 최신 상태 테이블 (폴대당 한 항목)
+LOADCELL_TABLE = os.environ.get("DYNAMODB_TABLE", "loadcell")
+# 이 시간(초)이 지나면 다음 조회 때 새 항목을 가져옵니다
+HISTORY_SYNC_INTERVAL_SECONDS = float(os.environ.get("HISTORY_SYNC_INTERVAL_SECONDS", "60"))
+# 한 파티션(일, 폴대)의 파일이 이 개수를 넘으면 하나로 합칩니다
+HISTORY_COMPACT_FILES = int(os.environ.get("HISTORY_COMPACT_FILES", "8"))
+# 시간대 정보가 없는 timestamp의 기준 시간대이자 일 단위 파티션/표시 시간대
+HISTORY_TIMEZONE = os.environ.get("HISTORY_TIMEZONE", "Asia/Seoul")
+
+_MANIFEST = "_sync_state.json"
+# (폴대, 시간)별 사용량 롤업 파일 (usage_cube.py)
+_USAGE_CUBE = "_usage_cube.parquet"
+_PARTITIONING = ds.partitioning(pa.schema([("day", pa.string()), ("loadcel", pa.string())]), flavor="hive")
+_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("ms", tz="UTC")),
+    ("current_weight_history", pa.float64()),
+    ("remaining_sec_history", pa.float64()),
+])
+# 캐시가 비어 있어도 같은 열로 읽을 수 있도록 파티션 열까지 포함한 스키마를 지정합니다
+_DATASET_SCHEMA = pa.schema(list(_SCHEMA) + [("day", pa.string()), ("loadcel", pa.string())])
+
+# load()가 반환하는 열과 타입 (읽기가 없어도 같은 타입의 빈 DataFrame을 반환합니다)
+_COLUMNS = {
+    "loadcel": "str",
+    "timestamp": pd.DatetimeTZDtype("ms", HISTORY_TIMEZONE),
+    "current_weight_history": "float64",
+    "remaining_sec_history": "float64",
+}
+
+def empty_history():
+    """읽기가 없는 구간/폴대의 결과. 열 타입이 같으므로 timestamp에 .dt를 그대로 쓸 수 있습니다."""
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in _COLUMNS.items()})
+
+def parse_timestamps(values):
+    """ISO 문자열을 UTC 시각으로 바꿉니다. 시간대 정보가 없으면 HISTORY_TIMEZONE으로 봅니다."""
+    values = pd.Series(values, dtype="object").astype(str)
+    aware = values.str.contains(r"(?:Z|[+-]\d{2}:?\d{2})$", regex=True)
+    result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns, UTC]")
+    if aware.any():
+        result[aware] = pd.to_datetime(values[aware], format="ISO8601", utc=True, errors="coerce")
+    if not aware.all():
+        naive = pd.to_datetime(values[~aware], format="ISO8601", errors="coerce")
+        result[~aware] = naive.dt.tz_localize(HISTORY_TIMEZONE, ambiguous="NaT", nonexistent="NaT").dt.tz_convert("UTC")
+    return result
+
+class HistoryCache:
+    """loadcell_history의 로컬 Parquet 캐시
+
+    폴대별로 마지막으로 받은 timestamp(하이 워터 마크) 이후의 항목만
+    (loadcel, timestamp) 키 조건 쿼리로 가져와 (일, 폴대) 파티션에 추가합니다.
+    읽기는 파티션 가지치기로 필요한 일/폴대의 파일만 읽습니다.
+    """
+
+    def __init__(self, root=HISTORY_CACHE_DIR, table_name=HISTORY_TABLE, loadcell_table_name=LOADCELL_TABLE,
+                 sync_interval=HISTORY_SYNC_INTERVAL_SECONDS, table=None, loadcell_table=None):
+        self.root = root
+        self.table_name = table_name
+        self.loadcell_table_name = loadcell_table_name
+        self.sync_interval = sync_interval
+        # 테스트/벤치마크에서는 쿼리/스캔이 가능한 객체를 직접 넘길 수 있습니다
+        self._table = table
+        self._loadcell_table = loadcell_table
+        self.lock = threading.Lock()
+        self.last_sync = 0.0
+        os.makedirs(root, exist_ok=True)
+        # loadcel -> 마지막으로 받은 timestamp 원문 (DynamoDB 정렬 키와 같은 문자열 비교)
+        self.high_water = self._read_manifest()
+        # 캐시 내용이 바뀔 때마다 올라가는 버전 (불러온 DataFrame 재사용 판단용)
+        self.version = 0
+        self._frame = None
+        self.stats = {"syncs": 0, "queries": 0, "items": 0, "files": 0, "compactions": 0, "errors": 0}
+        # 사용량 롤업은 새 읽기를 캐시에 추가할 때 함께 갱신합니다
+        self.cube = UsageCube.load(os.path.join(root, _USAGE_CUBE), HISTORY_TIMEZONE)
+        self._catch_up_cube()
+
+    @property
+    def table(self):
+        return self._table if self._table is not None else get_table(self.table_name)
+
+    @property
+    def loadcell_table(self):
+        return self._loadcell_table if self._loadcell_table is not None else get_table(self.loadcell_table_name)
+
+    def _read_manifest(self):
+        path = os.path.join(self.root, _MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, _MANIFEST)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.high_water, f)
+        os.replace(tmp_path, path)
+
+    def _catch_up_cube(self):
+        """롤업 파일이 없거나 캐시보다 뒤처져 있으면 (처음 실행, 저장 전 종료 등) 캐시의 읽기로 따라잡습니다."""
+        behind = [loadcel for loadcel, high_water in self.high_water.items()
+                  if self.cube.last_timestamp(loadcel) is None
+                  or self.cube.last_timestamp(loadcel) < parse_timestamps([high_water]).iloc[0]]
+        for loadcel in behind:
+            frame = self._read(None, None, [loadcel])
+            self.cube.add(loadcel, frame["timestamp"], frame["current_weight_history"])
+        if behind:
+            self.cube.save(os.path.join(self.root, _USAGE_CUBE))
+
+    def _partition_dir(self, day, loadcel):
+        return os.path.join(self.root, f"day={day}", f"loadcel={quote(str(loadcel), safe='')}")
+
+    def known_poles(self):
+        """최신 상태 테이블의 폴대와 이미 캐시한 폴대를 합친 목록"""
+        poles = set(self.high_water)
+        kwargs = {"ProjectionExpression": "loadcel"}
+        while True:
+            response = self.loadcell_table.scan(**kwargs)
+            poles.update(str(item["loadcel"]) for item in response.get("Items", []) if "loadcel" in item)
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            kwargs["ExclusiveStartKey"] = last_key
+        return sorted(poles)
+
+    def _query_new(self, loadcel):
+        """하이 워터 마크 이후의 항목만 페이지를 따라 끝까지 가져옵니다."""
+        condition = Key("loadcel").eq(loadcel)
+        if loadcel in self.high_water:
+            condition = condition & Key("timestamp").gt(self.high_water[loadcel])
+        kwargs = {"KeyConditionExpression": condition}
+        items = []
+        while True:
+            response = self.table.query(**kwargs)
+            self.stats["queries"] += 1
+            items.extend(response.get("Items", []))
+            last_key = response.get("LastEvaluatedKey")
+            if not last_key:
+                return items
+            kwargs["ExclusiveStartKey"] = last_key
+
+    def _append(self, loadcel, items):
+        """새 항목을 일 단위 파티션 파일로 기록하고 건드린 파티션 경로 목록을 반환합니다."""
+        raw = pd.DataFrame(items)
+        frame = pd.DataFrame({
+            "timestamp": parse_timestamps(raw["timestamp"]),
+            "current_weight_history": pd.to_numeric(raw.get("current_weight_history"), errors="coerce"),
+            "remaining_sec_history": pd.to_numeric(raw.get("remaining_sec_history"), errors="coerce"),
+        }).dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+        self.cube.add(loadcel, frame["timestamp"], frame["current_weight_history"])
+        # 문자열 변환은 행마다가 아니라 일(그룹)마다 한 번만 합니다
+        days = frame["timestamp"].dt.tz_convert(HISTORY_TIMEZONE).dt.normalize()
+        touched = []
+        for day, part in frame.groupby(days, sort=False):
+            directory = self._partition_dir(day.strftime("%Y-%m-%d"), loadcel)
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part, schema=_SCHEMA, preserve_index=False)
+            pq.write_table(table, os.path.join(directory, f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"))
+            self.stats["files"] += 1
+            touched.append(directory)
+        return touched
+
+    def compact(self, directory):
+        """파티션의 여러 파일을 timestamp 순으로 정렬/중복 제거하여 한 파일로 합칩니다."""
+        files = sorted(name for name in os.listdir(directory) if name.endswith(".parquet"))
+        if len(files) <= 1:
+            return False
+        table = pa.concat_tables([pq.read_table(os.path.join(directory, name), schema=_SCHEMA) for name in files])
+        frame = table.to_pandas().drop_duplicates("timestamp", keep="last").sort_values("timestamp")
+        merged = pa.Table.from_pandas(frame, schema=_SCHEMA, preserve_index=False)
+        # 새 파일을 먼저 완성한 뒤 옛 파일을 지우므로 중간에 멈춰도 데이터가 사라지지 않습니다 (중복은 읽을 때 제거)
+        tmp_path = os.path.join(directory, ".compact.tmp")
+        pq.write_table(merged, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, f"part-{time.time_ns()}-compact.parquet"))
+        for name in files:
+            os.remove(os.path.join(directory, name))
+        self.stats["compactions"] += 1
+        return True
+
+    def sync(self, force=False):
+        """sync_interval이 지났으면(force면 항상) 폴대별로 새 항목만 가져와 캐시에 추가합니다.
+
+        여러 세션이 동시에 불러도 한 번만 가져옵니다. 실패하면 이미 받은 캐시를 그대로 씁니다.
+        """
+        with self.lock:
+            if not force and time.monotonic() - self.last_sync < self.sync_interval:
+                return 0
+            self.last_sync = time.monotonic()
+            added = 0
+            try:
+                for loadcel in self.known_poles():
+                    items = self._query_new(loadcel)
+                    if not items:
+                        continue
+                    for directory in self._append(loadcel, items):
+                        if len(os.listdir(directory)) > HISTORY_COMPACT_FILES:
+                            self.compact(directory)
+                    # 파일을 모두 쓴 뒤에 하이 워터 마크를 옮깁니다
+                    self.high_water[loadcel] = max(str(item["timestamp"]) for item in items)
+                    self._write_manifest()
+                    added += len(items)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[히스토리 캐시] 동기화 오류: {e}")
+            self.stats["syncs"] += 1
+            self.stats["items"] += added
+            if added:
+                self.version += 1
+                self.cube.save(os.path.join(self.root, _USAGE_CUBE))
+            return added
+
+    def load(self, start=None, end=None, loadcels=None):
+        """캐시에서 [start, end) 구간(날짜 문자열/Timestamp)과 폴대만 읽어 DataFrame으로 반환합니다.
+
+        열은 loadcel, timestamp(HISTORY_TIMEZONE), current_weight_history, remaining_sec_history입니다.
+        """
+        whole = start is None and end is None and loadcels is None
+        if whole and self._frame is not None and self._frame[0] == self.version:
+            return self._frame[1].copy()
+        frame = self._read(start, end, loadcels)
+        if whole:
+            self._frame = (self.version, frame)
+            return frame.copy()
+        return frame
+
+    def _read(self, start, end, loadcels):
+        try:
+            dataset = ds.dataset(self.root, format="parquet", partitioning=_PARTITIONING, schema=_DATASET_SCHEMA,
+                                 exclude_invalid_files=True, ignore_prefixes=["_", "."])
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return empty_history()
+        condition = None
+        def both(left, right):
+            return right if left is None else left & right
+        # 일 파티션으로 먼저 가지치기한 뒤 timestamp로 정확히 자릅니다
+        if start is not None:
+            start = to_utc(start)
+            condition = both(condition, ds.field("day") >= start.tz_convert(HISTORY_TIMEZONE).strftime("%Y-%m-%d"))
+            condition = both(condition, ds.field("timestamp") >= pa.scalar(start.to_pydatetime(), pa.timestamp("ms", tz="UTC")))
+        if end is not None:
+            end = to_utc(end)
+            condition = both(condition, ds.field("day") <= end.tz_convert(HISTORY_TIMEZONE).strftime("%Y-%m-%d"))
+            condition = both(condition, ds.field("timestamp") < pa.scalar(end.to_pydatetime(), pa.timestamp("ms", tz="UTC")))
+        if loadcels is not None:
+            condition = both(condition, ds.field("loadcel").isin(pa.array([str(l) for l in loadcels], pa.string())))
+        table = dataset.to_table(columns=list(_COLUMNS), filter=condition)
+        if table.num_rows == 0:
+            return empty_history()
+        frame = table.to_pandas()
+        # 압축 도중 멈춰 생길 수 있는 중복을 제거하고 폴대, 시간순으로 정렬합니다
+        frame = frame.drop_duplicates(["loadcel", "timestamp"], keep="last")
+        frame["timestamp"] = frame["timestamp"].dt.tz_convert(HISTORY_TIMEZONE)
+        frame["loadcel"] = frame["loadcel"].astype(str)
+        return frame.sort_values(["loadcel", "timestamp"], ignore_index=True)
+
+    def format_stats(self):
+        return f"[히스토리 캐시] 폴대 {len(self.high_water)}개, 버전 {self.version}, {self.stats}\n{self.cube.format_stats()}"
+
+def to_utc(value):
+    """날짜 문자열/Timestamp를 UTC Timestamp로 바꿉니다. 시간대 정보가 없으면 HISTORY_TIMEZONE으로 봅니다."""
+    value = pd.Timestamp(value)
+    if value.tzinfo is None:
+        value = value.tz_localize(HISTORY_TIMEZONE)
+    return value.tz_convert("UTC")
+
+@st.cache_resource
+def get_history_cache():
+    """서버 프로세스당 하나의 히스토리 캐시를 만들어 모든 세션이 공유합니다."""
+    return HistoryCache()
+
+def get_usage_cube():
+    """새 항목을 (주기가 지났으면) 동기화한 뒤 사용량 롤업을 반환합니다."""
+    cache = get_history_cache()
+    cache.sync()
+    return cache.cube
+
+def load_history_df(start=None, end=None, loadcels=None):
+    """새 항목을 (주기가 지났으면) 동기화한 뒤 캐시에서 loadcell_history DataFrame을 불러옵니다."""
+    cache = get_history_cache()
+    cache.sync()
+    return cache.load(start, end, loadcels)
@@ -0,0 +1,50 @@
+import os
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+from loadcell_store import HISTORY_LENGTH
+from downsample import CHART_WIDTH_PX, downsample_cached
+
+_component = components.declare_component(
+    "live_chart",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "live_chart")
+)
+
+def live_chart(key, timestamps, weights, series=None, title="", max_points=HISTORY_LENGTH, height=450,
+               name="무게", xaxis_title="시간", yaxis_title="무게", width_px=CHART_WIDTH_PX):
+    """브라우저에 이미 보낸 점 이후의 새 점만 보내는 실시간 선 그래프
+
+    timestamps(datetime64[ms] 배열)와 weights는 오래된 것부터 정렬된 전체 구간입니다.
+    series가 바뀌거나(예: 영점 변경) 그래프가 새로 마운트되면 최근 max_points개를 width_px개 이하로
+    다운샘플하여 다시 보내고, 그 외에는 마지막으로 보낸 시각 이후의 점만 보내 Plotly.extendTraces로 이어 붙입니다.
+    이어 붙인 점이 width_px개를 넘으면 점 밀도를 유지하기 위해 전체 구간을 다시 보냅니다.
+    """
+    sent = st.session_state.setdefault("_live_chart_sent", {})
+    state = sent.get(key)
+    # 컴포넌트는 마운트될 때 한 번 자신의 인스턴스 ID를 돌려줍니다
+    mount_id = st.session_state.get(key)
+    timestamps_ms = np.asarray(timestamps, dtype="datetime64[ms]").astype(np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    reset = (state is None or state["series"] != series or state["mount"] != mount_id
+             or state["appended"] >= width_px)
+    if reset:
+        window = slice(max(0, len(timestamps_ms) - max_points), None)
+        last = int(timestamps_ms[-1]) if len(timestamps_ms) else None
+        x, y = downsample_cached((key, str(series), last, len(timestamps_ms)),
+                                 timestamps_ms[window], weights[window], width_px)
+        batch_id = state["batch_id"] + 1 if state else 1
+        appended = 0
+    else:
+        # 아직 한 점도 보내지 않았으면 처음부터 이어 붙입니다
+        start = 0 if state["last_ts"] is None else int(np.searchsorted(timestamps_ms, state["last_ts"], side="right"))
+        x, y = timestamps_ms[start:], weights[start:]
+        batch_id = state["batch_id"] + 1 if len(x) else state["batch_id"]
+        appended = state["appended"] + len(x)
+    last_ts = int(timestamps_ms[-1]) if len(timestamps_ms) else (None if reset else state["last_ts"])
+    sent[key] = {"series": series, "mount": mount_id, "last_ts": last_ts, "batch_id": batch_id, "appended": appended}
+    return _component(
+        key=key, default=None,
+        x=x.tolist(), y=y.round(1).tolist(), reset=reset, batch_id=batch_id, series=str(series),
+        max_points=min(max_points, 2 * width_px), height=height, title=title, name=name,
+        xaxis_title=xaxis_title, yaxis_title=yaxis_title
+    )
@@ -0,0 +1,199 @@
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+
+# 로드셀별로 보관할 무게 히스토리 개수 (1초 간격이면 28800 = 8시간, 근무 한 교대분)
+HISTORY_LENGTH = int(os.environ.get("LOADCELL_HISTORY_DEPTH", "30"))
+
+# 대시보드가 보관하는 최근 알림 이벤트 수
+ALERT_FEED_SIZE = int(os.environ.get("ALERT_FEED_SIZE", "200"))
+
+# 서버(rate_estimator.py)가 읽기에 붙여 보내는 투여 속도 추정 필드
+ESTIMATE_FIELDS = ("flow_rate", "flow_rate_low", "flow_rate_high")
+
+_EPOCH = datetime(1970, 1, 1)
+_MS = timedelta(milliseconds=1)
+
+# version: 저장소 전체 버전, data: loadcel -> 최신 읽기, pole_versions: loadcel -> 마지막으로 바뀐 버전
+StoreSnapshot = namedtuple("StoreSnapshot", ["version", "data", "pole_versions"])
+# 서버 알림 엔진(alert_engine.py)이 평가한 결과
+# version: 알림 버전, active: 알림 ID -> 발생 중인 알림, recent: 최근 이벤트(발생/해제), thresholds: loadcel -> 임계값
+AlertState = namedtuple("AlertState", ["version", "active", "recent", "thresholds"])
+
+def _to_float(value, default):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+def to_epoch_ms(timestamp):
+    """ISO 형식 timestamp 문자열을 벽시계 기준 epoch 밀리초(int)로 바꿉니다. 실패하면 현재 시각을 사용합니다.
+
+    시간대 변환 없이 문자열에 적힌 시각 그대로 저장하므로 그래프 x축에 같은 시각이 표시됩니다.
+    """
+    try:
+        dt = datetime.fromisoformat(timestamp).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        dt = datetime.now()
+    return (dt - _EPOCH) // _MS
+
+class RingBuffer:
+    """고정 용량 (timestamp, weight) 링 버퍼 (int64 epoch ms / float32 무게 배열)
+
+    배열을 용량의 두 배로 잡고 모든 값을 i, i + capacity 두 칸에 함께 써 둡니다.
+    그러면 오래된 것부터의 순서가 항상 [start, start + size) 연속 구간이므로
+    view()가 복사 없이 정렬된 뷰를 돌려줄 수 있습니다.
+    """
+
+    __slots__ = ("capacity", "timestamps", "weights", "start", "size")
+
+    def __init__(self, capacity=HISTORY_LENGTH):
+        self.capacity = capacity
+        self.timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self.weights = np.zeros(2 * capacity, dtype=np.float32)
+        self.start = 0
+        self.size = 0
+
+    def append(self, timestamp_ms, weight):
+        if self.size < self.capacity:
+            index = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            # 가득 차면 가장 오래된 칸을 덮어씁니다
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.timestamps[index] = self.timestamps[index + self.capacity] = timestamp_ms
+        self.weights[index] = self.weights[index + self.capacity] = weight
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    def view(self):
+        """오래된 것부터의 (timestamps, weights) 배열 뷰 (복사 없음, 다음 append 전까지만 유효)"""
+        end = self.start + self.size
+        return self.timestamps[self.start:end], self.weights[self.start:end]
+
+    def items(self):
+        """오래된 것부터 (timestamp ms, weight) 목록"""
+        timestamps, weights = self.view()
+        return list(zip(timestamps.tolist(), weights.tolist()))
+
+    def __len__(self):
+        return self.size
+
+class LoadcellStore:
+    """WebSocket으로 받은 로드셀 데이터의 단일 저장소
+
+    ingest()가 유일한 쓰기 경로입니다. snapshot()은 잠금 없이 최신 StoreSnapshot을 돌려주며,
+    페이지는 pole_versions를 비교해 자신이 보여 주는 로드셀이 바뀌었을 때만 다시 그릴 수 있습니다.
+    """
+
+    def __init__(self, history_length=HISTORY_LENGTH):
+        self.history_length = history_length
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._snapshot = StoreSnapshot(0, {}, {})
+        self._alerts = AlertState(0, {}, (), {})
+        # 서버 영점 절차(tare_scheduler.py)의 로드셀별 최신 상태 (교체만 하므로 읽는 쪽은 잠금이 필요 없습니다)
+        self._tares = {}
+
+    def ingest(self, items):
+        """수신한 읽기 목록을 한 번만 파싱하여 최신 상태와 히스토리에 반영합니다."""
+        with self._lock:
+            version = self._snapshot.version
+            data = dict(self._snapshot.data)
+            pole_versions = dict(self._snapshot.pole_versions)
+            for item in items:
+                loadcel = item.get("loadcel")
+                if not loadcel:
+                    continue
+                current_weight = _to_float(item.get("current_weight"), 0)
+                timestamp = item.get("timestamp")
+                version += 1
+                reading = {
+                    "current_weight": current_weight,
+                    "remaining_sec": _to_float(item.get("remaining_sec"), -1),
+                    "timestamp": timestamp
+                }
+                # 서버가 계산한 투여 속도(g/h)와 신뢰 구간이 있으면 함께 보관합니다
+                for field in ESTIMATE_FIELDS:
+                    if field in item:
+                        reading[field] = _to_float(item[field], -1)
+                data[loadcel] = reading
+                pole_versions[loadcel] = version
+                buffer = self._buffers.get(loadcel)
+                if buffer is None:
+                    buffer = self._buffers[loadcel] = RingBuffer(self.history_length)
+                buffer.append(to_epoch_ms(timestamp), current_weight)
+            # 새 스냅샷 객체로 참조를 교체하므로 읽는 쪽은 잠금이 필요 없습니다
+            self._snapshot = StoreSnapshot(version, data, pole_versions)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def ingest_alerts(self, events):
+        """서버가 보낸 알림 발생/해제 이벤트를 반영합니다."""
+        with self._lock:
+            state = self._alerts
+            active = dict(state.active)
+            for event in events:
+                if event.get("state") == "cleared":
+                    active.pop(event.get("id"), None)
+                else:
+                    active[event.get("id")] = event
+            recent = (state.recent + tuple(events))[-ALERT_FEED_SIZE:]
+            self._alerts = state._replace(version=state.version + 1, active=active, recent=recent)
+
+    def replace_active_alerts(self, alerts):
+        """(재)접속 시 서버가 보낸 발생 중인 알림 목록으로 교체합니다."""
+        with self._lock:
+            state = self._alerts
+            active = {event.get("id"): event for event in alerts}
+            self._alerts = state._replace(version=state.version + 1, active=active)
+
+    def set_alert_thresholds(self, thresholds):
+        with self._lock:
+            state = self._alerts
+            self._alerts = state._replace(version=state.version + 1, thresholds=dict(thresholds))
+
+    def alerts(self):
+        return self._alerts
+
+    def update_tares(self, tares, replace=False):
+        """서버가 보낸 영점 상태를 반영합니다. (replace=True면 (재)접속 스냅샷으로 통째로 교체)"""
+        with self._lock:
+            updated = {} if replace else dict(self._tares)
+            for tare in tares:
+                updated[tare.get("loadcel")] = tare
+            self._tares = updated
+
+    def tare(self, loadcel):
+        """로드셀의 영점 상태 (tare_offset, tare_timestamp, state, capture_at, full_weight), 없으면 None"""
+        return self._tares.get(loadcel)
+
+    def history(self, loadcel, tare_offset=0.0, since=None):
+        """로드셀 히스토리를 오래된 것부터 (datetime64[ms] 배열, float32 무게 배열)로 반환합니다.
+
+        영점(tare_offset) 차감과 0 미만 절삭은 배열 연산 한 번으로 처리하며,
+        since(ISO 문자열)를 주면 그 시각 이후의 점만 남깁니다.
+        결과는 새 배열이므로 수신 스레드가 버퍼를 계속 덮어써도 안전합니다.
+        """
+        with self._lock:
+            buffer = self._buffers.get(loadcel)
+            if buffer is None:
+                return np.empty(0, dtype="datetime64[ms]"), np.empty(0, dtype=np.float32)
+            timestamps, weights = buffer.view()
+            if since is not None:
+                keep = timestamps > to_epoch_ms(since)
+                timestamps, weights = timestamps[keep], weights[keep]
+            weights = np.maximum(weights - np.float32(tare_offset), np.float32(0))
+            return timestamps.astype("datetime64[ms]"), weights
+
+    def changed_poles(self, seen_versions, poles=None):
+        """seen_versions(loadcel -> 버전) 이후 바뀐 로드셀 목록. poles를 주면 그 안에서만 찾습니다."""
+        pole_versions = self._snapshot.pole_versions
+        candidates = pole_versions.keys() if poles is None else poles
+        return [pole for pole in candidates if pole_versions.get(pole, 0) != seen_versions.get(pole, 0)]
@@ -2,8 +2,13 @@ import streamlit as st
 import pandas as pd
 import json
 # === 추가: DynamoDB 및 Key 임포트 ===
-import boto3
+from aws_clients import get_table
 from boto3.dynamodb.conditions import Key
+from ws_ingest import get_ingest_service
+from live_chart import live_chart
+from downsample import downsample_cached
+from loadcell_store import HISTORY_LENGTH
+from ui_common import render_alert_sidebar
 
 st.set_page_config(layout="wide")
 st.title("스마트 링거폴대 상세 정보")
@@ -15,53 +20,12 @@ st.sidebar.write("데이터를 확인합니다.")
 st.sidebar.markdown("---")
 
 # ====== 사이드바에 알림 리스트 출력 ======
-st.sidebar.markdown("### 📋 알림")
-if st.session_state.get('alert_list'):
-    for alert in st.session_state['alert_list']:
-        if alert["id"] == 1:
-            st.sidebar.success(alert["msg"])
-        elif alert["id"] == 2:
-            st.sidebar.warning(alert["msg"])
-        elif alert["id"] == 3:
-            st.sidebar.error(alert["msg"])
-        elif alert["id"] == 4:
-            st.sidebar.error(alert["msg"])
-        else:
-            st.sidebar.info(alert["msg"])
-else:
-    st.sidebar.info("새로운 알림이 없습니다.")
-
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                try:
-                    remaining_sec = float(data.get("remaining_sec", -1))
-                except:
-                    remaining_sec = -1
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    "remaining_sec": remaining_sec
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+render_alert_sidebar()
 
-loadcell_data = st.session_state.get('loadcell_data', {})
+# 프로세스 공용 저장소의 스냅샷 사용 (읽기 전용)
+loadcell_store = get_ingest_service().store
+snapshot = loadcell_store.snapshot()
+loadcell_data = snapshot.data
 
 if not loadcell_data:
     st.warning("데이터가 없습니다. 메인 페이지에서 데이터 수신을 확인하세요.")
@@ -72,9 +36,8 @@ else:
     selected_device = st.selectbox("확인할 장비 ID를 선택하세요:", device_ids)
 
     # === 추가: DynamoDB 연결 ===
-    dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
     POLESTAT_TABLE = 'pole_stat'
-    table_polestat = dynamodb.Table(POLESTAT_TABLE)
+    table_polestat = get_table(POLESTAT_TABLE)
 
     if selected_device:
         st.write("---")
@@ -161,21 +124,16 @@ else:
         else:
             col4.metric("배터리 (%)", "정보 없음")
         # 무게 변화 plotly 그래프 (Overview와 동일)
-        st.subheader("무게 변화 추이 (최근 30개)")
-        loadcell_history = st.session_state.get('loadcell_history', {})
-        history = loadcell_history.get(selected_device, [])
-        tuple_history = [h for h in history if isinstance(h, tuple) and len(h) == 2]
-        if tuple_history:
-            import plotly.graph_objs as go
-            timestamps = [h[0] for h in tuple_history]
-            weights = [round(max(0, h[1]), 1) for h in tuple_history]
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=timestamps, y=weights, mode='lines+markers', name='무게'))
-            fig.update_layout(title="무게 변화 추이 (최근 30개)", xaxis_title="시간", yaxis_title="무게")
-            st.plotly_chart(fig, use_container_width=True)
+        st.subheader(f"무게 변화 추이 (최근 {HISTORY_LENGTH}개)")
+        timestamps, weights = loadcell_store.history(selected_device)
+        if len(timestamps):
+            # 장비를 바꾸면 그래프를 처음부터 그리고, 그 외에는 새 점만 이어 붙입니다
+            live_chart("detail_chart", timestamps, weights, series=selected_device,
+                       title=f"무게 변화 추이 (최근 {HISTORY_LENGTH}개)")
         # 3. (향후 기능) 과거 데이터 차트
         st.subheader("시간별 무게 변화")
-        if tuple_history:
-            st.line_chart(pd.DataFrame({'시간': timestamps, '무게': weights}).set_index('시간'))
+        if len(timestamps):
+            chart_x, chart_y = downsample_cached(("detail", selected_device, snapshot.pole_versions.get(selected_device, 0)), timestamps, weights)
+            st.line_chart(pd.DataFrame({'시간': chart_x, '무게': chart_y}).set_index('시간'))
         else:
             st.info("ℹ️ 데이터가 없습니다.")
@@ -2,38 +2,12 @@ import streamlit as st
 import json
 import pandas as pd
 import plotly.express as px
-import boto3
+from history_cache import get_usage_cube
+from anomaly_events import load_anomalies
+import sql_analytics
 import pytz
-
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                try:
-                    remaining_sec = float(data.get("remaining_sec", -1))
-                except:
-                    remaining_sec = -1
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    "remaining_sec": remaining_sec
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+from downsample import downsample_frame
+from ui_common import render_alert_sidebar
 
 # 사이드바 내용 추가
 st.sidebar.header("수액 사용 통계 분석")
@@ -42,139 +16,92 @@ st.sidebar.write("데이터를 분석합니다.")
 st.sidebar.markdown("---")
 
 # ====== 사이드바에 알림 리스트 출력 ======
-st.sidebar.markdown("### 📋 알림")
-if st.session_state.get('alert_list'):
-    for alert in st.session_state['alert_list']:
-        if alert["id"] == 1:
-            st.sidebar.success(alert["msg"])
-        elif alert["id"] == 2:
-            st.sidebar.warning(alert["msg"])
-        elif alert["id"] == 3:
-            st.sidebar.error(alert["msg"])
-        elif alert["id"] == 4:
-            st.sidebar.error(alert["msg"])
-        else:
-            st.sidebar.info(alert["msg"])
-else:
-    st.sidebar.info("새로운 알림이 없습니다.")
+render_alert_sidebar()
 
 st.title("수액 사용 통계 분석")
 
 # 데이터 불러오기
-@st.cache_data
-def get_history_df():
-    dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-    table = dynamodb.Table('loadcell_history')
-    response = table.scan()
-    items = response['Items']
-    df = pd.DataFrame(items)
-    if not df.empty:
-        df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
-        df['remaining_sec_history'] = pd.to_numeric(df['remaining_sec_history'], errors='coerce')
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
-
-df = get_history_df()
+# 사용량 합계/히트맵/랭킹은 (폴대, 시간)별 사용량 롤업(usage_cube.py)에서 바로 계산하고,
+# 원시 읽기는 CSV에 필요한 구간/장비만 로컬 Parquet 캐시(history_cache.py)에서 읽습니다
+# 이상치는 서버가 읽기마다 탐지해 기록한 이벤트(anomaly_events.py)를 읽기만 합니다
+cube = get_usage_cube()
+date_range = cube.date_range()
 
 # === 상단 카드 요약 ===
-if not df.empty:
-    tz = df['timestamp'].dt.tz
-    today = pd.Timestamp.now(tz=tz).normalize()
+if date_range is not None:
+    today = pd.Timestamp.now(tz=cube.timezone).normalize()
     week_start = today - pd.Timedelta(days=today.weekday())
     month_start = today.replace(day=1)
-    today_sum = df[df['timestamp'].dt.date == today.date()]['current_weight_history'].sum() / 1000
-    week_sum = df[(df['timestamp'] >= week_start)]['current_weight_history'].sum() / 1000
-    month_sum = df[(df['timestamp'] >= month_start)]['current_weight_history'].sum() / 1000
+    today_sum = cube.usage_total(start=today) / 1000
+    week_sum = cube.usage_total(start=week_start) / 1000
+    month_sum = cube.usage_total(start=month_start) / 1000
     col1, col2, col3 = st.columns(3)
     col1.metric("오늘 총 사용량", f"{today_sum:.1f}kg")
     col2.metric("이번주 총 사용량", f"{week_sum:.1f}kg")
     col3.metric("이번달 총 사용량", f"{month_sum:.1f}kg")
 
-if df.empty:
+if date_range is None:
     st.warning("아직 기록된 데이터가 없습니다.")
+    st.stop()
+
+# 1. 기간/장비별 필터
+st.sidebar.header("필터")
+loadcel_options = cube.loadcels()
+selected_loadcel = st.sidebar.multiselect("장비 선택", loadcel_options, default=loadcel_options)
+start_date = st.sidebar.date_input("시작일", date_range[0])
+end_date = st.sidebar.date_input("종료일", date_range[1])
+
+# 종료일 하루 전체를 포함합니다 (롤업과 캐시가 같은 시간대로 해석)
+start_dt = pd.Timestamp(start_date)
+end_dt = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+
+# 2. 기간별 무게 변화(감소량, kg)
+st.subheader("기간별 무게 변화(감소량, kg)")
+hourly = cube.hourly_usage(start_dt, end_dt, selected_loadcel)
+if hourly.empty:
+    st.info("선택한 조건에 해당하는 데이터가 없습니다.")
 else:
-    # 1. 기간/장비별 필터
-    st.sidebar.header("필터")
-    loadcel_options = df['loadcel'].unique().tolist()
-    selected_loadcel = st.sidebar.multiselect("장비 선택", loadcel_options, default=loadcel_options)
-    start_date = st.sidebar.date_input("시작일", df['timestamp'].min().date())
-    end_date = st.sidebar.date_input("종료일", df['timestamp'].max().date())
-
-    # 타임존 정보 추출 및 일치화
-    tz = df['timestamp'].dt.tz if df['timestamp'].dt.tz is not None else None
-    start_dt = pd.Timestamp(start_date)
-    end_dt = pd.Timestamp(end_date) + pd.Timedelta(days=1)
-    if tz is not None:
-        if start_dt.tzinfo is None:
-            start_dt = start_dt.tz_localize(tz)
-        else:
-            start_dt = start_dt.tz_convert(tz)
-        if end_dt.tzinfo is None:
-            end_dt = end_dt.tz_localize(tz)
-        else:
-            end_dt = end_dt.tz_convert(tz)
-
-    filtered = df[
-        (df['loadcel'].isin(selected_loadcel)) &
-        (df['timestamp'] >= start_dt) &
-        (df['timestamp'] <= end_dt)
-    ]
-
-    # 2. 기간별 무게 변화(감소량, kg)
-    st.subheader("기간별 무게 변화(감소량, kg)")
-    if filtered.empty:
-        st.info("선택한 조건에 해당하는 데이터가 없습니다.")
-    else:
-        filtered = filtered.sort_values('timestamp')
-        filtered['prev_weight'] = filtered.groupby('loadcel')['current_weight_history'].shift(1)
-        filtered['usage'] = (filtered['prev_weight'] - filtered['current_weight_history']).clip(lower=0) / 1000
-        # 감소량(usage, kg) 기준으로 라인차트 표시
-        fig = px.line(
-            filtered,
-            x='timestamp',
-            y='usage',
-            color='loadcel',
-            markers=True,
-            labels={'usage': '감소량(kg)', 'timestamp': '시간', 'loadcel': '장비'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    # 시간별 감소량(usage, kg) 라인차트 (기간이 길면 장비별로 화면 폭에 맞게 다운샘플, 최솟값/최댓값 보존)
+    chart_df = downsample_frame(hourly, 'hour', 'usage', 'loadcel',
+                                cache_key=("usage", start_dt, end_dt, tuple(selected_loadcel), cube.version))
+    fig = px.line(
+        chart_df,
+        x='hour',
+        y='usage',
+        color='loadcel',
+        markers=True,
+        labels={'usage': '감소량(kg)', 'hour': '시간', 'loadcel': '장비'}
+    )
+    st.plotly_chart(fig, use_container_width=True)
 
 # === 3개 통계 가로 배치 ===
 col1, col2, col3 = st.columns(3)
 
 with col1:
     st.subheader("시간대별 사용량(kg)")
-    filtered['hour'] = filtered['timestamp'].dt.hour
-    filtered = filtered.sort_values('timestamp')
-    filtered['prev_weight'] = filtered.groupby('loadcel')['current_weight_history'].shift(1)
-    filtered['usage'] = (filtered['prev_weight'] - filtered['current_weight_history']).clip(lower=0) / 1000
-    usage_by_hour = filtered.groupby(['hour', 'loadcel'])['usage'].sum().reset_index()
-    usage_by_hour['usage'] = usage_by_hour['usage'].round(1)
-    heatmap_pivot = usage_by_hour.pivot(index='hour', columns='loadcel', values='usage').fillna(0)
+    heatmap_pivot = cube.hour_of_day(start_dt, end_dt, selected_loadcel)
     styled_heatmap = heatmap_pivot.style.format("{:.1f}").background_gradient(cmap='Blues')
     st.dataframe(styled_heatmap, height=300)
 
 with col2:
     st.subheader("폴대별 사용량 랭킹(kg)")
-    filtered['usage'] = (filtered['prev_weight'] - filtered['current_weight_history']).clip(lower=0) / 1000
-    rank_df = filtered.groupby('loadcel')['usage'].sum().reset_index()
-    rank_df['usage'] = rank_df['usage'].round(1)
-    rank_df = rank_df.sort_values('usage', ascending=False)
+    rank_df = cube.ranking(start_dt, end_dt, selected_loadcel)
     rank_df.index += 1
     st.dataframe(rank_df.rename(columns={'usage': '총 사용량(kg)'}))
 
 with col3:
-    st.subheader("이상치(급격한 변화) 탐지")
-    filtered['diff'] = filtered.groupby('loadcel')['current_weight_history'].diff().abs()
-    outlier = filtered[filtered['diff'] > 50]  # 예: 50g 이상 변화
+    st.subheader("이상치(급변/투여 속도 변화) 탐지")
+    # 급변(jump)과 투여 속도 변화(drift) 이벤트, 심각도(warning/critical)
+    outlier = load_anomalies(start_dt, end_dt, selected_loadcel)
     if outlier.empty:
-        st.info("이상 변화(급격한 무게 변화) 없음")
+        st.info("이상 변화(급변/투여 속도 변화) 없음")
     else:
-        st.dataframe(outlier[['loadcel', 'timestamp', 'current_weight_history', 'diff']])
+        st.dataframe(outlier[['loadcel', 'timestamp', 'kind', 'severity', 'direction', 'current_weight', 'diff', 'score']])
 
     # === 데이터 다운로드 ===
     st.subheader("데이터 다운로드")
-    csv = filtered.to_csv(index=False).encode('utf-8-sig')
+    # 원시 읽기는 다운로드 버튼을 눌렀을 때만 읽습니다
+    csv = lambda: sql_analytics.readings(start_dt, end_dt, selected_loadcel).to_csv(index=False).encode('utf-8-sig')
     st.download_button(
         label="CSV로 다운로드",
         data=csv,
@@ -1,7 +1,7 @@
 import streamlit as st
-import json
-import pandas as pd
-import boto3
+from history_cache import get_usage_cube
+from anomaly_events import load_anomalies
+import sql_analytics
 from fpdf import FPDF
 import tempfile
 import os
@@ -9,36 +9,7 @@ import matplotlib.pyplot as plt
 import plotly.io as pio
 from PIL import Image
 import io
-
-# WebSocket에서 받은 메시지 처리 (main.py와 동일하게)
-q = st.session_state.get("queue", None)
-if q is not None:
-    while not q.empty():
-        msg = q.get()
-        try:
-            data = json.loads(msg)
-            loadcel = data.get("loadcel")
-            timestamp = data.get("timestamp")
-            if loadcel:
-                try:
-                    current_weight = float(data.get("current_weight", 0))
-                except:
-                    current_weight = 0
-                try:
-                    remaining_sec = float(data.get("remaining_sec", -1))
-                except:
-                    remaining_sec = -1
-                st.session_state.loadcell_data[loadcel] = {
-                    "current_weight": current_weight,
-                    "remaining_sec": remaining_sec
-                }
-                if loadcel not in st.session_state.loadcell_history:
-                    st.session_state.loadcell_history[loadcel] = []
-                st.session_state.loadcell_history[loadcel].append((timestamp, current_weight))
-                if len(st.session_state.loadcell_history[loadcel]) > 30:
-                    st.session_state.loadcell_history[loadcel] = st.session_state.loadcell_history[loadcel][-30:]
-        except Exception as e:
-            print(f"메시지 파싱 오류: {msg} | 오류: {e}")
+from ui_common import render_alert_sidebar
 
 # 사이드바 내용 추가
 st.sidebar.header("보고서 생성")
@@ -47,57 +18,31 @@ st.sidebar.write("보고서를 생성합니다.")
 st.sidebar.markdown("---")
 
 # ====== 사이드바에 알림 리스트 출력 ======
-st.sidebar.markdown("### 📋 알림")
-if st.session_state.get('alert_list'):
-    for alert in st.session_state['alert_list']:
-        if alert["id"] == 1:
-            st.sidebar.success(alert["msg"])
-        elif alert["id"] == 2:
-            st.sidebar.warning(alert["msg"])
-        elif alert["id"] == 3:
-            st.sidebar.error(alert["msg"])
-        elif alert["id"] == 4:
-            st.sidebar.error(alert["msg"])
-        else:
-            st.sidebar.info(alert["msg"])
-else:
-    st.sidebar.info("새로운 알림이 없습니다.")
-
-# DynamoDB에서 데이터 불러오기 함수
-@st.cache_data
-def get_history_df():
-    dynamodb = boto3.resource('dynamodb', region_name='ap-northeast-2')
-    table = dynamodb.Table('loadcell_history')
-    response = table.scan()
-    items = response['Items']
-    df = pd.DataFrame(items)
-    if not df.empty:
-        df['current_weight_history'] = pd.to_numeric(df['current_weight_history'], errors='coerce')
-        df['remaining_sec_history'] = pd.to_numeric(df['remaining_sec_history'], errors='coerce')
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-    return df
+render_alert_sidebar()
 
 st.title("보고서 생성")
 
-df = get_history_df()
+# 기간 목록과 장비별 통계는 (폴대, 시간)별 사용량 롤업(usage_cube.py)에서 계산하고,
+# 원시 읽기는 선택한 기간의 파티션만 로컬 Parquet 캐시(history_cache.py)에서 읽습니다
+cube = get_usage_cube()
 
 st.write("---")
 st.subheader("보고서 생성")
 
-if not df.empty:
+if cube.date_range() is not None:
     # === 보고서 유형 선택 ===
     report_type = st.radio("보고서 유형 선택", ["월간", "주간", "일간"], horizontal=True)
     if report_type == "월간":
-        df['period'] = df['timestamp'].dt.strftime('%Y-%m')
-        period_options = sorted(df['period'].unique(), reverse=True)
+        period_unit = "month"
+        period_options = cube.periods(period_unit)
         period_labels = [f"{m[:4]}년 {int(m[5:]):02d}월" for m in period_options]
     elif report_type == "주간":
-        df['period'] = df['timestamp'].dt.strftime('%Y-%U')
-        period_options = sorted(df['period'].unique(), reverse=True)
+        period_unit = "week"
+        period_options = cube.periods(period_unit)
         period_labels = [f"{m[:4]}년 {int(m[5:]):02d}주" for m in period_options]
     else:
-        df['period'] = df['timestamp'].dt.strftime('%Y-%m-%d')
-        period_options = sorted(df['period'].unique(), reverse=True)
+        period_unit = "day"
+        period_options = cube.periods(period_unit)
         period_labels = [f"{m[:4]}년 {int(m[5:7])}월 {int(m[8:]):02d}일" for m in period_options]
     period_map = dict(zip(period_labels, period_options))
     selected_label = st.selectbox("보고서 생성 기간 선택:", period_labels)
@@ -105,11 +50,13 @@ if not df.empty:
     # === 포함 항목 선택 ===
     st.write("포함할 항목을 선택하세요:")
     include_stats = st.checkbox("장비별 통계 요약", value=True)
-    include_outlier = st.checkbox("이상치(급격한 변화) 기록", value=True)
+    include_outlier = st.checkbox("이상치(급변/투여 속도 변화) 기록", value=True)
     include_graph = st.checkbox("그래프 포함", value=True)
     # === 데이터 필터링 ===
-    period_df = df[df['period'] == selected_period]
-    if period_df.empty:
+    # 통계는 사용량 롤업에서, 이상치는 서버가 기록한 이상 이벤트에서, 그래프는 캐시 파티션에 직접 질의한 결과 행만 가져옵니다
+    period_start, period_end = cube.period_range(period_unit, selected_period)
+    stats = cube.period_stats(period_unit, selected_period)
+    if stats.empty:
         st.info("해당 기간에 데이터가 없습니다.")
     else:
         # === 미리보기 ===
@@ -117,25 +64,26 @@ if not df.empty:
         st.subheader("보고서 미리보기")
         if include_stats:
             st.write("#### 장비별 통계 요약")
-            stats = period_df.groupby('loadcel')['current_weight_history'].agg(['count', 'mean', 'min', 'max', 'sum'])
             st.dataframe(stats.rename(columns={'count': '측정수', 'mean': '평균', 'min': '최소', 'max': '최대', 'sum': '총합'}))
         if include_outlier:
-            st.write("#### 이상치(급격한 변화) 기록")
-            period_df['diff'] = period_df.groupby('loadcel')['current_weight_history'].diff().abs()
-            outlier = period_df[period_df['diff'] > 50]
+            st.write("#### 이상치(급변/투여 속도 변화) 기록")
+            outlier = load_anomalies(period_start, period_end)
             if outlier.empty:
                 st.info("이상 변화 없음")
             else:
-                st.dataframe(outlier[['loadcel', 'timestamp', 'current_weight_history', 'diff']])
+                st.dataframe(outlier[['loadcel', 'timestamp', 'kind', 'severity', 'direction', 'current_weight', 'diff', 'score']])
         if include_graph:
             st.write("#### 무게 변화 그래프")
             import plotly.express as px
-            fig = px.line(period_df, x='timestamp', y='current_weight_history', color='loadcel', markers=True)
+            # 장비별로 화면 폭에 맞게 구간별 최솟값/최댓값만 가져옵니다
+            graph_df = sql_analytics.graph(period_start, period_end)
+            fig = px.line(graph_df, x='timestamp', y='current_weight_history', color='loadcel', markers=True)
             st.plotly_chart(fig, use_container_width=True)
         # === PDF/CSV 다운로드 ===
         st.write("---")
         st.subheader("보고서 다운로드")
-        csv = period_df.to_csv(index=False).encode('utf-8-sig')
+        # 원시 읽기는 다운로드 버튼을 눌렀을 때만 읽습니다
+        csv = lambda: sql_analytics.readings(period_start, period_end).assign(period=selected_period).to_csv(index=False).encode('utf-8-sig')
         st.download_button(
             label="CSV로 다운로드",
             data=csv,
@@ -239,7 +187,7 @@ if not df.empty:
             # 이상치
             if include_outlier and outlier_df is not None and not outlier_df.empty:
                 pdf.set_font(font_name, '', 14)
-                pdf.cell(0, 10, '이상치(급격한 변화) 기록', ln=True)
+                pdf.cell(0, 10, '이상치(급변/투여 속도 변화) 기록', ln=True)
                 pdf.set_font(font_name, '', 9)
                 outlier_cols = outlier_df.columns
                 col_width = pdf.w / (len(outlier_cols) + 1)
@@ -272,12 +220,12 @@ if not df.empty:
         if include_stats:
             # stats, outlier, fig 등 준비
             stats_df = stats.rename(columns={'count': '측정수', 'mean': '평균', 'min': '최소', 'max': '최대', 'sum': '총합'}) if include_stats else None
-            outlier_df = outlier[['loadcel', 'timestamp', 'current_weight_history', 'diff']] if include_outlier and 'outlier' in locals() and not outlier.empty else None
+            outlier_df = outlier[['loadcel', 'timestamp', 'kind', 'severity', 'direction', 'current_weight', 'diff', 'score']] if include_outlier and 'outlier' in locals() and not outlier.empty else None
             graph_fig = None
             if include_graph:
                 import plotly.express as px
                 graph_fig = px.line(
-                    period_df,
+                    graph_df,
                     x='timestamp',
                     y='current_weight_history',
                     color='loadcel',
@@ -288,7 +236,7 @@ if not df.empty:
             if st.download_button(
                 label="PDF로 다운로드",
                 data=(pdf_file := dataframe_to_pdf(
-                    period_df,
+                    None,
                     title=f"{selected_label} 보고서",
                     font_path=selected_font_path,
                     font_name=selected_font_name,
@@ -1,5 +1,7 @@
 import streamlit as st
 import json
+from ws_ingest import get_ingest_service
+from ui_common import render_alert_sidebar
 
 st.title("설정")
 
@@ -10,35 +12,37 @@ st.sidebar.write("원하는대로 바꿀 수 있습니다.")
 st.sidebar.markdown("---")
 
 # ====== 사이드바에 알림 리스트 출력 ======
-st.sidebar.markdown("### 📋 알림")
-if st.session_state.get('alert_list'):
-    for alert in st.session_state['alert_list']:
-        if alert["id"] == 1:
-            st.sidebar.success(alert["msg"])
-        elif alert["id"] == 2:
-            st.sidebar.warning(alert["msg"])
-        elif alert["id"] == 3:
-            st.sidebar.error(alert["msg"])
-        elif alert["id"] == 4:
-            st.sidebar.error(alert["msg"])
-        else:
-            st.sidebar.info(alert["msg"])
-else:
-    st.sidebar.info("새로운 알림이 없습니다.")
+render_alert_sidebar()
 
 # === 장비별 알림 임계값 설정 ===
 st.subheader("장비별 알림 임계값 설정")
-loadcell_ids = st.session_state.get('loadcell_data', {}).keys()
+ingest_service = get_ingest_service()
+loadcell_data = ingest_service.store.snapshot().data
+# 임계값은 서버 알림 엔진에 저장되어 모든 대시보드가 같은 값을 사용합니다
+server_thresholds = ingest_service.store.alerts().thresholds
+loadcell_ids = sorted(loadcell_data.keys())
+
+def send_thresholds(loadcel):
+    sent = ingest_service.send_control({
+        "type": "set_alert_thresholds",
+        "loadcel": loadcel,
+        "almost_weight": st.session_state[f'alert_almost_weight_{loadcel}'],
+        "done_weight": st.session_state[f'alert_done_weight_{loadcel}']
+    })
+    if not sent:
+        st.toast("서버에 연결되어 있지 않아 임계값을 저장하지 못했습니다.")
+
 if loadcell_ids:
     for loadcel in loadcell_ids:
         key_almost = f'alert_almost_weight_{loadcel}'
         key_done = f'alert_done_weight_{loadcel}'
+        thresholds = server_thresholds.get(loadcel, {})
         if key_almost not in st.session_state:
-            st.session_state[key_almost] = 300
+            st.session_state[key_almost] = int(thresholds.get("almost_weight", 300))
         if key_done not in st.session_state:
-            st.session_state[key_done] = 150
-        st.session_state[key_almost] = st.slider(f"장비 {loadcel} 거의 다 됨 알림 기준 (g)", 100, 500, st.session_state[key_almost], 10)
-        st.session_state[key_done] = st.slider(f"장비 {loadcel} 투여 완료 알림 기준 (g)", 100, 500, st.session_state[key_done], 10)
+            st.session_state[key_done] = int(thresholds.get("done_weight", 150))
+        st.slider(f"장비 {loadcel} 거의 다 됨 알림 기준 (g)", 100, 500, step=10, key=key_almost, on_change=send_thresholds, args=(loadcel,))
+        st.slider(f"장비 {loadcel} 투여 완료 알림 기준 (g)", 100, 500, step=10, key=key_done, on_change=send_thresholds, args=(loadcel,))
 else:
     st.info("장비 데이터가 없습니다. (실시간 데이터 수신 필요)")
 
@@ -0,0 +1,132 @@
+import os
+import threading
+import duckdb
+import pandas as pd
+import streamlit as st
+from downsample import CHART_WIDTH_PX
+from history_cache import HISTORY_TIMEZONE, get_history_cache, to_utc
+
+# DuckDB가 질의에 쓰는 스레드 수 (0이면 CPU 수)
+SQL_THREADS = int(os.environ.get("SQL_THREADS", "0"))
+
+_READING_COLUMNS = ["loadcel", "timestamp", "current_weight_history", "remaining_sec_history",
+                    "prev_weight", "usage", "diff", "hour"]
+
+# 폴대별 직전 무게를 붙인 읽기. {source}에는 파티션/구간 조건이 붙은 read_parquet이 들어갑니다.
+# 압축 도중 멈춰 생길 수 있는 중복 읽기는 변화량이 0이므로 사용량에 영향을 주지 않습니다.
+_READINGS = """
+WITH readings AS (
+    SELECT loadcel, timestamp, current_weight_history, remaining_sec_history,
+           lag(current_weight_history) OVER (PARTITION BY loadcel ORDER BY timestamp) AS prev_weight
+    FROM {source}
+)
+"""
+_USAGE_G = "greatest(prev_weight - current_weight_history, 0)"
+
+class SqlAnalytics:
+    """히스토리 캐시의 Parquet 파티션을 DuckDB로 직접 질의합니다.
+
+    day/loadcel 조건은 파티션 가지치기로, timestamp 조건은 row group 통계로 내려가고 필요한 열만 읽으므로
+    전체 기록 대신 화면에 그릴 결과 행만 DataFrame으로 만듭니다.
+    """
+
+    def __init__(self, root, timezone=HISTORY_TIMEZONE, threads=SQL_THREADS):
+        self.root = root
+        self.timezone = timezone
+        self.threads = threads
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _cursor(self):
+        # 연결은 하나만 만들고 세션 스레드마다 cursor(같은 DB의 별도 연결)를 씁니다
+        with self._lock:
+            if self._connection is None:
+                connection = duckdb.connect()
+                if self.threads:
+                    connection.execute(f"SET threads = {int(self.threads)}")
+                self._connection = connection
+            return self._connection.cursor()
+
+    def _source(self, start, end, loadcels):
+        files = os.path.join(self.root, "day=*", "loadcel=*", "*.parquet").replace("'", "''")
+        clauses, params = [], []
+        # 파티션 열(day, loadcel) 조건으로 디렉터리를 먼저 고른 뒤 timestamp로 정확히 자릅니다
+        if start is not None:
+            start = to_utc(start)
+            clauses.append("day >= ? AND timestamp >= ?")
+            params += [start.tz_convert(self.timezone).strftime("%Y-%m-%d"), start.to_pydatetime()]
+        if end is not None:
+            end = to_utc(end)
+            clauses.append("day <= ? AND timestamp < ?")
+            params += [end.tz_convert(self.timezone).strftime("%Y-%m-%d"), end.to_pydatetime()]
+        if loadcels is not None:
+            loadcels = [str(l) for l in loadcels] or [None]
+            clauses.append(f"loadcel IN ({', '.join('?' * len(loadcels))})")
+            params += loadcels
+        source = (f"read_parquet('{files}', hive_partitioning = true, "
+                  "hive_types = {'day': VARCHAR, 'loadcel': VARCHAR})")
+        if clauses:
+            source = f"(SELECT * FROM {source} WHERE {' AND '.join(clauses)})"
+        return source, params
+
+    def _query(self, sql, params, columns):
+        try:
+            frame = self._cursor().execute(sql, params).df()
+        except duckdb.IOException:
+            # 아직 동기화된 파티션이 없으면 파일 패턴에 맞는 파일이 없습니다
+            return pd.DataFrame(columns=columns)
+        if "timestamp" in frame:
+            frame["timestamp"] = frame["timestamp"].dt.tz_convert(self.timezone)
+        if "loadcel" in frame:
+            frame["loadcel"] = frame["loadcel"].astype(str)
+        return frame
+
+    def _local(self, column="timestamp"):
+        return f"timezone('{self.timezone}', {column})"
+
+    def readings(self, start=None, end=None, loadcels=None):
+        """구간/폴대의 원시 읽기에 직전 무게, 사용량(kg), 변화량(g), 시간대를 붙여 반환합니다."""
+        source, params = self._source(start, end, loadcels)
+        sql = _READINGS.format(source=source) + f"""
+            SELECT *, {_USAGE_G} / 1000 AS usage, abs(current_weight_history - prev_weight) AS diff,
+                   hour({self._local()}) AS hour
+            FROM readings ORDER BY loadcel, timestamp"""
+        return self._query(sql, params, _READING_COLUMNS)
+
+    def graph(self, start=None, end=None, loadcels=None, width_px=CHART_WIDTH_PX):
+        """폴대별 무게 그래프용 읽기. 폴대마다 기간을 width_px / 2개 구간으로 나눠 구간의 최솟값/최댓값만 남깁니다."""
+        source, params = self._source(start, end, loadcels)
+        buckets = max(1, width_px // 2)
+        sql = f"""
+            WITH points AS (
+                SELECT loadcel, timestamp, current_weight_history, epoch_ms(timestamp) AS ms,
+                       min(epoch_ms(timestamp)) OVER (PARTITION BY loadcel) AS first_ms,
+                       max(epoch_ms(timestamp)) OVER (PARTITION BY loadcel) AS last_ms
+                FROM {source}
+            ), bucketed AS (
+                SELECT loadcel, (ms - first_ms) * ? // (last_ms - first_ms + 1) AS bucket,
+                       arg_min(timestamp, current_weight_history) AS min_timestamp, min(current_weight_history) AS min_weight,
+                       arg_max(timestamp, current_weight_history) AS max_timestamp, max(current_weight_history) AS max_weight
+                FROM points GROUP BY loadcel, bucket
+            )
+            SELECT loadcel, min_timestamp AS timestamp, min_weight AS current_weight_history FROM bucketed
+            UNION
+            SELECT loadcel, max_timestamp, max_weight FROM bucketed
+            ORDER BY loadcel, timestamp"""
+        return self._query(sql, params + [buckets], ["loadcel", "timestamp", "current_weight_history"])
+
+@st.cache_resource
+def get_sql_analytics():
+    """서버 프로세스당 하나의 DuckDB 연결을 히스토리 캐시 위에 만듭니다."""
+    return SqlAnalytics(get_history_cache().root)
+
+def _engine():
+    # 새 항목을 (주기가 지났으면) 동기화한 뒤 질의합니다
+    get_history_cache().sync()
+    return get_sql_analytics()
+
+def readings(start=None, end=None, loadcels=None):
+    return _engine().readings(start, end, loadcels)
+
+def graph(start=None, end=None, loadcels=None, width_px=CHART_WIDTH_PX):
+    return _engine().graph(start, end, loadcels, width_px)
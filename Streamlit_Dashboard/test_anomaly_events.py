@@ -0,0 +1,70 @@
+"""
+이상 이벤트 동기화 테스트
+
+AnomalyEvents가 폴대별 하이 워터 마크 이후의 이벤트만 쿼리하여 목록에 더하는지,
+쿼리가 실패한 폴대는 다음 동기화에 다시 가져오는지 확인합니다.
+"""
+
+from anomaly_events import AnomalyEvents
+
+class FakeAnomalyTable:
+    """loadcel = :l [AND timestamp > :hw] 키 조건만 흉내 내는 쿼리 대역 (페이지당 2개)"""
+
+    def __init__(self):
+        self.items = []
+        self.conditions = []
+        self.fail = set()
+
+    def put(self, loadcel, minute, weight=100):
+        self.items.append({"loadcel": loadcel, "timestamp": f"2025-01-01T09:{minute:02d}:00", "kind": "jump",
+                           "severity": "warning", "direction": "drop", "current_weight": weight, "diff": -50, "score": 6})
+
+    def query(self, KeyConditionExpression, ExclusiveStartKey=None):
+        expression = KeyConditionExpression.get_expression()
+        if expression["operator"] == "AND":
+            equals, greater = expression["values"]
+            loadcel, high_water = equals.get_expression()["values"][1], greater.get_expression()["values"][1]
+        else:
+            loadcel, high_water = expression["values"][1], None
+        self.conditions.append((loadcel, high_water))
+        if loadcel in self.fail:
+            raise RuntimeError("throttled")
+        matched = sorted((item for item in self.items if item["loadcel"] == loadcel
+                          and (high_water is None or item["timestamp"] > high_water)), key=lambda item: item["timestamp"])
+        start = ExclusiveStartKey or 0
+        response = {"Items": matched[start:start + 2]}
+        if start + 2 < len(matched):
+            response["LastEvaluatedKey"] = start + 2
+        return response
+
+def test_only_new_events_are_queried():
+    table = FakeAnomalyTable()
+    for minute in range(3):
+        table.put("1", minute)
+    table.put("2", 0)
+    events = AnomalyEvents(sync_interval=0, table=table)
+    events.sync(["1", "2", "3"])
+    assert len(events.load()) == 4 and events.high_water == {"1": "2025-01-01T09:02:00", "2": "2025-01-01T09:00:00"}
+    assert [c for c in table.conditions if c[0] == "1"] == [("1", None), ("1", None)]
+
+    table.conditions.clear()
+    table.put("1", 5)
+    events.sync(["1", "2", "3"])
+    # 두 번째 동기화는 하이 워터 마크 이후만 묻고, 새 이벤트 하나만 더합니다
+    assert table.conditions == [("1", "2025-01-01T09:02:00"), ("2", "2025-01-01T09:00:00"), ("3", None)]
+    frame = events.load(loadcels=["1"])
+    assert frame["timestamp"].dt.minute.tolist() == [0, 1, 2, 5]
+    assert events.stats["items"] == 5 and frame["current_weight"].dtype == float
+
+def test_failed_pole_is_fetched_next_sync():
+    table = FakeAnomalyTable()
+    table.put("1", 0)
+    table.put("2", 0)
+    table.fail.add("2")
+    events = AnomalyEvents(sync_interval=0, table=table)
+    events.sync(["1", "2"])
+    assert events.load()["loadcel"].tolist() == ["1"] and "2" not in events.high_water
+    assert events.stats["errors"] == 1
+    table.fail.clear()
+    events.sync(["1", "2"])
+    assert events.load()["loadcel"].tolist() == ["1", "2"]
@@ -0,0 +1,68 @@
+"""그래프 다운샘플: 첫/마지막 점과 시간 순서, 버킷별 최솟값/최댓값을 지키고, 캐시는 데이터 버전마다 따로 보관합니다."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsample import (DownsampleCache, _bucket_edges, downsample, downsample_cache, downsample_frame, lttb_indices,
+                        minmax_indices, minmax_lttb_indices)
+
+METHODS = [lttb_indices, minmax_indices, minmax_lttb_indices]
+
+def series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.datetime64("2025-01-01T00:00:00", "ms") + np.arange(n) * np.timedelta64(1000, "ms")
+    y = np.cumsum(rng.normal(0, 1, n)) + 500
+    # 짧은 급변(교체/이상치)을 섞습니다
+    y[rng.choice(n, 20, replace=False)] += rng.choice([-300, 300], 20)
+    return x, y
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("n, n_out", [(10_000, 1200), (5003, 97), (100, 12)])
+def test_endpoints_and_increasing_indices(method, n, n_out):
+    x, y = series(n)
+    indices = method(x, y, n_out)
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+    assert len(indices) <= n_out
+
+@pytest.mark.parametrize("n, n_out", [(10_000, 1200), (5003, 97), (101, 10)])
+def test_minmax_keeps_each_bucket_extremes(n, n_out):
+    x, y = series(n)
+    kept = set(minmax_indices(x, y, n_out).tolist())
+    edges = _bucket_edges(1, n - 1, (n_out - 2) // 2)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        bucket = y[lo:hi]
+        assert lo + int(bucket.argmin()) in kept
+        assert lo + int(bucket.argmax()) in kept
+
+@pytest.mark.parametrize("method", METHODS)
+def test_small_input_is_unchanged(method):
+    x, y = series(50)
+    for n_out in (50, 80):
+        assert method(x, y, n_out).tolist() == list(range(50))
+    x_out, y_out = downsample(x, y, width_px=50)
+    assert np.array_equal(x_out, x) and np.array_equal(y_out, y)
+
+def test_cache_key_changes_with_data_version():
+    downsample_cache.entries.clear()
+    x, y = series(5000)
+    frame = pd.DataFrame({"loadcel": "1", "timestamp": x, "weight": y})
+    first = downsample_frame(frame, "timestamp", "weight", "loadcel", width_px=100, cache_key=("range", 1))
+    misses = downsample_cache.misses
+    # 같은 키는 캐시에서 꺼내고, 데이터가 바뀌어 버전이 오르면 다시 계산합니다
+    again = downsample_frame(frame, "timestamp", "weight", "loadcel", width_px=100, cache_key=("range", 1))
+    assert again.equals(first) and downsample_cache.misses == misses
+    changed = frame.assign(weight=frame["weight"][::-1].to_numpy())
+    updated = downsample_frame(changed, "timestamp", "weight", "loadcel", width_px=100, cache_key=("range", 2))
+    assert downsample_cache.misses == misses + 1
+    assert updated["weight"].max() == changed["weight"].max()
+    assert len(downsample_cache.entries) == 2
+
+def test_cache_evicts_least_recently_used():
+    cache = DownsampleCache(max_entries=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 0)
+    cache.get("c", lambda: 3)
+    assert list(cache.entries) == ["a", "c"] and cache.hits == 1 and cache.misses == 3
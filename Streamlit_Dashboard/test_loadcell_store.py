@@ -0,0 +1,59 @@
+"""로드셀 히스토리 링 버퍼: 용량을 넘겨도 오래된 것부터의 순서를 지키고, history()가 since/영점을 반영합니다."""
+
+import numpy as np
+import pytest
+
+from loadcell_store import LoadcellStore, RingBuffer
+
+@pytest.mark.parametrize("count", [0, 1, 4, 5, 6, 9, 10, 11, 23])
+def test_ring_buffer_wraparound(count):
+    buffer = RingBuffer(capacity=5)
+    for i in range(count):
+        buffer.append(1000 + i, float(i))
+    expected = list(range(max(0, count - 5), count))
+    timestamps, weights = buffer.view()
+    assert len(buffer) == len(expected)
+    assert timestamps.tolist() == [1000 + i for i in expected]
+    assert weights.tolist() == [float(i) for i in expected]
+    assert buffer.items() == [(1000 + i, float(i)) for i in expected]
+    # 두 벌로 써 둔 배열의 같은 칸은 항상 같은 값입니다
+    assert np.array_equal(buffer.timestamps[:5], buffer.timestamps[5:])
+    assert np.array_equal(buffer.weights[:5], buffer.weights[5:])
+
+def test_ring_buffer_view_is_contiguous_and_clear_resets():
+    buffer = RingBuffer(capacity=3)
+    for i in range(7):
+        buffer.append(i, float(i))
+        timestamps, _ = buffer.view()
+        assert timestamps.base is buffer.timestamps and np.all(np.diff(timestamps) == 1)
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.items() == []
+    buffer.append(42, 1.0)
+    assert buffer.items() == [(42, 1.0)]
+
+def reading(second, weight):
+    return {"loadcel": "1", "current_weight": str(weight), "remaining_sec": "600",
+            "timestamp": f"2025-01-01T09:00:{second:02d}"}
+
+def test_history_since_and_tare():
+    store = LoadcellStore(history_length=4)
+    store.ingest([reading(second, 500 - second * 10) for second in range(6)])
+    timestamps, weights = store.history("1")
+    # 용량(4)을 넘긴 앞의 두 읽기는 사라지고 오래된 것부터 남습니다
+    assert timestamps.astype(str).tolist() == [f"2025-01-01T09:00:0{s}.000" for s in range(2, 6)]
+    assert weights.tolist() == [480, 470, 460, 450]
+    # since 시각과 같은 점은 빼고 그 이후만 남깁니다
+    _, weights = store.history("1", since="2025-01-01T09:00:03")
+    assert weights.tolist() == [460, 450]
+    # 영점을 빼고 0 미만은 0으로 자릅니다
+    _, weights = store.history("1", tare_offset=465)
+    assert weights.tolist() == [15, 5, 0, 0]
+    timestamps, weights = store.history("unknown")
+    assert len(timestamps) == 0 and timestamps.dtype == np.dtype("datetime64[ms]") and weights.dtype == np.float32
+
+def test_history_is_a_copy():
+    store = LoadcellStore(history_length=3)
+    store.ingest([reading(0, 500)])
+    _, weights = store.history("1")
+    store.ingest([reading(second, 100) for second in range(1, 4)])
+    assert weights.tolist() == [500]
@@ -0,0 +1,37 @@
+"""히스토리 캐시 원시 읽기: 읽기가 없는 구간/폴대는 같은 열의 빈 결과를, 읽기가 있으면 폴대별 변화량을 반환합니다."""
+
+import pandas as pd
+
+from history_cache import HistoryCache
+from sql_analytics import _READING_COLUMNS, SqlAnalytics
+
+def make_cache(root):
+    cache = HistoryCache(root=str(root), sync_interval=0, table=object(), loadcell_table=object())
+    for loadcel, weights in (("1", [500.0, 490.0, 560.0]), ("2", [300.0, 280.0])):
+        cache._append(loadcel, [
+            {"timestamp": f"2025-01-01T09:0{i}:00", "current_weight_history": weight, "remaining_sec_history": 3600}
+            for i, weight in enumerate(weights)
+        ])
+    return cache
+
+def test_empty_selection(tmp_path):
+    # 아직 동기화된 파티션이 없는 캐시
+    empty = HistoryCache(root=str(tmp_path), sync_interval=0, table=object(), loadcell_table=object())
+    assert empty.load().empty and isinstance(empty.load()["timestamp"].dtype, pd.DatetimeTZDtype)
+    assert list(SqlAnalytics(str(tmp_path)).readings()) == _READING_COLUMNS
+    # 읽기가 없는 구간/폴대
+    cache = make_cache(tmp_path)
+    engine = SqlAnalytics(cache.root)
+    for rows in (engine.readings("2025-02-01", "2025-02-02"), engine.readings(loadcels=["9"]), engine.readings(loadcels=[])):
+        assert rows.empty and list(rows) == _READING_COLUMNS
+    assert cache.load(loadcels=[]).empty and list(cache.load(loadcels=[])) == list(cache.load())
+
+def test_per_pole_changes(tmp_path):
+    rows = SqlAnalytics(make_cache(tmp_path).root).readings()
+    assert rows["loadcel"].tolist() == ["1", "1", "1", "2", "2"]
+    # 폴대가 바뀌는 행에는 직전 무게가 없습니다
+    assert rows["prev_weight"].isna().tolist() == [True, False, False, True, False]
+    assert rows["usage"].fillna(0).tolist() == [0, 0.01, 0, 0, 0.02]
+    assert rows["diff"].fillna(0).tolist() == [0, 10, 70, 0, 20]
+    assert (rows["hour"] == 9).all()
+    assert isinstance(rows["timestamp"].dtype, pd.DatetimeTZDtype)
@@ -0,0 +1,27 @@
+"""
+WebSocket 수신 테스트
+
+한 프레임에 객체가 아닌 항목(숫자, 문자열, null, 배열)이 섞여 있거나 프레임 자체가 객체가 아니어도
+LoadcellIngestService가 예외 없이 나머지 항목을 저장소에 반영하는지 확인합니다.
+"""
+
+import json
+
+from ws_ingest import LoadcellIngestService
+
+def test_skips_non_object_items():
+    service = LoadcellIngestService(url="ws://unused")
+    frame = [
+        {"type": "hello", "epoch": "e1"},
+        42, "1", None, ["nested"],
+        {"loadcel": "1", "current_weight": "500", "remaining_sec": "600", "timestamp": "2025-01-01T09:00:00", "seq": 3},
+    ]
+    service._on_message(None, json.dumps(frame))
+    assert service.epoch == "e1" and service.last_seq == 3
+    assert service.store.snapshot().data["1"]["current_weight"] == 500
+
+def test_non_object_frame_is_ignored():
+    service = LoadcellIngestService(url="ws://unused")
+    for message in ("17", '"text"', "null", "not json"):
+        service._on_message(None, message)
+    assert service.store.snapshot().data == {} and service.last_seq == 0
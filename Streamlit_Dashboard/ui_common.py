@@ -0,0 +1,58 @@
+import functools
+import os
+import time
+from collections import defaultdict
+import streamlit as st
+from ws_ingest import get_ingest_service
+
+# 실시간 숫자(metric) 갱신 주기 (초)
+METRICS_REFRESH_SECONDS = float(os.environ.get("METRICS_REFRESH_SECONDS", "1"))
+# 실시간 그래프 갱신 주기 (초)
+CHART_REFRESH_SECONDS = float(os.environ.get("CHART_REFRESH_SECONDS", "5"))
+# 알림 목록 갱신 주기 (초)
+ALERT_REFRESH_SECONDS = float(os.environ.get("ALERT_REFRESH_SECONDS", "1"))
+
+# 프래그먼트 이름 -> 실행 횟수 / 누적 CPU 시간(초) (bench_session_cpu.py에서 사용)
+fragment_stats = defaultdict(lambda: {"runs": 0, "cpu_sec": 0.0})
+
+def live_fragment(name, run_every):
+    """run_every초마다 자기 영역만 다시 그리는 st.fragment (실행마다 CPU 시간을 기록합니다)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.process_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats = fragment_stats[name]
+                stats["runs"] += 1
+                stats["cpu_sec"] += time.process_time() - started
+        return st.fragment(wrapper, run_every=run_every)
+    return decorator
+
+# 알림 ID(규칙) -> 사이드바 표시 방식 (1: 투여 완료, 2: 거의 다 됨, 3: 배터리 부족, 4: 너스콜)
+ALERT_STYLES = {1: st.success, 2: st.warning, 3: st.error, 4: st.error}
+
+@live_fragment("alerts", ALERT_REFRESH_SECONDS)
+def _alert_panel():
+    # 알림 조건은 서버(websockets/alert_engine.py)에서 평가하므로 세션은 받은 알림 목록만 그립니다
+    # 알림 버전이 그대로여도 다시 그립니다. 프래그먼트가 다시 실행될 때 그리지 않은 요소는 화면에서 지워지고,
+    # 바뀐 경우에만 다시 실행하려면 페이지 전체를 다시 실행해야 하기 때문입니다 (알림 몇 개를 그리는 비용이 더 작습니다)
+    active = get_ingest_service().store.alerts().active
+    st.markdown("### 📋 알림")
+    if active:
+        for alert in active.values():
+            ALERT_STYLES.get(alert.get("rule"), st.info)(alert.get("msg", ""))
+    else:
+        st.info("새로운 알림이 없습니다.")
+
+def render_alert_sidebar():
+    """사이드바에 알림 목록을 그립니다. 페이지 전체가 아니라 이 영역만 주기적으로 갱신됩니다."""
+    with st.sidebar:
+        _alert_panel()
+
+@live_fragment("loadcell_ids", METRICS_REFRESH_SECONDS)
+def rerun_on_new_loadcells(rendered_ids):
+    """화면에 그린 로드셀 목록과 저장소의 로드셀 목록이 달라지면 페이지 전체를 한 번 다시 실행합니다."""
+    if set(get_ingest_service().store.snapshot().data.keys()) != set(rendered_ids):
+        st.rerun()
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# 보고서 기간 단위별 기간 키 형식 (보고서 페이지의 기존 형식과 같습니다)
+PERIOD_FORMATS = {"month": "%Y-%m", "week": "%Y-%U", "day": "%Y-%m-%d"}
+
+_MS_PER_HOUR = 3600 * 1000
+_COLUMNS = ["loadcel", "hour", "usage_g", "count", "weight_sum", "weight_min", "weight_max"]
+
+class UsageCube:
+    """(폴대, 시간) 버킷별 사용량 롤업
+
+    버킷마다 사용량(직전 읽기보다 줄어든 무게의 합, g), 측정 수, 무게 합/최솟값/최댓값을 보관하므로
+    일/주/월 합계, 시간대별 히트맵, 폴대 랭킹, 기간별 통계를 원시 읽기 대신 버킷 수에 비례하는 비용으로 계산합니다.
+    add()는 폴대별 마지막 읽기 이후의 읽기만 반영하므로 같은 읽기를 다시 넣어도 두 번 세지 않습니다.
+
+    롤업은 브로드캐스터가 아니라 대시보드 쪽 HistoryCache가 새 항목을 파티션에 쓸 때 함께 갱신합니다.
+    (롤업 파일을 읽는 쪽이 대시보드 서버이고, 파티션과 같은 하이 워터 마크로 움직여 둘이 어긋나지 않습니다)
+    따라서 롤업은 페이지가 get_usage_cube()로 동기화할 때만 움직이며, 최대 HISTORY_SYNC_INTERVAL_SECONDS만큼 늦습니다.
+    """
+
+    def __init__(self, timezone="Asia/Seoul"):
+        self.timezone = timezone
+        self.lock = threading.Lock()
+        # (loadcel, 시간 시작 UTC ms) -> [사용량, 측정 수, 무게 합, 최솟값, 최댓값]
+        self.buckets = {}
+        # loadcel -> (마지막 읽기 UTC ms, 마지막 무게)
+        self.last = {}
+        self.version = 0
+        self._frame = None
+
+    def add(self, loadcel, timestamps, weights):
+        """시간순으로 정렬된 한 폴대의 새 읽기(UTC 시각, 무게 g)를 반영하고 반영한 개수를 반환합니다."""
+        loadcel = str(loadcel)
+        ms = pd.DatetimeIndex(timestamps).as_unit("ms").asi8
+        weights = np.asarray(weights, dtype=np.float64)
+        valid = ~np.isnan(weights)
+        ms, weights = ms[valid], weights[valid]
+        with self.lock:
+            last_ms, last_weight = self.last.get(loadcel, (None, np.nan))
+            if last_ms is not None:
+                newer = ms > last_ms
+                ms, weights = ms[newer], weights[newer]
+            if len(ms) == 0:
+                return 0
+            previous = np.concatenate(([last_weight], weights[:-1]))
+            usage = np.nan_to_num(np.clip(previous - weights, 0, None))
+            hours = ms - ms % _MS_PER_HOUR
+            # 읽기 수가 아니라 새 읽기가 걸친 시간 버킷 수만큼만 사전을 갱신합니다
+            starts = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1]])
+            usage_sums = np.add.reduceat(usage, starts)
+            weight_sums = np.add.reduceat(weights, starts)
+            mins = np.minimum.reduceat(weights, starts)
+            maxs = np.maximum.reduceat(weights, starts)
+            counts = np.diff(np.r_[starts, len(ms)])
+            for i, start in enumerate(starts):
+                key = (loadcel, int(hours[start]))
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    self.buckets[key] = [usage_sums[i], int(counts[i]), weight_sums[i], mins[i], maxs[i]]
+                else:
+                    bucket[0] += usage_sums[i]
+                    bucket[1] += int(counts[i])
+                    bucket[2] += weight_sums[i]
+                    bucket[3] = min(bucket[3], mins[i])
+                    bucket[4] = max(bucket[4], maxs[i])
+            self.last[loadcel] = (int(ms[-1]), float(weights[-1]))
+            self.version += 1
+            return len(ms)
+
+    def last_timestamp(self, loadcel):
+        last = self.last.get(str(loadcel))
+        return None if last is None else pd.Timestamp(last[0], unit="ms", tz="UTC")
+
+    def frame(self):
+        """전체 버킷 DataFrame (hour는 timezone 기준 시각). 버전이 같으면 다시 만들지 않습니다."""
+        cached = self._frame
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        with self.lock:
+            version = self.version
+            rows = [(loadcel, hour, *values) for (loadcel, hour), values in self.buckets.items()]
+        frame = pd.DataFrame(rows, columns=_COLUMNS)
+        frame["hour"] = pd.to_datetime(frame["hour"].astype(np.int64), unit="ms", utc=True).dt.tz_convert(self.timezone)
+        frame = frame.sort_values(["hour", "loadcel"], ignore_index=True)
+        self._frame = (version, frame)
+        return frame
+
+    def select(self, start=None, end=None, loadcels=None):
+        """[start, end) 구간과 폴대로 버킷을 고릅니다. start/end는 날짜나 Timestamp입니다."""
+        frame = self.frame()
+        mask = np.ones(len(frame), dtype=bool)
+        if start is not None:
+            mask &= (frame["hour"] >= self._localize(start)).to_numpy()
+        if end is not None:
+            mask &= (frame["hour"] < self._localize(end)).to_numpy()
+        if loadcels is not None:
+            mask &= frame["loadcel"].isin([str(l) for l in loadcels]).to_numpy()
+        return frame[mask]
+
+    def _localize(self, value):
+        value = pd.Timestamp(value)
+        return value.tz_localize(self.timezone) if value.tzinfo is None else value.tz_convert(self.timezone)
+
+    def loadcels(self):
+        return sorted(self.frame()["loadcel"].unique().tolist())
+
+    def date_range(self):
+        """(첫 날짜, 마지막 날짜), 비어 있으면 None"""
+        frame = self.frame()
+        if frame.empty:
+            return None
+        return frame["hour"].iloc[0].date(), frame["hour"].iloc[-1].date()
+
+    def usage_total(self, start=None, end=None, loadcels=None):
+        """구간 사용량 합계 (g)"""
+        return float(self.select(start, end, loadcels)["usage_g"].sum())
+
+    def hourly_usage(self, start=None, end=None, loadcels=None):
+        """폴대 × 시간별 사용량 (loadcel, hour, usage kg)"""
+        selected = self.select(start, end, loadcels)
+        return pd.DataFrame({"loadcel": selected["loadcel"], "hour": selected["hour"],
+                             "usage": selected["usage_g"] / 1000}).reset_index(drop=True)
+
+    def hour_of_day(self, start=None, end=None, loadcels=None):
+        """시간대(0~23시) × 폴대 사용량 피벗 (kg)"""
+        selected = self.select(start, end, loadcels)
+        usage = selected.groupby([selected["hour"].dt.hour.rename("hour"), "loadcel"])["usage_g"].sum() / 1000
+        return usage.unstack("loadcel", fill_value=0).round(1)
+
+    def ranking(self, start=None, end=None, loadcels=None):
+        """폴대별 사용량 (kg, 많은 순)"""
+        selected = self.select(start, end, loadcels)
+        usage = (selected.groupby("loadcel")["usage_g"].sum() / 1000).round(1)
+        return usage.sort_values(ascending=False).rename("usage").reset_index()
+
+    def _period_keys(self, frame, unit):
+        # 기간 문자열은 버킷마다가 아니라 서로 다른 날짜마다 한 번만 만듭니다
+        days = frame["hour"].dt.normalize()
+        unique_days = days.drop_duplicates()
+        keys = dict(zip(unique_days, unique_days.dt.strftime(PERIOD_FORMATS[unit])))
+        return days.map(keys)
+
+    def totals(self, unit, loadcels=None):
+        """일(day) / 주(week) / 월(month)별 폴대 사용량 (period, loadcel, usage kg)"""
+        selected = self.select(loadcels=loadcels)
+        usage = selected.groupby([self._period_keys(selected, unit).rename("period"), "loadcel"])["usage_g"].sum() / 1000
+        return usage.rename("usage").reset_index()
+
+    def periods(self, unit):
+        """데이터가 있는 기간 키 목록 (최근 순)"""
+        frame = self.frame()
+        return sorted(self._period_keys(frame, unit).unique().tolist(), reverse=True)
+
+    def period_range(self, unit, period):
+        """기간 키가 가리키는 [시작, 끝) 시각 (데이터가 있는 날짜 기준)"""
+        frame = self.frame()
+        days = frame["hour"].dt.normalize()[self._period_keys(frame, unit) == period]
+        return days.min(), days.max() + pd.Timedelta(days=1)
+
+    def period_stats(self, unit, period, loadcels=None):
+        """기간의 폴대별 측정 통계 (count, mean, min, max, sum) — 원시 읽기의 agg 결과와 같습니다."""
+        selected = self.select(loadcels=loadcels)
+        selected = selected[self._period_keys(selected, unit) == period]
+        grouped = selected.groupby("loadcel")
+        stats = pd.DataFrame({
+            "count": grouped["count"].sum(),
+            "sum": grouped["weight_sum"].sum(),
+            "min": grouped["weight_min"].min(),
+            "max": grouped["weight_max"].max(),
+        })
+        stats["mean"] = stats["sum"] / stats["count"]
+        return stats[["count", "mean", "min", "max", "sum"]]
+
+    def save(self, path):
+        """버킷과 폴대별 마지막 읽기를 한 파일에 저장합니다. (마지막 읽기는 스키마 메타데이터)"""
+        with self.lock:
+            rows = [(loadcel, hour, *values) for (loadcel, hour), values in self.buckets.items()]
+            last = {loadcel: list(value) for loadcel, value in self.last.items()}
+        frame = pd.DataFrame(rows, columns=_COLUMNS)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({b"usage_cube_last": json.dumps(last).encode()})
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, timezone="Asia/Seoul"):
+        cube = cls(timezone)
+        if not os.path.exists(path):
+            return cube
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        cube.last = {loadcel: (int(value[0]), float(value[1]))
+                     for loadcel, value in json.loads(metadata.get(b"usage_cube_last", b"{}")).items()}
+        columns = table.to_pydict()
+        for loadcel, hour, *values in zip(*(columns[name] for name in _COLUMNS)):
+            cube.buckets[(str(loadcel), int(hour))] = [float(values[0]), int(values[1]), *map(float, values[2:])]
+        cube.version = 1
+        return cube
+
+    def format_stats(self):
+        return f"[사용량 롤업] 폴대 {len(self.last)}개, 버킷 {len(self.buckets)}개, 버전 {self.version}"
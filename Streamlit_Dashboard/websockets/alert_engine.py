@@ -0,0 +1,141 @@
+import json
+import math
+import os
+import time
+from collections import deque
+
+# 장비별 기본 알림 임계값 (g), 설정 페이지에서 바꿀 수 있습니다
+DEFAULT_ALMOST_WEIGHT = 300
+DEFAULT_DONE_WEIGHT = 150
+# 배터리 부족 알림 기준 (%)
+LOW_BATTERY_PERCENT = 20
+# 알림이 켜진 뒤 이만큼 넘어서야 해제합니다 (값이 기준 근처에서 흔들릴 때 알림이 반복되지 않도록)
+ALERT_HYSTERESIS_G = float(os.environ.get("ALERT_HYSTERESIS_G", "20"))
+BATTERY_HYSTERESIS_PERCENT = 5
+# 서버가 보관하는 최근 알림 이벤트 수
+ALERT_HISTORY_SIZE = int(os.environ.get("ALERT_HISTORY_SIZE", "500"))
+# 장비별 임계값 저장 파일
+ALERT_THRESHOLDS_PATH = os.environ.get("ALERT_THRESHOLDS_PATH", "alert_thresholds.json")
+
+# 알림 규칙 ID (대시보드의 기존 알림 ID와 같습니다)
+RULE_DONE = 1
+RULE_ALMOST_DONE = 2
+RULE_LOW_BATTERY = 3
+RULE_NURSE_CALL = 4
+
+ALERT_TEMPLATES = {
+    RULE_DONE: "{pole}번 폴대의 {bottle} 수액이 다 투여되었습니다.",
+    RULE_ALMOST_DONE: "{pole}번 폴대의 {bottle} 수액이 거의 다 되었습니다. (남은 시간: {remaining_sec:.0f}분, 무게: {current_weight:.1f}g)",
+    RULE_LOW_BATTERY: "{pole}번 폴대의 배터리가 거의 방전되었습니다. (남은 배터리: {battery:.0f}%)",
+    RULE_NURSE_CALL: "{pole}번 폴대에서 너스콜이 발생했습니다."
+}
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class AlertEngine:
+    """읽기마다 (폴대, 규칙)별 상태 기계를 돌려 알림 발생/해제 이벤트를 만드는 서버 측 알림 엔진
+
+    각 (폴대, 규칙)은 정상 <-> 발생 두 상태만 가지며, 상태가 바뀔 때만 이벤트를 만듭니다.
+    따라서 보관하는 상태는 폴대 수 × 규칙 수를 넘지 않고, 이벤트 기록은 최근 ALERT_HISTORY_SIZE개만 남습니다.
+    """
+
+    def __init__(self, thresholds_path=ALERT_THRESHOLDS_PATH, history_size=ALERT_HISTORY_SIZE):
+        self.epoch = str(time.time_ns())
+        self.seq = 0
+        self.thresholds_path = thresholds_path
+        self.thresholds = {}
+        if thresholds_path and os.path.exists(thresholds_path):
+            with open(thresholds_path, encoding="utf-8") as f:
+                self.thresholds = json.load(f)
+        # (loadcel, rule) -> 발생 중인 알림 이벤트
+        self.active = {}
+        self.history = deque(maxlen=history_size)
+
+    def get_thresholds(self, loadcel):
+        thresholds = self.thresholds.get(loadcel, {})
+        return (thresholds.get("almost_weight", DEFAULT_ALMOST_WEIGHT),
+                thresholds.get("done_weight", DEFAULT_DONE_WEIGHT))
+
+    def set_thresholds(self, loadcel, almost_weight=None, done_weight=None):
+        """장비별 임계값을 바꾸고 파일에 저장합니다. 숫자로 읽을 수 없는 값이 있으면 바꾸지 않고 False를 반환합니다."""
+        current_almost, current_done = self.get_thresholds(loadcel)
+        thresholds = {}
+        for name, value, current in (("almost_weight", almost_weight, current_almost), ("done_weight", done_weight, current_done)):
+            if value is None:
+                thresholds[name] = current
+                continue
+            thresholds[name] = _to_float(value)
+            if thresholds[name] is None or not math.isfinite(thresholds[name]):
+                print(f"[알림 임계값] 잘못된 {name} 값을 무시합니다: {loadcel} {value!r}")
+                return False
+        self.thresholds[str(loadcel)] = thresholds
+        if self.thresholds_path:
+            tmp_path = f"{self.thresholds_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.thresholds, f)
+            os.replace(tmp_path, self.thresholds_path)
+        return True
+
+    def thresholds_message(self):
+        return json.dumps({"type": "alert_thresholds", "thresholds": self.thresholds})
+
+    def _transition(self, loadcel, rule, on, off, timestamp, params):
+        """on이면 발생, off이면 해제, 둘 다 아니면 (히스테리시스 구간) 현재 상태를 유지합니다."""
+        key = (loadcel, rule)
+        active = key in self.active
+        if not active and on:
+            self.seq += 1
+            event = {
+                "type": "alert", "id": f"{self.epoch}-{self.seq}", "rule": rule, "loadcel": loadcel,
+                "state": "active", "msg": ALERT_TEMPLATES[rule].format(pole=loadcel, **params),
+                "timestamp": timestamp
+            }
+            self.active[key] = event
+        elif active and off:
+            event = dict(self.active.pop(key), state="cleared", timestamp=timestamp)
+        else:
+            return None
+        self.history.append(event)
+        return event
+
+    def evaluate(self, loadcel, data):
+        """읽기 하나를 평가하여 상태가 바뀐 알림 이벤트 목록을 반환합니다."""
+        events = []
+        timestamp = data.get("timestamp")
+        weight = _to_float(data.get("current_weight"))
+        # 0g 이하는 수액이 연결되지 않은 것이므로 무게 알림 상태를 그대로 둡니다
+        if weight is not None and weight > 0:
+            almost_weight, done_weight = self.get_thresholds(loadcel)
+            # 서버 추정값(rate_estimator.py)이 있으면 사용하며, 메시지에는 분 단위로 표시합니다
+            remaining_sec = _to_float(data.get("est_remaining_sec", data.get("remaining_sec")))
+            remaining_min = remaining_sec / 60 if remaining_sec is not None and remaining_sec > 0 else -1
+            params = {"bottle": "오른쪽", "remaining_sec": remaining_min, "current_weight": weight}
+            for rule, threshold in ((RULE_ALMOST_DONE, almost_weight), (RULE_DONE, done_weight)):
+                event = self._transition(loadcel, rule, weight <= threshold, weight > threshold + ALERT_HYSTERESIS_G,
+                                         timestamp, params)
+                if event:
+                    events.append(event)
+        battery = _to_float(data.get("battery"))
+        if battery is not None:
+            event = self._transition(loadcel, RULE_LOW_BATTERY, battery <= LOW_BATTERY_PERCENT,
+                                     battery > LOW_BATTERY_PERCENT + BATTERY_HYSTERESIS_PERCENT,
+                                     timestamp, {"battery": battery})
+            if event:
+                events.append(event)
+        if "nurse_call" in data:
+            nurse_call = data["nurse_call"] in (True, "true", "True", "1", 1)
+            event = self._transition(loadcel, RULE_NURSE_CALL, nurse_call, not nurse_call, timestamp, {})
+            if event:
+                events.append(event)
+        return events
+
+    def active_events(self):
+        """현재 발생 중인 알림 목록 (발생 순서)"""
+        return sorted(self.active.values(), key=lambda event: int(event["id"].rsplit("-", 1)[1]))
+
+    def format_stats(self):
+        return f"[알림 엔진] 발생 중: {len(self.active)}개, 기록: {len(self.history)}개, 누적 이벤트: {self.seq}개"
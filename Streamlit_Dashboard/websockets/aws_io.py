@@ -0,0 +1,28 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# 동시에 진행할 수 있는 최대 AWS 호출 수
+AWS_MAX_IN_FLIGHT = int(os.environ.get("AWS_MAX_IN_FLIGHT", "4"))
+
+# boto3 호출 전용 스레드 풀 (이벤트 루프의 기본 실행기와 분리)
+aws_executor = ThreadPoolExecutor(max_workers=AWS_MAX_IN_FLIGHT, thread_name_prefix="aws-io")
+
+_in_flight = None
+
+def _get_semaphore():
+    # 세마포어는 실행 중인 이벤트 루프 안에서 만들어야 합니다
+    global _in_flight
+    if _in_flight is None:
+        _in_flight = asyncio.Semaphore(AWS_MAX_IN_FLIGHT)
+    return _in_flight
+
+async def run_aws(func, *args, **kwargs):
+    """블로킹 boto3 호출을 전용 스레드 풀에서 실행하고 결과를 기다립니다."""
+    async with _get_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(aws_executor, partial(func, *args, **kwargs))
+
+def shutdown():
+    aws_executor.shutdown(wait=True)
@@ -0,0 +1,56 @@
+# 과거 기록 이상 탐지 백필
+# loadcell_history 전체를 스캔하여 outlier_detector.detect_frame()(일괄 모드)으로 이상 이벤트를 찾고
+# 서버가 읽기마다 기록하는 것과 같은 형식으로 loadcell_anomaly 테이블에 기록합니다.
+# 같은 (loadcel, timestamp) 키는 덮어쓰므로 여러 번 실행해도 됩니다.
+#
+# 실행: python backfill_anomalies.py [폴대 ID ...]  (생략하면 모든 폴대)
+
+import asyncio
+import os
+import sys
+import time
+import boto3
+import pandas as pd
+
+from batch_writer import BatchWriter
+from dynamo_scan import format_timings, scan_table_parallel
+from history_compression import parse_timestamp
+from outlier_detector import KIND_DRIFT, KIND_JUMP, anomaly_item, detect_frame
+
+AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
+HISTORY_TABLE_NAME = os.environ.get("DYNAMODB_HISTORY_TABLE", "loadcell_history")
+ANOMALY_TABLE_NAME = os.environ.get("DYNAMODB_ANOMALY_TABLE", "loadcell_anomaly")
+
+def load_history(client, loadcels=None):
+    """loadcell_history를 detect_frame()에 넣을 DataFrame(loadcel, t, current_weight, timestamp)으로 읽습니다."""
+    items, timings = scan_table_parallel(client, HISTORY_TABLE_NAME)
+    print(format_timings(timings))
+    frame = pd.DataFrame({
+        "loadcel": [item['loadcel']['S'] for item in items],
+        "timestamp": [item['timestamp']['S'] for item in items],
+        "current_weight": [item.get('current_weight_history', {}).get('S') for item in items],
+    })
+    if loadcels:
+        frame = frame[frame["loadcel"].isin(loadcels)].copy()
+    frame["current_weight"] = pd.to_numeric(frame["current_weight"], errors="coerce")
+    frame["t"] = [parse_timestamp(timestamp) for timestamp in frame["timestamp"]]
+    return frame
+
+async def main():
+    loadcels = sys.argv[1:]
+    client = boto3.client('dynamodb', region_name=AWS_REGION)
+    started = time.perf_counter()
+    frame = load_history(client, loadcels)
+    events = detect_frame(frame)
+    jumps = sum(event["kind"] == KIND_JUMP for event in events)
+    drifts = sum(event["kind"] == KIND_DRIFT for event in events)
+    print(f"[백필] 폴대 {frame['loadcel'].nunique()}개, 읽기 {len(frame)}개 -> 급변 {jumps}개, 속도 변화 {drifts}개 "
+          f"({time.perf_counter() - started:.1f}초)")
+
+    writer = BatchWriter(client, ANOMALY_TABLE_NAME, key_attrs=('loadcel', 'timestamp'), max_buffer=max(1, len(events)))
+    for event in events:
+        writer.add(anomaly_item(event))
+    await writer.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
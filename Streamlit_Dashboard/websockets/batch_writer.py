@@ -0,0 +1,113 @@
+import asyncio
+import os
+from collections import deque
+from aws_io import run_aws
+
+# batch_write_item 한 번에 보낼 수 있는 최대 항목 수 (DynamoDB 제한)
+BATCH_SIZE = 25
+# 버퍼를 비우는 주기 (초)
+FLUSH_INTERVAL_SECONDS = float(os.environ.get("BATCH_FLUSH_INTERVAL_SECONDS", "2"))
+# 버퍼 최대 크기. 넘치면 가장 오래된 항목부터 버립니다
+MAX_BUFFER_SIZE = int(os.environ.get("BATCH_MAX_BUFFER_SIZE", "10000"))
+# UnprocessedItems 재시도 횟수와 첫 대기 시간 (초, 지수 백오프)
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.1
+
+class BatchWriter:
+    """항목을 모아 두었다가 batch_write_item으로 25개씩 기록하는 백그라운드 작성기"""
+
+    def __init__(self, client, table_name, key_attrs,
+                 flush_interval=FLUSH_INTERVAL_SECONDS, max_buffer=MAX_BUFFER_SIZE):
+        self.client = client
+        self.table_name = table_name
+        # 한 배치 안에 같은 키가 두 번 들어가면 요청 전체가 거부되므로 키 속성으로 중복을 제거합니다
+        self.key_attrs = key_attrs
+        self.flush_interval = flush_interval
+        self.buffer = deque(maxlen=max_buffer)
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.task = None
+        self.stats = {"written": 0, "requests": 0, "retried": 0, "dropped": 0, "failed": 0}
+
+    def add(self, item):
+        """DynamoDB 타입 형식({'S': ...})의 항목을 버퍼에 넣습니다."""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.stats["dropped"] += 1
+        self.buffer.append(item)
+        if len(self.buffer) >= BATCH_SIZE:
+            self.wakeup.set()
+
+    def _take_chunk(self):
+        chunk = {}
+        while self.buffer and len(chunk) < BATCH_SIZE:
+            item = self.buffer[0]
+            key = tuple(str(item.get(attr)) for attr in self.key_attrs)
+            # 같은 키는 나중 값으로 덮어씁니다
+            chunk[key] = self.buffer.popleft()
+        return list(chunk.values())
+
+    async def _write_chunk(self, chunk):
+        request = {self.table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+        for attempt in range(MAX_RETRIES + 1):
+            response = await run_aws(self.client.batch_write_item, RequestItems=request)
+            self.stats["requests"] += 1
+            unprocessed = response.get('UnprocessedItems', {})
+            remaining = len(unprocessed.get(self.table_name, []))
+            self.stats["written"] += len(request[self.table_name]) - remaining
+            if not remaining:
+                return
+            if attempt == MAX_RETRIES:
+                break
+            # 처리되지 못한 항목만 지수 백오프 후 다시 보냅니다
+            self.stats["retried"] += remaining
+            request = unprocessed
+            await asyncio.sleep(RETRY_BASE_DELAY * (2 ** attempt))
+        self.stats["failed"] += remaining
+        print(f"[배치 기록 실패] {self.table_name}: 재시도 후에도 {remaining}개 미처리")
+
+    async def flush(self):
+        """버퍼에 쌓인 항목을 모두 기록합니다."""
+        while self.buffer:
+            chunk = self._take_chunk()
+            try:
+                await self._write_chunk(chunk)
+            except Exception as e:
+                # 다음 주기에 다시 시도하도록 버퍼 앞쪽에 되돌려 놓습니다
+                print(f"[배치 기록 오류] {self.table_name}: {e}")
+                self._requeue(chunk)
+                return
+
+    def _requeue(self, chunk):
+        """기록하지 못한 묶음을 버퍼 앞쪽에 되돌립니다.
+
+        그 사이 버퍼가 차 있으면 extendleft가 가장 새 항목을 조용히 밀어내므로,
+        add()와 같이 가장 오래된 항목(묶음의 앞쪽)부터 들어갈 자리만큼만 남기고 버린 수를 셉니다.
+        """
+        free = self.buffer.maxlen - len(self.buffer)
+        if len(chunk) > free:
+            dropped = len(chunk) - free
+            self.stats["dropped"] += dropped
+            print(f"[배치 기록 오류] {self.table_name}: 버퍼가 가득 차 재시도할 항목 {dropped}개를 버립니다")
+            chunk = chunk[dropped:]
+        self.buffer.extendleft(reversed(chunk))
+
+    async def run(self):
+        while not self.closed:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def close(self):
+        """주기 작업을 멈추고 남은 항목을 모두 기록한 뒤 종료합니다."""
+        self.closed = True
+        self.wakeup.set()
+        if self.task is not None:
+            await self.task
+        await self.flush()
+        print(f"[배치 기록 종료] {self.table_name}: {self.stats}")
@@ -0,0 +1,86 @@
+# 이벤트 루프 지연 벤치마크
+# DynamoDB 대신 지연 시간을 흉내 내는 로컬 클라이언트를 사용하여
+# boto3 호출을 루프에서 직접 실행할 때와 aws_io.run_aws()로 넘길 때의 루프 지연을 비교합니다.
+#
+# 실행: python bench_event_loop_lag.py [폴링 횟수] [로드셀 수] [호출당 지연(ms)]
+
+import asyncio
+import statistics
+import sys
+import time
+
+from aws_io import run_aws
+
+class LocalDynamoDB:
+    """scan/put_item 호출마다 네트워크 왕복 시간만큼 블로킹하는 DynamoDB 대역"""
+
+    def __init__(self, pole_count, latency_sec):
+        self.latency_sec = latency_sec
+        self.items = [
+            {
+                'loadcel': {'S': str(i)},
+                'current_weight': {'S': str(500 - i % 100)},
+                'remaining_sec': {'S': '3600'},
+                'timestamp': {'S': '2025-01-01T00:00:00+09:00'}
+            }
+            for i in range(pole_count)
+        ]
+
+    def scan(self, **kwargs):
+        time.sleep(self.latency_sec)
+        return {'Items': self.items}
+
+    def put_item(self, **kwargs):
+        time.sleep(self.latency_sec)
+        return {}
+
+async def measure_lag(stop, samples, interval=0.005):
+    """interval마다 깨어나 예정 시각보다 얼마나 늦게 깨어났는지 기록합니다."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+async def poll_blocking(client, polls, writes):
+    for _ in range(polls):
+        client.scan(TableName='loadcell')
+        for _ in range(writes):
+            client.put_item(Item={})
+        await asyncio.sleep(0)
+
+async def poll_offloaded(client, polls, writes):
+    for _ in range(polls):
+        await run_aws(client.scan, TableName='loadcell')
+        await asyncio.gather(*[run_aws(client.put_item, Item={}) for _ in range(writes)])
+
+async def run_case(poller, client, polls, writes):
+    stop = asyncio.Event()
+    samples = []
+    lag_task = asyncio.create_task(measure_lag(stop, samples))
+    started = time.perf_counter()
+    await poller(client, polls, writes)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    return elapsed, samples
+
+def report(name, elapsed, samples):
+    samples_ms = sorted(s * 1000 for s in samples) or [0.0]
+    p99 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.99))]
+    print(
+        f"{name:<10} 소요: {elapsed:6.2f}s  루프 지연 평균: {statistics.mean(samples_ms):7.2f}ms  "
+        f"p99: {p99:7.2f}ms  최대: {samples_ms[-1]:7.2f}ms"
+    )
+
+async def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    poles = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    client = LocalDynamoDB(poles, latency_ms / 1000)
+    print(f"폴링 {polls}회, 로드셀 {poles}개, 호출당 지연 {latency_ms}ms")
+    report("before", *await run_case(poll_blocking, client, polls, poles))
+    report("after", *await run_case(poll_offloaded, client, polls, poles))
+
+if __name__ == "__main__":
+    asyncio.run(main())
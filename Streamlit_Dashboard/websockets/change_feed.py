@@ -0,0 +1,251 @@
+import json
+import os
+import time
+
+# 수집 방식: scan(전체 테이블 폴링) | stream(DynamoDB Streams) | file(로컬 JSON Lines 파일)
+INGEST_MODE = os.environ.get("INGEST_MODE", "scan")
+# 변경 스트림 폴링 간격 (초)
+STREAM_POLL_INTERVAL_SECONDS = float(os.environ.get("STREAM_POLL_INTERVAL_SECONDS", "0.2"))
+# 샤드별 체크포인트 저장 파일 (소비자마다 이름 뒤에 소비자 이름을 붙인 파일을 따로 씁니다)
+STREAM_CHECKPOINT_PATH = os.environ.get("STREAM_CHECKPOINT_PATH", "stream_checkpoints.json")
+# DynamoDB Streams ARN (비어 있으면 테이블 정보에서 찾습니다)
+DYNAMODB_STREAM_ARN = os.environ.get("DYNAMODB_STREAM_ARN", "")
+# 체크포인트가 없는 샤드를 처음 읽을 위치 (LATEST | TRIM_HORIZON)
+STREAM_INITIAL_POSITION = os.environ.get("STREAM_INITIAL_POSITION", "LATEST")
+# 샤드 목록을 다시 조회하는 간격 (초)
+SHARD_REFRESH_SECONDS = 60
+# file 모드에서 읽을 스트림 파일
+STREAM_FILE_PATH = os.environ.get("STREAM_FILE_PATH", "loadcell_stream.jsonl")
+
+class CheckpointStore:
+    """샤드 ID -> 마지막으로 처리한 시퀀스 번호(또는 파일 오프셋)를 JSON 파일에 보관합니다."""
+
+    def __init__(self, path=STREAM_CHECKPOINT_PATH):
+        self.path = path
+        self.positions = {}
+        self.dirty = False
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.positions = json.load(f)
+
+    def get(self, shard_id):
+        return self.positions.get(shard_id)
+
+    def update(self, shard_id, position):
+        self.positions[shard_id] = position
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty or not self.path:
+            return
+        # 중간에 종료되어도 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체합니다
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.positions, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+def checkpoint_path(consumer, path=STREAM_CHECKPOINT_PATH):
+    """소비자별 체크포인트 파일 경로 (예: stream_checkpoints.json -> stream_checkpoints.relay.json)
+
+    같은 스트림을 읽는 프로세스들이 서로의 위치를 덮어쓰지 않도록 파일을 나눕니다.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{consumer}{ext}"
+
+def _new_images(records):
+    """스트림 레코드에서 INSERT/MODIFY의 NewImage만 꺼냅니다. (scan 결과와 같은 형식)"""
+    return [
+        record['dynamodb']['NewImage']
+        for record in records
+        if record.get('eventName') in ('INSERT', 'MODIFY') and 'NewImage' in record.get('dynamodb', {})
+    ]
+
+class DynamoDBStreamSource:
+    """DynamoDB Streams 샤드 이터레이터로 변경분만 읽어 옵니다."""
+
+    def __init__(self, streams_client, stream_arn, checkpoints):
+        self.client = streams_client
+        self.stream_arn = stream_arn
+        self.checkpoints = checkpoints
+        self.iterators = {}
+        self.parents = {}
+        self.finished = set()
+        self.pending = {}
+        # poll()로 받은 다음 이터레이터 (None이면 닫힌 샤드를 끝까지 읽음). commit() 때 반영합니다
+        self.next_iterators = {}
+        self.last_refresh = 0.0
+
+    def _list_shards(self):
+        shards = []
+        kwargs = {"StreamArn": self.stream_arn}
+        while True:
+            description = self.client.describe_stream(**kwargs)['StreamDescription']
+            shards.extend(description.get('Shards', []))
+            last_shard = description.get('LastEvaluatedShardId')
+            if not last_shard:
+                return shards
+            kwargs['ExclusiveStartShardId'] = last_shard
+
+    def _refresh_shards(self):
+        self.last_refresh = time.monotonic()
+        for shard in self._list_shards():
+            shard_id = shard['ShardId']
+            self.parents[shard_id] = shard.get('ParentShardId')
+            if shard_id in self.iterators or shard_id in self.finished:
+                continue
+            # 같은 키의 순서를 지키기 위해 부모 샤드를 다 읽은 뒤에 자식 샤드를 읽습니다
+            if self.parents[shard_id] in self.iterators:
+                continue
+            sequence = self.checkpoints.get(shard_id)
+            if sequence:
+                response = self.client.get_shard_iterator(
+                    StreamArn=self.stream_arn, ShardId=shard_id,
+                    ShardIteratorType='AFTER_SEQUENCE_NUMBER', SequenceNumber=sequence
+                )
+            else:
+                # 실행 중에 새로 생긴 샤드는 처음부터, 최초 실행 시에는 설정된 위치부터 읽습니다
+                position = 'TRIM_HORIZON' if self.parents[shard_id] else STREAM_INITIAL_POSITION
+                response = self.client.get_shard_iterator(
+                    StreamArn=self.stream_arn, ShardId=shard_id, ShardIteratorType=position
+                )
+            self.iterators[shard_id] = response['ShardIterator']
+
+    def poll(self):
+        """모든 활성 샤드에서 새 레코드를 읽어 NewImage 목록을 반환합니다.
+
+        commit() 전에 다시 호출하면 (처리 중 오류가 난 경우) 마지막으로 커밋한 위치부터 다시 읽습니다.
+        """
+        if not self.iterators or time.monotonic() - self.last_refresh >= SHARD_REFRESH_SECONDS:
+            self._refresh_shards()
+        self.pending.clear()
+        self.next_iterators.clear()
+        images = []
+        for shard_id, iterator in list(self.iterators.items()):
+            try:
+                response = self.client.get_records(ShardIterator=iterator, Limit=1000)
+            except Exception as e:
+                # 만료된 이터레이터는 다음 샤드 갱신 때 체크포인트 위치에서 다시 만듭니다
+                print(f"[스트림] 샤드 {shard_id} 읽기 실패: {e}")
+                del self.iterators[shard_id]
+                self.last_refresh = 0.0
+                continue
+            records = response.get('Records', [])
+            if records:
+                images.extend(_new_images(records))
+                self.pending[shard_id] = records[-1]['dynamodb']['SequenceNumber']
+            # 이터레이터는 처리가 끝난 뒤(commit)에 옮깁니다
+            self.next_iterators[shard_id] = response.get('NextShardIterator')
+        return images
+
+    def commit(self):
+        """poll()로 받은 레코드를 처리한 뒤 호출하여 이터레이터를 옮기고 체크포인트를 저장합니다."""
+        for shard_id, next_iterator in self.next_iterators.items():
+            if next_iterator is None:
+                # 닫힌 샤드를 끝까지 읽었으면 자식 샤드를 읽을 수 있도록 샤드 목록을 갱신합니다
+                self.iterators.pop(shard_id, None)
+                self.finished.add(shard_id)
+                self.last_refresh = 0.0
+            else:
+                self.iterators[shard_id] = next_iterator
+        self.next_iterators.clear()
+        for shard_id, sequence in self.pending.items():
+            self.checkpoints.update(shard_id, sequence)
+        self.pending.clear()
+        self.checkpoints.save()
+
+class FileStreamSource:
+    """JSON Lines 파일에 한 줄씩 추가되는 스트림 레코드를 읽는 테스트용 스트림 대역
+
+    각 줄은 DynamoDB Streams 레코드와 같은 형식입니다.
+    예: {"eventName": "MODIFY", "dynamodb": {"NewImage": {...}, "SequenceNumber": "1"}}
+    """
+
+    def __init__(self, path, checkpoints):
+        self.path = path
+        self.shard_id = f"file:{os.path.abspath(path)}"
+        self.checkpoints = checkpoints
+        self.offset = checkpoints.get(self.shard_id) or 0
+        self.pending = None
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        # commit() 전에 다시 호출하면 마지막으로 커밋한 위치부터 다시 읽습니다
+        offset = self.offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                # 아직 다 써지지 않은 마지막 줄은 다음 폴링에서 읽습니다
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                if line.strip():
+                    records.append(json.loads(line))
+        self.pending = offset
+        return _new_images(records)
+
+    def commit(self):
+        if self.pending is None:
+            return
+        self.offset = self.pending
+        self.pending = None
+        self.checkpoints.update(self.shard_id, self.offset)
+        self.checkpoints.save()
+
+class InMemoryStreamSource:
+    """프로세스 안에서 put()으로 레코드를 넣는 스트림 대역"""
+
+    def __init__(self, checkpoints=None, shard_id="memory"):
+        self.records = []
+        self.shard_id = shard_id
+        self.checkpoints = checkpoints or CheckpointStore(path=None)
+        self.position = self.checkpoints.get(shard_id) or 0
+        self.pending = None
+
+    def put(self, new_image, event_name="MODIFY"):
+        sequence = str(len(self.records) + 1)
+        self.records.append({
+            "eventName": event_name,
+            "dynamodb": {"NewImage": new_image, "SequenceNumber": sequence}
+        })
+
+    def poll(self):
+        records = self.records[self.position:]
+        self.pending = len(self.records)
+        return _new_images(records)
+
+    def commit(self):
+        if self.pending is None:
+            return
+        self.position = self.pending
+        self.pending = None
+        self.checkpoints.update(self.shard_id, self.position)
+        self.checkpoints.save()
+
+def append_record(path, new_image, event_name="MODIFY"):
+    """file 모드 테스트용: 스트림 파일 끝에 레코드 한 줄을 추가합니다."""
+    sequence = str(time.time_ns())
+    record = {"eventName": event_name, "dynamodb": {"NewImage": new_image, "SequenceNumber": sequence}}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def create_change_source(mode, dynamodb_client, table_name, region_name, consumer):
+    """INGEST_MODE에 맞는 변경 스트림 소스를 만듭니다. scan 모드면 None을 반환합니다.
+
+    consumer는 체크포인트를 따로 저장할 소비자 이름입니다. (프로세스마다 달라야 합니다)
+    """
+    if mode == "scan":
+        return None
+    checkpoints = CheckpointStore(checkpoint_path(consumer))
+    if mode == "file":
+        print(f"[스트림] 파일 스트림 사용: {STREAM_FILE_PATH}")
+        return FileStreamSource(STREAM_FILE_PATH, checkpoints)
+    if mode == "stream":
+        import boto3
+        stream_arn = DYNAMODB_STREAM_ARN or dynamodb_client.describe_table(TableName=table_name)['Table']['LatestStreamArn']
+        print(f"[스트림] DynamoDB Streams 사용: {stream_arn}")
+        streams_client = boto3.client('dynamodbstreams', region_name=region_name)
+        return DynamoDBStreamSource(streams_client, stream_arn, checkpoints)
+    raise ValueError(f"알 수 없는 INGEST_MODE: {mode}")
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 병렬 스캔 세그먼트 수 (Segment / TotalSegments)
+SCAN_SEGMENTS = int(os.environ.get("DYNAMODB_SCAN_SEGMENTS", "1"))
+
+_executor = None
+
+def scan_segment(client, table_name, segment=0, total_segments=1, **scan_kwargs):
+    """한 세그먼트를 LastEvaluatedKey를 따라 끝까지 스캔합니다.
+
+    (항목 목록, 세그먼트 소요 시간 정보)를 반환합니다.
+    """
+    started = time.perf_counter()
+    kwargs = dict(TableName=table_name, **scan_kwargs)
+    if total_segments > 1:
+        kwargs.update(Segment=segment, TotalSegments=total_segments)
+    items = []
+    pages = 0
+    while True:
+        response = client.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        pages += 1
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+    timing = {
+        "segment": segment,
+        "seconds": time.perf_counter() - started,
+        "pages": pages,
+        "items": len(items)
+    }
+    return items, timing
+
+def _merge(results):
+    items = []
+    timings = []
+    for segment_items, timing in results:
+        items.extend(segment_items)
+        timings.append(timing)
+    return items, timings
+
+def scan_table_parallel(client, table_name, total_segments=SCAN_SEGMENTS, **scan_kwargs):
+    """테이블 전체를 total_segments개 스레드로 나눠 스캔하고 한 스냅샷으로 합칩니다."""
+    global _executor
+    if total_segments <= 1:
+        return _merge([scan_segment(client, table_name, **scan_kwargs)])
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=total_segments, thread_name_prefix="scan")
+    futures = [
+        _executor.submit(scan_segment, client, table_name, segment, total_segments, **scan_kwargs)
+        for segment in range(total_segments)
+    ]
+    return _merge([future.result() for future in futures])
+
+async def scan_table_async(client, table_name, total_segments=SCAN_SEGMENTS, **scan_kwargs):
+    """scan_table_parallel()의 asyncio 버전. 각 세그먼트는 aws_io 실행기에서 실행됩니다.
+
+    동시 실행 세그먼트 수는 AWS_MAX_IN_FLIGHT 제한을 따릅니다.
+    """
+    from aws_io import run_aws
+    results = await asyncio.gather(*[
+        run_aws(scan_segment, client, table_name, segment, total_segments, **scan_kwargs)
+        for segment in range(max(1, total_segments))
+    ])
+    return _merge(results)
+
+def format_timings(timings):
+    """세그먼트별 소요 시간을 한 줄 문자열로 만듭니다."""
+    parts = [
+        f"#{t['segment']} {t['seconds'] * 1000:.0f}ms/{t['pages']}p/{t['items']}개"
+        for t in timings
+    ]
+    return "[스캔 세그먼트] " + ", ".join(parts)
@@ -3,6 +3,10 @@ import websocket
 import json
 import time
 import os
+import select
+from collections import deque
+from dynamo_scan import scan_table_parallel, format_timings
+from change_feed import INGEST_MODE, STREAM_POLL_INTERVAL_SECONDS, create_change_source
 
 # --- 설정 (사용자 환경에 맞게 변경 필요) ---
 # 환경 변수 또는 기본값을 사용합니다.
@@ -12,6 +16,13 @@ TABLE_NAME = os.environ.get("DYNAMODB_TABLE", "loadcell")
 AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2") # 서울 리전
 # 3. 폴링 간격 (초)
 POLL_INTERVAL_SECONDS = 1
+# 4. 웹소켓 서버 주소
+WEBSOCKET_URL = os.environ.get("WEBSOCKET_URL", "ws://localhost:6789")
+# 5. 재연결 대기 시간 (초, 실패할 때마다 두 배씩 늘어남)
+RECONNECT_BASE_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+# 6. 연결이 끊긴 동안 보관할 최대 프레임 수 (넘치면 오래된 것부터 버림)
+OUTBOUND_BUFFER_FRAMES = int(os.environ.get("OUTBOUND_BUFFER_FRAMES", "300"))
 # --- 설정 끝 ---
 
 print(f"DynamoDB 테이블 '{TABLE_NAME}' (리전: {AWS_REGION})에 연결을 시도합니다.")
@@ -26,40 +37,108 @@ except Exception as e:
     print("AWS 자격증명이 올바르게 설정되었는지 확인하세요.")
     exit(1)
 
-def send_to_websocket(data):
-    """웹소켓 서버로 데이터를 전송하는 함수"""
-    try:
-        ws = websocket.create_connection("ws://localhost:6789")
-        ws.send(json.dumps(data))
-        ws.close()
-        print(f"웹소켓 전송 성공: {data}")
-    except Exception as e:
-        print(f"웹소켓 전송 실패: {e}")
+class WebSocketRelay:
+    """한 번 맺은 웹소켓 연결을 계속 재사용하고, 끊기면 지수 백오프로 다시 연결합니다."""
+
+    def __init__(self, url=WEBSOCKET_URL):
+        self.url = url
+        self.ws = None
+        # 연결이 끊긴 동안 보내지 못한 프레임
+        self.outbound = deque(maxlen=OUTBOUND_BUFFER_FRAMES)
+        self.retry_delay = RECONNECT_BASE_DELAY
+        self.next_attempt = 0.0
+
+    def _connect(self):
+        # 백오프 대기 중이면 폴링 루프를 막지 않고 다음 주기에 다시 시도합니다
+        if time.monotonic() < self.next_attempt:
+            return False
+        try:
+            # 중계기는 데이터를 보내기만 하므로 빈 토픽으로 접속하여 브로드캐스트를 받지 않습니다
+            self.ws = websocket.create_connection(f"{self.url.rstrip('/')}/?topics=", timeout=5)
+            self.retry_delay = RECONNECT_BASE_DELAY
+            print(f"웹소켓 연결 성공: {self.url}")
+            return True
+        except Exception as e:
+            self.ws = None
+            self.next_attempt = time.monotonic() + self.retry_delay
+            print(f"웹소켓 연결 실패: {e} ({self.retry_delay:.1f}초 후 재시도, 대기 프레임 {len(self.outbound)}개)")
+            self.retry_delay = min(self.retry_delay * 2, RECONNECT_MAX_DELAY)
+            return False
+
+    def _disconnect(self):
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+        self.ws = None
+
+    def _drain_incoming(self):
+        # 서버가 보내는 ping에 응답하기 위해 도착한 프레임을 읽습니다 (브로드캐스트 내용은 버립니다)
+        while select.select([self.ws.sock], [], [], 0)[0]:
+            self.ws.recv()
+
+    def send_batch(self, items):
+        """한 스캔 주기의 항목들을 JSON 배열 프레임 하나로 보냅니다."""
+        if items:
+            self.outbound.append(json.dumps(items))
+        self.flush()
+
+    def flush(self):
+        """버퍼에 쌓인 프레임을 순서대로 보냅니다."""
+        if not self.outbound:
+            return
+        if self.ws is None and not self._connect():
+            return
+        while self.outbound:
+            try:
+                self._drain_incoming()
+                self.ws.send(self.outbound[0])
+            except Exception as e:
+                print(f"웹소켓 전송 실패: {e}")
+                self._disconnect()
+                self.next_attempt = 0.0
+                return
+            self.outbound.popleft()
+
+relay = WebSocketRelay()
+
+# INGEST_MODE가 stream/file이면 전체 스캔 대신 변경 스트림을 읽습니다
+change_source = create_change_source(INGEST_MODE, dynamodb_client, TABLE_NAME, AWS_REGION, consumer="relay")
 
 def scan_table():
-    """테이블의 모든 항목을 스캔하여 최신 데이터를 가져옵니다."""
+    """테이블의 모든 항목(스트림 모드면 변경된 항목)을 가져와 웹소켓 서버로 전송합니다."""
     try:
-        response = dynamodb_client.scan(TableName=TABLE_NAME)
-        items = response.get('Items', [])
+        if change_source is not None:
+            items = change_source.poll()
+        else:
+            # LastEvaluatedKey를 따라 끝까지, DYNAMODB_SCAN_SEGMENTS개 세그먼트로 나눠 스캔합니다
+            items, timings = scan_table_parallel(dynamodb_client, TABLE_NAME)
+            print(f"[DEBUG] {format_timings(timings)}")
         print(f"[DEBUG] 스캔된 항목 수: {len(items)}")
         
         # 각 항목을 처리합니다
+        batch = []
         for item in items:
             # DynamoDB 응답 형식에서 데이터 추출
             loadcel_id = item.get('loadcel', {}).get('S')
             current_weight = item.get('current_weight', {}).get('N')
             remaining_sec = item.get('remaining_sec', {}).get('N')
             
-            # 모든 필수 데이터가 존재할 경우 웹소켓으로 전송합니다
+            # 모든 필수 데이터가 존재할 경우 전송 묶음에 추가합니다
             if loadcel_id and current_weight is not None and remaining_sec is not None:
                 data_to_send = {
                     "loadcel": loadcel_id,
                     "current_weight": current_weight,
                     "remaining_sec": remaining_sec
                 }
-                send_to_websocket(data_to_send)
-                print(f"[DEBUG] 데이터 전송: {data_to_send}")
-        
+                batch.append(data_to_send)
+
+        # 한 스캔 주기의 데이터를 프레임 하나로 전송합니다
+        relay.send_batch(batch)
+        print(f"[DEBUG] 데이터 전송: {len(batch)}개")
+        # 전송 버퍼에 넣은 변경분까지 체크포인트를 저장합니다
+        if change_source is not None:
+            change_source.commit()
         return len(items)
     except Exception as e:
         print(f"테이블 스캔 중 오류 발생: {e}")
@@ -68,7 +147,8 @@ def scan_table():
 def main():
     """메인 실행 함수"""
     print("DynamoDB 테이블 폴링을 시작합니다...")
-    print(f"폴링 간격: {POLL_INTERVAL_SECONDS}초")
+    interval = STREAM_POLL_INTERVAL_SECONDS if change_source is not None else POLL_INTERVAL_SECONDS
+    print(f"수집 방식: {INGEST_MODE}, 폴링 간격: {interval}초")
     
     while True:
         try:
@@ -77,7 +157,7 @@ def main():
         except Exception as e:
             print(f"폴링 중 오류 발생: {e}")
         
-        time.sleep(POLL_INTERVAL_SECONDS)
+        time.sleep(interval)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,86 @@
+import asyncio
+import os
+from collections import OrderedDict
+
+# 클라이언트별 전송 대기열 최대 크기 (대기 중인 로드셀 수 기준, hello/알림/스냅샷 메시지는 세지 않습니다)
+CLIENT_QUEUE_SIZE = int(os.environ.get("CLIENT_QUEUE_SIZE", "1024"))
+
+# 느린 클라이언트 관측용 전체 카운터
+fanout_stats = {
+    "sent_frames": 0,
+    "dropped_updates": 0,
+    "coalesced": 0
+}
+
+class ClientChannel:
+    """클라이언트 하나의 제한된 전송 대기열과 전용 전송 태스크"""
+
+    def __init__(self, websocket, max_pending=CLIENT_QUEUE_SIZE):
+        self.websocket = websocket
+        self.max_pending = max_pending
+        # key -> 이미 인코딩된 JSON 문자열. key가 로드셀 ID(문자열)면 데이터, 튜플이면 hello/알림/스냅샷 메시지입니다
+        self.pending = OrderedDict()
+        # 대기 중인 데이터 key (오래된 순). 가득 차면 여기서만 버립니다
+        self.pending_updates = OrderedDict()
+        self.ready = asyncio.Event()
+        self.dropped_updates = 0
+        self.coalesced = 0
+        self.task = None
+
+    def enqueue(self, key, encoded):
+        """인코딩된 메시지를 대기열에 넣습니다. 같은 key의 미전송 메시지는 최신 값으로 대체됩니다.
+
+        대기 중인 로드셀이 max_pending개면 가장 오래된 로드셀 데이터를 버리고 dropped_updates로 셉니다.
+        hello/알림/스냅샷 메시지는 버리지 않습니다.
+        """
+        if key in self.pending:
+            self.coalesced += 1
+            fanout_stats["coalesced"] += 1
+        elif isinstance(key, str):
+            if len(self.pending_updates) >= self.max_pending:
+                oldest, _ = self.pending_updates.popitem(last=False)
+                del self.pending[oldest]
+                self.dropped_updates += 1
+                fanout_stats["dropped_updates"] += 1
+            self.pending_updates[key] = None
+        self.pending[key] = encoded
+        self.ready.set()
+
+    async def run(self):
+        """대기 중인 메시지를 JSON 배열 프레임 하나로 묶어 전송합니다."""
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+                if not self.pending:
+                    continue
+                batch, self.pending = self.pending, OrderedDict()
+                self.pending_updates.clear()
+                await self.websocket.send("[" + ",".join(batch.values()) + "]")
+                fanout_stats["sent_frames"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 연결이 끊긴 클라이언트는 handler()에서 정리됩니다
+            print(f"[전송 태스크 종료] {self.websocket.remote_address}: {e}")
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+
+def format_stats(channels):
+    """전체 카운터와 로드셀 데이터를 버린 느린 클라이언트 목록을 문자열로 만듭니다."""
+    slow = [
+        f"{channel.websocket.remote_address}(버린 데이터 {channel.dropped_updates}, 병합 {channel.coalesced})"
+        for channel in channels if channel.dropped_updates
+    ]
+    line = (
+        f"[팬아웃 통계] 전송 프레임: {fanout_stats['sent_frames']}, "
+        f"버린 데이터: {fanout_stats['dropped_updates']}, 병합: {fanout_stats['coalesced']}"
+    )
+    if slow:
+        line += f", 느린 클라이언트: {', '.join(slow)}"
+    return line
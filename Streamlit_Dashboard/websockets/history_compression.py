@@ -0,0 +1,54 @@
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# 마지막으로 저장한 무게와 이 값(g) 이상 차이 날 때만 새 점을 저장합니다
+HISTORY_DEADBAND_G = float(os.environ.get("HISTORY_DEADBAND_G", "2"))
+# 무게 변화가 없어도 이 시간(초)이 지나면 한 점을 저장합니다 (생존 신호)
+HISTORY_MAX_SILENCE_SEC = float(os.environ.get("HISTORY_MAX_SILENCE_SEC", "60"))
+
+def parse_timestamp(timestamp):
+    """ISO 형식 timestamp 문자열을 epoch 초로 바꿉니다. 실패하면 현재 시각을 사용합니다."""
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+class DeadbandCompressor:
+    """로드셀별 데드밴드 + 최대 무음 시간 기반 히스토리 압축기
+
+    저장된 점들을 계단식으로 이으면 원래 곡선과의 차이가 항상 deadband_g 이내입니다.
+    """
+
+    def __init__(self, deadband_g=HISTORY_DEADBAND_G, max_silence_sec=HISTORY_MAX_SILENCE_SEC):
+        self.deadband_g = deadband_g
+        self.max_silence_sec = max_silence_sec
+        # loadcel -> (마지막으로 저장한 시각(epoch 초), 무게)
+        self.last_kept = {}
+        self.offered = defaultdict(int)
+        self.kept = defaultdict(int)
+
+    def offer(self, loadcel, timestamp_sec, weight):
+        """새 읽기를 저장해야 하면 True를 반환합니다."""
+        self.offered[loadcel] += 1
+        last = self.last_kept.get(loadcel)
+        if last is not None:
+            last_sec, last_weight = last
+            if abs(weight - last_weight) < self.deadband_g and timestamp_sec - last_sec < self.max_silence_sec:
+                return False
+        self.last_kept[loadcel] = (timestamp_sec, weight)
+        self.kept[loadcel] += 1
+        return True
+
+    def ratio(self, loadcel):
+        """입력 점 수 / 저장한 점 수"""
+        kept = self.kept.get(loadcel, 0)
+        return self.offered[loadcel] / kept if kept else 0.0
+
+    def format_stats(self):
+        parts = [
+            f"{loadcel}: {self.offered[loadcel]}→{self.kept[loadcel]} ({self.ratio(loadcel):.1f}x)"
+            for loadcel in sorted(self.offered)
+        ]
+        return "[히스토리 압축률] " + (", ".join(parts) if parts else "데이터 없음")
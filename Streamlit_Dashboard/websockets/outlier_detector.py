@@ -0,0 +1,234 @@
+import math
+import os
+from rate_estimator import BAG_CHANGE_G, DEFAULT_RATE_G_PER_H, RESET_GAP_SEC
+
+# 예상 무게 변화와의 차이가 예측 표준편차의 이 배수를 넘으면 급변(jump)으로 봅니다
+ANOMALY_JUMP_Z = float(os.environ.get("ANOMALY_JUMP_Z", "4"))
+# 이 배수를 넘는 급변은 심각(critical)으로 기록합니다
+ANOMALY_CRITICAL_Z = float(os.environ.get("ANOMALY_CRITICAL_Z", "8"))
+# 예상과의 차이가 이 값(g)보다 작으면 잡음이 거의 없는 센서에서도 급변으로 보지 않습니다
+ANOMALY_MIN_STEP_G = float(os.environ.get("ANOMALY_MIN_STEP_G", "10"))
+# 예상 변화량에 쓰는 투여 속도의 반감기 (초)
+ANOMALY_RATE_HALFLIFE_SEC = float(os.environ.get("ANOMALY_RATE_HALFLIFE_SEC", "120"))
+# 투여 속도 변화(막힘, 속도 조절)를 비교할 기준 속도의 반감기 (초)
+ANOMALY_BASELINE_HALFLIFE_SEC = float(os.environ.get("ANOMALY_BASELINE_HALFLIFE_SEC", "3600"))
+# 기준 속도와의 차이 중 이 속도(g/h)까지는 허용하고, 넘는 부분의 누적(CUSUM)이
+# ANOMALY_DRIFT_G(g)와 잡음 표준편차의 DRIFT_NOISE_MULT배 중 큰 값을 넘으면 경고, 2배를 넘으면 심각으로 기록합니다.
+# 같은 등급은 누적이 한 단계 아래(경고는 기준의 절반, 심각은 기준)로 내려간 뒤에야 다시 기록합니다
+ANOMALY_DRIFT_ALLOWANCE_G_PER_H = float(os.environ.get("ANOMALY_DRIFT_ALLOWANCE_G_PER_H", "30"))
+ANOMALY_DRIFT_G = float(os.environ.get("ANOMALY_DRIFT_G", "20"))
+DRIFT_NOISE_MULT = 8.0
+# 읽기 잡음 분산 EWMA 가중치 (읽기 하나의 반영 비율)
+ANOMALY_NOISE_ALPHA = 0.1
+# 새 구간을 시작할 때 기본 투여 속도를 이 시간(초)만큼 관측한 것으로 봅니다
+PRIOR_WEIGHT_SEC = 60.0
+# 처음 보는 폴대의 잡음 표준편차 (g)와 잡음 추정의 하한 (g)
+INITIAL_NOISE_G = 3.0
+NOISE_FLOOR_G = 0.5
+# 속도 추정 오차 (g/h). 읽기 간격이 길수록 예상 무게의 불확실성이 커집니다
+RATE_UNCERTAINTY_G_PER_H = 100.0
+# 잡음 분산 갱신에 쓰는 차이의 상한 (g). 급변 하나가 잡음 추정을 크게 부풀리지 않도록 합니다
+RESIDUAL_CAP_G = BAG_CHANGE_G
+# 속도 추정에 쓰는 변화량의 상한: max(ANOMALY_MIN_STEP_G, 이 속도(g/h) × 경과 시간)
+MAX_RATE_G_PER_H = 2000.0
+
+KIND_JUMP = "jump"
+KIND_DRIFT = "drift"
+SEVERITY_WARNING = "warning"
+SEVERITY_CRITICAL = "critical"
+
+_PRIOR_RATE = -DEFAULT_RATE_G_PER_H / 3600
+_MAX_RATE = MAX_RATE_G_PER_H / 3600
+_ALLOWANCE = ANOMALY_DRIFT_ALLOWANCE_G_PER_H / 3600
+_RATE_VAR = (RATE_UNCERTAINTY_G_PER_H / 3600) ** 2
+_INITIAL_VAR = INITIAL_NOISE_G ** 2
+_FLOOR_VAR = NOISE_FLOOR_G ** 2
+_CAP_VAR = RESIDUAL_CAP_G ** 2
+# 상태 목록의 위치: 시각, 무게, (감쇠한 변화량 합, 감쇠한 경과 시간 합) × (속도, 기준 속도), 잡음 분산,
+# CUSUM 위/아래와 각각의 기록 등급(0: 없음, 1: 경고, 2: 심각)
+_T, _W, _STEP, _SPAN, _BASE_STEP, _BASE_SPAN, _VAR, _UP, _DOWN, _UP_LEVEL, _DOWN_LEVEL = range(11)
+_SEVERITIES = {1: SEVERITY_WARNING, 2: SEVERITY_CRITICAL}
+
+def _clip(value, limit):
+    return max(-limit, min(limit, value))
+
+class OutlierDetector:
+    """폴대별 상태 몇 개로 읽기마다 O(1)에 급변과 투여 속도 변화를 찾는 이상 탐지기
+
+    투여 속도는 반감기로 감쇠한 (무게 변화 합 / 경과 시간 합)이므로 읽기 간격과 관계없이 같은 시간 창을 봅니다.
+    - 급변: 예상 변화(속도 × 경과 시간)와의 차이가 예측 표준편차(잡음 EWMA + 속도 오차 × 경과 시간)의
+      ANOMALY_JUMP_Z배 이상이고 ANOMALY_MIN_STEP_G 이상인 읽기
+    - 속도 변화: 느린 기준 속도로 예상한 무게와의 차이(허용 속도 초과분)의 CUSUM이 기준을 넘는 순간
+    잡음이 큰 센서는 잡음 추정과 기준이 함께 커지므로 고정 기준(50g)처럼 이벤트가 쏟아지지 않습니다.
+    수액팩 교체(BAG_CHANGE_G 이상 증가)나 긴 공백(RESET_GAP_SEC) 뒤에는 속도와 CUSUM을 새로 시작하고,
+    잡음은 센서의 특성이므로 그대로 둡니다.
+    """
+
+    def __init__(self):
+        self.state = {}
+        self.stats = {"readings": 0, KIND_JUMP: 0, KIND_DRIFT: 0, "segments": 0}
+
+    def update(self, loadcel, t, weight, timestamp):
+        """읽기 하나(t: epoch 초, weight: g)를 반영하고 이상 이벤트(없으면 None)를 반환합니다."""
+        self.stats["readings"] += 1
+        state = self.state.get(loadcel)
+        # 0g 이하는 수액이 연결되지 않은 것이고, 중복 / 순서가 뒤바뀐 읽기도 건너뜁니다
+        if weight <= 0 or (state is not None and t <= state[_T]):
+            return None
+        if state is None or t - state[_T] > RESET_GAP_SEC or weight - state[_W] > BAG_CHANGE_G:
+            prior_step = _PRIOR_RATE * PRIOR_WEIGHT_SEC
+            variance = _INITIAL_VAR if state is None else state[_VAR]
+            self.state[loadcel] = [t, weight, prior_step, PRIOR_WEIGHT_SEC, prior_step, PRIOR_WEIGHT_SEC,
+                                   variance, 0.0, 0.0, 0, 0]
+            self.stats["segments"] += 1
+            return None
+        dt = t - state[_T]
+        step = weight - state[_W]
+        residual = step - state[_STEP] / state[_SPAN] * dt
+        noise = max(state[_VAR], _FLOOR_VAR)
+        z = residual / math.sqrt(noise + _RATE_VAR * dt * dt)
+        drift_limit = max(ANOMALY_DRIFT_G, DRIFT_NOISE_MULT * math.sqrt(noise))
+        # 속도 추정에는 급변을 잘라 넣고, CUSUM에는 그대로 넣어 잡음이 서로 상쇄되도록 합니다
+        clipped = _clip(step, max(ANOMALY_MIN_STEP_G, _MAX_RATE * dt))
+        excess = step - state[_BASE_STEP] / state[_BASE_SPAN] * dt
+        decay = 0.5 ** (dt / ANOMALY_RATE_HALFLIFE_SEC)
+        base_decay = 0.5 ** (dt / ANOMALY_BASELINE_HALFLIFE_SEC)
+        state[_T], state[_W] = t, weight
+        state[_STEP], state[_SPAN] = decay * state[_STEP] + clipped, decay * state[_SPAN] + dt
+        state[_BASE_STEP], state[_BASE_SPAN] = base_decay * state[_BASE_STEP] + clipped, base_decay * state[_BASE_SPAN] + dt
+        state[_VAR] = (1 - ANOMALY_NOISE_ALPHA) * state[_VAR] + ANOMALY_NOISE_ALPHA * min(residual * residual, _CAP_VAR)
+        state[_UP] = max(0.0, state[_UP] + excess - _ALLOWANCE * dt)
+        state[_DOWN] = max(0.0, state[_DOWN] - excess - _ALLOWANCE * dt)
+        up_level, down_level = state[_UP_LEVEL], state[_DOWN_LEVEL]
+        state[_UP_LEVEL] = _drift_level(up_level, state[_UP], drift_limit)
+        state[_DOWN_LEVEL] = _drift_level(down_level, state[_DOWN], drift_limit)
+
+        if abs(z) >= ANOMALY_JUMP_Z and abs(residual) >= ANOMALY_MIN_STEP_G:
+            severity = SEVERITY_CRITICAL if abs(z) >= ANOMALY_CRITICAL_Z else SEVERITY_WARNING
+            return self._event(KIND_JUMP, severity, loadcel, timestamp, weight, residual, z)
+        if state[_UP_LEVEL] > up_level:
+            return self._event(KIND_DRIFT, _SEVERITIES[state[_UP_LEVEL]], loadcel, timestamp, weight, residual, state[_UP])
+        if state[_DOWN_LEVEL] > down_level:
+            return self._event(KIND_DRIFT, _SEVERITIES[state[_DOWN_LEVEL]], loadcel, timestamp, weight, residual, -state[_DOWN])
+        return None
+
+    def _event(self, kind, severity, loadcel, timestamp, weight, residual, score):
+        self.stats[kind] += 1
+        return _event(kind, severity, loadcel, timestamp, weight, residual, score)
+
+    def format_stats(self):
+        return (f"[이상 탐지] 폴대 {len(self.state)}개, 읽기 {self.stats['readings']}개, "
+                f"급변 {self.stats[KIND_JUMP]}개, 속도 변화 {self.stats[KIND_DRIFT]}개")
+
+def _event(kind, severity, loadcel, timestamp, weight, residual, score):
+    # score: 급변은 z, 속도 변화는 누적 차이(g). up은 예상보다 무거움(투여가 느려짐/멈춤), down은 가벼움(빨라짐/누수)
+    return {
+        "type": "anomaly", "loadcel": loadcel, "timestamp": timestamp, "kind": kind, "severity": severity,
+        "direction": "up" if score > 0 else "down",
+        "current_weight": weight, "diff": round(residual, 1), "score": round(score, 2)
+    }
+
+def _drift_level(level, total, limit):
+    """누적 차이 total에 따른 새 기록 등급. 2 × limit 이상이면 심각, limit 이상이면 경고를 유지하거나 올리고,
+    limit 아래로 내려가면 심각을, limit / 2 아래로 내려가면 경고를 해제합니다."""
+    if total >= 2 * limit:
+        return 2
+    if total >= limit:
+        return max(level, 1)
+    if total >= limit / 2:
+        return min(level, 1)
+    return 0
+
+def anomaly_item(event):
+    """loadcell_anomaly 테이블 항목 (키: loadcel, timestamp)"""
+    return {
+        'loadcel': {'S': str(event["loadcel"])},
+        'timestamp': {'S': event["timestamp"]},
+        'kind': {'S': event["kind"]},
+        'severity': {'S': event["severity"]},
+        'direction': {'S': event["direction"]},
+        'current_weight': {'N': str(event["current_weight"])},
+        'diff': {'N': str(event["diff"])},
+        'score': {'N': str(event["score"])}
+    }
+
+def detect_frame(frame):
+    """과거 기록 일괄 탐지 (백필용). 같은 읽기를 OutlierDetector.update()에 차례로 넣은 것과 같은 이벤트 목록을 반환합니다.
+
+    frame은 loadcel, t(epoch 초), current_weight, timestamp(문자열) 열을 가진 DataFrame입니다.
+    감쇠 합은 구간별 ewm(halflife, times)로, 잡음은 폴대별 ewm(adjust=False)로, CUSUM은 누적합 - 누적 최솟값으로 계산하므로
+    읽기마다 파이썬 코드를 돌지 않습니다.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = frame.dropna(subset=["t", "current_weight"])
+    frame = frame[frame["current_weight"] > 0].sort_values(["loadcel", "t"], kind="stable")
+    frame = frame.drop_duplicates(["loadcel", "t"], keep="first").reset_index(drop=True)
+    if frame.empty:
+        return []
+    t = frame["t"].to_numpy(dtype=np.float64)
+    weight = frame["current_weight"].to_numpy(dtype=np.float64)
+    loadcel = frame["loadcel"].astype(str).to_numpy()
+    dt = np.diff(t, prepend=np.nan)
+    step = np.diff(weight, prepend=np.nan)
+    first = np.r_[True, loadcel[1:] != loadcel[:-1]]
+    start = first | (dt > RESET_GAP_SEC) | (step > BAG_CHANGE_G)
+    dt[start], step[start] = PRIOR_WEIGHT_SEC, _PRIOR_RATE * PRIOR_WEIGHT_SEC
+    segment = np.cumsum(start)
+    times = pd.to_datetime(t, unit="s")
+
+    def before(values, first_value=np.nan):
+        # 이번 읽기를 반영하기 전 상태 (구간 첫 읽기에는 first_value)
+        return np.where(start, first_value, np.r_[np.nan, values[:-1]])
+
+    def decayed_rate(values, halflife):
+        # 감쇠 가중 평균끼리의 비 == 감쇠 합끼리의 비
+        mean = lambda v: pd.Series(v).groupby(segment).ewm(halflife=pd.Timedelta(seconds=halflife), times=times).mean().to_numpy()
+        return before(mean(values) / mean(dt))
+
+    clipped = np.where(start, step, np.clip(step, -np.maximum(ANOMALY_MIN_STEP_G, _MAX_RATE * dt),
+                                            np.maximum(ANOMALY_MIN_STEP_G, _MAX_RATE * dt)))
+    residual = step - decayed_rate(clipped, ANOMALY_RATE_HALFLIFE_SEC) * dt
+    # 잡음은 폴대별로 이어지고 구간 첫 읽기는 건너뜁니다 (ignore_na)
+    observed = np.where(first, _INITIAL_VAR, np.where(start, np.nan, np.minimum(residual * residual, _CAP_VAR)))
+    variance = pd.Series(observed).groupby(np.cumsum(first)).ewm(alpha=ANOMALY_NOISE_ALPHA, adjust=False, ignore_na=True).mean().to_numpy()
+    noise = np.maximum(np.r_[np.nan, variance[:-1]], _FLOOR_VAR)
+    z = residual / np.sqrt(noise + _RATE_VAR * dt * dt)
+    drift_limit = np.maximum(ANOMALY_DRIFT_G, DRIFT_NOISE_MULT * np.sqrt(noise))
+    excess = step - decayed_rate(clipped, ANOMALY_BASELINE_HALFLIFE_SEC) * dt
+
+    def cusum(x):
+        # S_t = max(0, S_{t-1} + x_t), 구간 첫 읽기에서 S = 0  ==  C_t - min(C_첫..C_t)
+        total = pd.Series(np.where(start, 0.0, x)).groupby(segment).cumsum()
+        return (total - total.groupby(segment).cummin()).to_numpy()
+
+    def level(total):
+        # _drift_level()의 등급: 등급마다 켜는 조건과 끄는 조건 사이에서는 직전 값을 이어갑니다 (구간 첫 읽기는 0)
+        def latch(on, off):
+            flag = pd.Series(np.where(on, 1.0, np.where(off, 0.0, np.nan)))
+            return flag.groupby(segment).ffill().fillna(0).to_numpy()
+        total = np.where(start, 0.0, total)
+        return (latch(total >= drift_limit, total < drift_limit / 2) +
+                latch(total >= 2 * drift_limit, total < drift_limit)).astype(int)
+
+    up = cusum(excess - _ALLOWANCE * dt)
+    down = cusum(-excess - _ALLOWANCE * dt)
+    up_level, down_level = level(up), level(down)
+
+    jump = ~start & (np.abs(z) >= ANOMALY_JUMP_Z) & (np.abs(residual) >= ANOMALY_MIN_STEP_G)
+    drift_up = ~start & (up_level > before(up_level, 0)) & ~jump
+    drift_down = ~start & (down_level > before(down_level, 0)) & ~jump & ~drift_up
+
+    timestamps = frame["timestamp"].to_numpy()
+    events = []
+    for i in np.flatnonzero(jump | drift_up | drift_down):
+        if jump[i]:
+            severity = SEVERITY_CRITICAL if abs(z[i]) >= ANOMALY_CRITICAL_Z else SEVERITY_WARNING
+            kind, score = KIND_JUMP, float(z[i])
+        elif drift_up[i]:
+            kind, severity, score = KIND_DRIFT, _SEVERITIES[up_level[i]], float(up[i])
+        else:
+            kind, severity, score = KIND_DRIFT, _SEVERITIES[down_level[i]], -float(down[i])
+        events.append(_event(kind, severity, str(loadcel[i]), timestamps[i], float(weight[i]), float(residual[i]), score))
+    return events
@@ -0,0 +1,149 @@
+import os
+import numpy as np
+
+# 추정값이 모이기 전 기본 투여 속도 (g/h), 대시보드의 기존 고정 속도와 같습니다
+DEFAULT_RATE_G_PER_H = float(os.environ.get("DEFAULT_RATE_G_PER_H", "250"))
+# 기본 속도의 초기 불확실성 (표준편차, g/h)
+INITIAL_RATE_STD_G_PER_H = 150.0
+# 로드셀 측정 잡음 (표준편차, g)
+MEASUREMENT_NOISE_G = float(os.environ.get("RATE_MEASUREMENT_NOISE_G", "2"))
+# 투여 속도 변화 정도 (속도 랜덤워크 세기, (g/h) / sqrt(h))
+RATE_PROCESS_NOISE_G_PER_H = float(os.environ.get("RATE_PROCESS_NOISE_G_PER_H", "60"))
+# 무게가 이만큼(g) 늘어나면 수액팩 교체로 보고 추정을 다시 시작합니다
+BAG_CHANGE_G = 50.0
+# 이 시간(초) 이상 읽기가 없었으면 추정을 다시 시작합니다
+RESET_GAP_SEC = 600.0
+# 신뢰 구간 배수 (1.96 = 95%)
+CONFIDENCE_Z = 1.96
+# 이 속도(g/h) 미만이면 투여가 멈춘 것으로 보고 남은 시간을 -1(정보 없음)로 둡니다
+MIN_FLOW_G_PER_H = 1.0
+
+_Q = (RATE_PROCESS_NOISE_G_PER_H / 3600) ** 2 / 3600  # 초 단위 속도(g/s)의 분산 증가율
+_R = MEASUREMENT_NOISE_G ** 2
+
+class RateEstimator:
+    """로드셀별 (무게, 무게 변화율) 칼만 필터
+
+    상태는 로드셀마다 배열의 한 칸(slot)에 보관하므로 읽기 하나당 O(1)이고,
+    한 폴링 주기의 변경분은 update_batch()로 모든 로드셀을 한 번에 갱신합니다.
+    """
+
+    def __init__(self, capacity=64):
+        self.slots = {}
+        self.weight = np.zeros(capacity)
+        self.rate = np.zeros(capacity)      # g/s (투여 중이면 음수)
+        # 오차 공분산 P = [[p00, p01], [p01, p11]]
+        self.p00 = np.zeros(capacity)
+        self.p01 = np.zeros(capacity)
+        self.p11 = np.zeros(capacity)
+        self.last_ts = np.full(capacity, np.nan)
+
+    def _grow(self):
+        for name in ("weight", "rate", "p00", "p01", "p11", "last_ts"):
+            array = getattr(self, name)
+            grown = np.full(len(array) * 2, np.nan if name == "last_ts" else 0.0)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _slot(self, loadcel):
+        slot = self.slots.get(loadcel)
+        if slot is None:
+            slot = self.slots[loadcel] = len(self.slots)
+            if slot >= len(self.weight):
+                self._grow()
+        return slot
+
+    def _reset(self, slots, timestamps, weights):
+        self.weight[slots] = weights
+        self.rate[slots] = -DEFAULT_RATE_G_PER_H / 3600
+        self.p00[slots] = _R
+        self.p01[slots] = 0.0
+        self.p11[slots] = (INITIAL_RATE_STD_G_PER_H / 3600) ** 2
+        self.last_ts[slots] = timestamps
+
+    def _step(self, slots, timestamps, weights):
+        """로드셀이 중복되지 않는 slots 배열을 한 번에 갱신합니다."""
+        dt = timestamps - self.last_ts[slots]
+        fresh = np.isnan(dt) | (dt > RESET_GAP_SEC) | (weights - self.weight[slots] > BAG_CHANGE_G)
+        if fresh.any():
+            self._reset(slots[fresh], timestamps[fresh], weights[fresh])
+        keep = ~fresh
+        slots, dt, z = slots[keep], np.maximum(dt[keep], 0.0), weights[keep]
+        if len(slots) == 0:
+            return
+        # 예측: x = F x, P = F P F' + Q (등속 모델, F = [[1, dt], [0, 1]])
+        weight = self.weight[slots] + self.rate[slots] * dt
+        rate = self.rate[slots]
+        p00, p01, p11 = self.p00[slots], self.p01[slots], self.p11[slots]
+        p00 = p00 + 2 * dt * p01 + dt * dt * p11 + _Q * dt ** 3 / 3
+        p01 = p01 + dt * p11 + _Q * dt ** 2 / 2
+        p11 = p11 + _Q * dt
+        # 갱신: 무게만 관측합니다 (H = [1, 0])
+        s = p00 + _R
+        k0, k1 = p00 / s, p01 / s
+        innovation = z - weight
+        self.weight[slots] = weight + k0 * innovation
+        self.rate[slots] = rate + k1 * innovation
+        self.p00[slots] = (1 - k0) * p00
+        self.p01[slots] = (1 - k0) * p01
+        self.p11[slots] = p11 - k1 * p01
+        self.last_ts[slots] = timestamps[keep]
+
+    def update_batch(self, loadcels, timestamps, weights):
+        """(loadcel, epoch 초, 무게) 목록을 반영합니다. 같은 로드셀의 여러 읽기는 순서대로 처리합니다."""
+        slots = np.array([self._slot(loadcel) for loadcel in loadcels], dtype=np.int64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        # 같은 로드셀이 여러 번 나오면 n번째 읽기끼리 묶어 차례로 갱신합니다
+        occurrence = np.empty(len(slots), dtype=np.int64)
+        counts = {}
+        for i, slot in enumerate(slots.tolist()):
+            occurrence[i] = counts.get(slot, 0)
+            counts[slot] = occurrence[i] + 1
+        for n in range(int(occurrence.max()) + 1 if len(slots) else 0):
+            mask = occurrence == n
+            self._step(slots[mask], timestamps[mask], weights[mask])
+
+    def update(self, loadcel, timestamp, weight):
+        self.update_batch([loadcel], [timestamp], [weight])
+        return self.estimate(loadcel)
+
+    def _estimates(self, slots):
+        """slots 배열의 (투여 속도, 속도 하한, 속도 상한, 남은 시간, 남은 시간 하한, 남은 시간 상한)"""
+        flow = -self.rate[slots] * 3600
+        spread = CONFIDENCE_Z * np.sqrt(np.maximum(self.p11[slots], 0.0)) * 3600
+        flow_low, flow_high = flow - spread, flow + spread
+        weight = np.maximum(self.weight[slots], 0.0)
+        def remaining(rate):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                seconds = weight / rate * 3600
+            return np.where(rate >= MIN_FLOW_G_PER_H, seconds, -1.0)
+        # 속도가 빠를수록 남은 시간이 짧으므로 상한/하한이 뒤바뀝니다
+        return flow, flow_low, flow_high, remaining(flow), remaining(flow_high), remaining(flow_low)
+
+    def estimate(self, loadcel):
+        """로드셀의 현재 추정값 (한 번도 읽지 않았으면 None)"""
+        slot = self.slots.get(loadcel)
+        if slot is None:
+            return None
+        values = [float(v[0]) for v in self._estimates(np.array([slot]))]
+        return _as_fields(*values)
+
+    def estimates(self, loadcels=None):
+        """주어진(기본: 모든) 로드셀의 추정값을 한 번에 계산합니다. (loadcel -> 필드 dict)"""
+        loadcels = [l for l in (self.slots if loadcels is None else loadcels) if l in self.slots]
+        if not loadcels:
+            return {}
+        columns = self._estimates(np.array([self.slots[l] for l in loadcels]))
+        return {loadcel: _as_fields(*(float(c[i]) for c in columns)) for i, loadcel in enumerate(loadcels)}
+
+def _as_fields(flow, flow_low, flow_high, remaining, remaining_low, remaining_high):
+    """클라이언트로 보내는 필드 (g/h, 초). 남은 시간을 알 수 없으면 -1입니다."""
+    return {
+        "flow_rate": round(flow, 1),
+        "flow_rate_low": round(max(flow_low, 0.0), 1),
+        "flow_rate_high": round(flow_high, 1),
+        "est_remaining_sec": round(remaining),
+        "est_remaining_low": round(remaining_low),
+        "est_remaining_high": round(remaining_high),
+    }
@@ -0,0 +1,56 @@
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+# 재접속 클라이언트에게 다시 보내 줄 수 있는 최대 변경 기록 수
+REPLAY_LOG_SIZE = int(os.environ.get("REPLAY_LOG_SIZE", "5000"))
+
+class StateLog:
+    """로드셀별 최신 상태 테이블과 시퀀스 번호가 붙은 제한된 재전송 로그"""
+
+    def __init__(self, max_entries=REPLAY_LOG_SIZE):
+        # 서버가 재시작되면 시퀀스 번호가 다시 시작되므로 클라이언트가 구분할 수 있도록 실행마다 다른 값을 씁니다
+        self.epoch = str(time.time_ns())
+        self.seq = 0
+        # loadcel -> (seq, 인코딩된 JSON)
+        self.latest = {}
+        # (seq, loadcel, 인코딩된 JSON), seq는 연속된 번호입니다
+        self.log = deque(maxlen=max_entries)
+
+    def record(self, loadcel, data):
+        """변경된 읽기에 시퀀스 번호를 붙여 기록하고 인코딩된 JSON을 반환합니다."""
+        self.seq += 1
+        data["seq"] = self.seq
+        encoded = json.dumps(data)
+        self.latest[loadcel] = (self.seq, encoded)
+        self.log.append((self.seq, loadcel, encoded))
+        return encoded
+
+    def hello(self):
+        """접속 직후 보내는 안내 메시지 (epoch, 현재 시퀀스 번호)"""
+        return json.dumps({"type": "hello", "epoch": self.epoch, "seq": self.seq})
+
+    def snapshot(self):
+        """모든 로드셀의 최신 상태를 (loadcel, JSON) 목록으로 반환합니다."""
+        return [(loadcel, encoded) for loadcel, (_, encoded) in sorted(self.latest.items(), key=lambda kv: kv[1][0])]
+
+    def since(self, last_seq, epoch=None):
+        """last_seq 이후의 변경분을 반환합니다. 로그로 메울 수 없는 경우 None을 반환합니다."""
+        if epoch != self.epoch or last_seq > self.seq:
+            return None
+        if last_seq == self.seq:
+            return []
+        if not self.log or last_seq < self.log[0][0] - 1:
+            return None
+        start = last_seq - self.log[0][0] + 1
+        return [(loadcel, encoded) for _, loadcel, encoded in itertools.islice(self.log, start, None)]
+
+    def resume(self, last_seq=None, epoch=None):
+        """재접속 클라이언트에게는 빠진 부분만, 그 외에는 전체 스냅샷을 반환합니다."""
+        if last_seq is not None:
+            gap = self.since(last_seq, epoch)
+            if gap is not None:
+                return gap
+        return self.snapshot()
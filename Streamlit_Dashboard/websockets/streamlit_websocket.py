@@ -3,68 +3,318 @@ import websockets
 import boto3
 import json
 import os
+import time
+from urllib.parse import urlparse, parse_qs
+from fanout import ClientChannel, format_stats
+from aws_io import run_aws
+from batch_writer import BatchWriter
+from history_compression import DeadbandCompressor, parse_timestamp
+from dynamo_scan import scan_table_async, format_timings
+from change_feed import INGEST_MODE, STREAM_POLL_INTERVAL_SECONDS, create_change_source
+from state_log import StateLog
+from subscriptions import ALL_TOPICS, SubscriptionIndex, parse_topics
+from rate_estimator import RateEstimator
+from alert_engine import AlertEngine
+from tare_scheduler import TareScheduler, TimerWheel
+from outlier_detector import OutlierDetector, anomaly_item
 
+# 연결된 클라이언트별 전송 채널
 clients = set()
+# 로드셀별 최신 상태와 재접속용 변경 기록
+state_log = StateLog()
+# 토픽(로드셀 ID / 병동 접두사) -> 구독 클라이언트 색인
+subscriptions = SubscriptionIndex()
 
 # DynamoDB 설정
 TABLE_NAME = os.environ.get("DYNAMODB_TABLE", "loadcell")
 AWS_REGION = os.environ.get("AWS_REGION", "ap-northeast-2")
 POLL_INTERVAL_SECONDS = 1
+# 팬아웃 통계 출력 간격 (초)
+STATS_INTERVAL_SECONDS = int(os.environ.get("STATS_INTERVAL_SECONDS", "30"))
 
+HISTORY_TABLE_NAME = os.environ.get("DYNAMODB_HISTORY_TABLE", "loadcell_history")
+TARE_TABLE_NAME = os.environ.get("DYNAMODB_TARE_TABLE", "tare")
+POLESTAT_TABLE_NAME = os.environ.get("DYNAMODB_POLESTAT_TABLE", "pole_stat")
+ANOMALY_TABLE_NAME = os.environ.get("DYNAMODB_ANOMALY_TABLE", "loadcell_anomaly")
+
+# boto3 클라이언트는 스레드 간에 공유해도 안전하므로 실행기 스레드에서 그대로 사용합니다
 dynamodb_client = boto3.client('dynamodb', region_name=AWS_REGION)
-# loadcell_history 테이블 리소스
-history_table = boto3.resource('dynamodb', region_name=AWS_REGION).Table('loadcell_history')
+# loadcell_history 기록은 버퍼에 모아 batch_write_item으로 보냅니다
+history_writer = BatchWriter(dynamodb_client, HISTORY_TABLE_NAME, key_attrs=('loadcel', 'timestamp'))
+# INGEST_MODE가 stream/file이면 전체 스캔 대신 변경 스트림을 읽습니다
+change_source = create_change_source(INGEST_MODE, dynamodb_client, TABLE_NAME, AWS_REGION, consumer="broadcaster")
+# 곡선 복원에 필요한 점만 히스토리에 남깁니다
+history_compressor = DeadbandCompressor()
+# 로드셀별 투여 속도/남은 시간 추정 (서버에서 한 번만 계산하여 모든 대시보드에 보냅니다)
+rate_estimator = RateEstimator()
+# 알림 조건은 서버에서 읽기마다 한 번만 평가하고, 대시보드는 결과(알림 이벤트)만 받아서 표시합니다
+alert_engine = AlertEngine()
+# 영점 절차의 tare / pole_stat 기록도 버퍼에 모아 보냅니다
+tare_writer = BatchWriter(dynamodb_client, TARE_TABLE_NAME, key_attrs=('loadcel',))
+polestat_writer = BatchWriter(dynamodb_client, POLESTAT_TABLE_NAME, key_attrs=('pole_id', 'timestamp'))
+# 영점 절차의 대기 시간은 스레드나 sleep 대신 이벤트 루프의 타이머 휠 하나로 처리합니다
+timer_wheel = TimerWheel()
+
+def latest_reading(loadcel):
+    """로드셀의 최신 읽기 (영점 요청 때만 쓰이므로 필요할 때 디코딩합니다)"""
+    latest = state_log.latest.get(loadcel)
+    return json.loads(latest[1]) if latest else None
+
+def publish_tare(tare):
+    """영점 상태가 바뀌면 해당 로드셀을 구독한 대시보드에 보냅니다. (로드셀별 최신 상태만 남도록 병합)"""
+    message = json.dumps(tare)
+    for channel in subscriptions.recipients(tare["loadcel"]):
+        channel.enqueue(("tare", tare["loadcel"]), message)
+
+tare_scheduler = TareScheduler(timer_wheel, tare_writer, polestat_writer, latest_reading, publish_tare)
+# 이상(급변/투여 속도 변화) 탐지도 읽기가 들어올 때 한 번만 하고, 이벤트는 loadcell_anomaly에 남겨 페이지가 읽습니다
+outlier_detector = OutlierDetector()
+anomaly_writer = BatchWriter(dynamodb_client, ANOMALY_TABLE_NAME, key_attrs=('loadcel', 'timestamp'))
+
+def detect_anomalies(changes):
+    """변경된 읽기를 폴대별 이상 탐지기에 넣고 이상 이벤트를 기록합니다."""
+    for data in changes:
+        try:
+            weight = float(data["current_weight"])
+        except (TypeError, ValueError):
+            continue
+        event = outlier_detector.update(data["loadcel"], parse_timestamp(data["timestamp"]), weight, data["timestamp"])
+        if event:
+            anomaly_writer.add(anomaly_item(event))
+
+def should_store_history(loadcel, current_weight, timestamp):
+    """압축 단계를 거쳐 이 읽기를 loadcell_history에 저장할지 결정합니다."""
+    try:
+        weight = float(current_weight)
+    except (TypeError, ValueError):
+        return True
+    return history_compressor.offer(loadcel, parse_timestamp(timestamp), weight)
 
 def upload_history(loadcel, current_weight, remaining_sec, timestamp):
     item = {
-        'loadcel': str(loadcel),
-        'current_weight_history': str(current_weight),
-        'remaining_sec_history': str(remaining_sec),
-        'timestamp': timestamp
+        'loadcel': {'S': str(loadcel)},
+        'current_weight_history': {'S': str(current_weight)},
+        'remaining_sec_history': {'S': str(remaining_sec)},
+        'timestamp': {'S': timestamp}
     }
-    history_table.put_item(Item=item)
-    print(f"[히스토리 업로드] {item}")
+    history_writer.add(item)
+
+# loadcel별로 마지막으로 전송한 상태 (timestamp, current_weight, remaining_sec)
+last_sent = {}
+
+def collect_changes(items):
+    """스캔 결과 중 마지막 전송 이후 값이 바뀐 로드셀만 골라냅니다."""
+    changes = []
+    for item in items:
+        loadcel_id = item.get('loadcel', {}).get('S')
+        current_weight = item.get('current_weight', {}).get('S')
+        remaining_sec = item.get('remaining_sec', {}).get('S')
+        timestamp = item.get('timestamp', {}).get('S')
+        if not loadcel_id or current_weight is None or remaining_sec is None or timestamp is None:
+            continue
+        state = (timestamp, current_weight, remaining_sec)
+        # 직전에 보낸 값과 같으면 건너뜁니다
+        if last_sent.get(loadcel_id) == state:
+            continue
+        last_sent[loadcel_id] = state
+        changes.append({
+            "loadcel": loadcel_id,
+            "current_weight": current_weight,
+            "remaining_sec": remaining_sec,
+            "timestamp": timestamp
+        })
+    return changes
+
+def attach_rate_estimates(changes):
+    """변경된 읽기로 투여 속도 추정기를 한 번에 갱신하고 추정값(flow_rate, est_remaining_sec 등)을 붙입니다."""
+    readings = []
+    for data in changes:
+        try:
+            readings.append((data["loadcel"], parse_timestamp(data["timestamp"]), float(data["current_weight"])))
+        except (TypeError, ValueError):
+            continue
+    if not readings:
+        return
+    loadcels, timestamps, weights = zip(*readings)
+    rate_estimator.update_batch(loadcels, timestamps, weights)
+    estimates = rate_estimator.estimates(set(loadcels))
+    for data in changes:
+        data.update(estimates.get(data["loadcel"], {}))
+
+async def fetch_items():
+    """scan 모드면 테이블 전체를, 스트림 모드면 마지막 체크포인트 이후의 변경분만 가져옵니다."""
+    if change_source is not None:
+        return await run_aws(change_source.poll), []
+    # DynamoDB 호출은 전용 스레드 풀에서 실행하고 이벤트 루프는 팬아웃만 담당합니다
+    # (페이지네이션을 끝까지 따라가며, 세그먼트가 여러 개면 병렬로 스캔합니다)
+    items, timings = await scan_table_async(dynamodb_client, TABLE_NAME)
+    if max(t["seconds"] for t in timings) > POLL_INTERVAL_SECONDS:
+        print(f"[경고] 스캔이 폴링 간격보다 오래 걸립니다. {format_timings(timings)}")
+    return items, timings
 
 async def broadcast_data():
+    last_stats = time.monotonic()
+    timings = []
+    interval = STREAM_POLL_INTERVAL_SECONDS if change_source is not None else POLL_INTERVAL_SECONDS
     while True:
         try:
-            response = dynamodb_client.scan(TableName=TABLE_NAME)
-            items = response.get('Items', [])
-            for item in items:
-                loadcel_id = item.get('loadcel', {}).get('S')
-                current_weight = item.get('current_weight', {}).get('S')
-                remaining_sec = item.get('remaining_sec', {}).get('S')
-                timestamp = item.get('timestamp', {}).get('S')
-                # 디버그용 출력
-                print(f"[DynamoDB 폴링] id: {loadcel_id}, 무게: {current_weight}, 남은 시간: {remaining_sec}, 시간: {timestamp}")
-                if loadcel_id and current_weight is not None and remaining_sec is not None and timestamp is not None:
-                    data_to_send = {
-                        "loadcel": loadcel_id,
-                        "current_weight": current_weight,
-                        "remaining_sec": remaining_sec,
-                        "timestamp": timestamp
-                    }
-                    # 연결된 모든 클라이언트에게 전송
-                    if clients:
-                        await asyncio.gather(*[client.send(json.dumps(data_to_send)) for client in clients])
-                    # loadcell_history 테이블에 업로드
-                    upload_history(loadcel_id, current_weight, remaining_sec, timestamp)
-                    print(f"[히스토리 업로드] {item}")
+            items, timings = await fetch_items()
+            changes = collect_changes(items)
+            # 디버그용 출력
+            if items:
+                print(f"[DynamoDB {INGEST_MODE}] 수신: {len(items)}개, 변경: {len(changes)}개")
+            if changes:
+                attach_rate_estimates(changes)
+                # 변경된 로드셀마다 한 번만 인코딩하고 클라이언트별 대기열에 넣습니다.
+                # 실제 전송은 각 클라이언트의 전송 태스크가 따로 처리하므로 느린 클라이언트가 다른 클라이언트를 막지 않습니다.
+                # 시퀀스 번호를 붙여 재전송 로그에 기록합니다
+                # 각 변경은 해당 로드셀을 구독한 클라이언트에게만 보냅니다
+                for data in changes:
+                    loadcel_id = data["loadcel"]
+                    message = state_log.record(loadcel_id, dict(data))
+                    for channel in subscriptions.recipients(loadcel_id):
+                        channel.enqueue(loadcel_id, message)
+                # 알림 상태가 바뀐 경우에만 이벤트를 보냅니다 (이벤트는 병합되지 않도록 각자 다른 key를 씁니다)
+                for data in changes:
+                    for event in alert_engine.evaluate(data["loadcel"], data):
+                        message = json.dumps(event)
+                        for channel in subscriptions.recipients(data["loadcel"]):
+                            channel.enqueue(("alert", event["id"], event["state"]), message)
+                detect_anomalies(changes)
+                # loadcell_history 테이블에 업로드 (값이 바뀐 읽기만, 실제 기록은 history_writer가 처리)
+                for data in changes:
+                    if should_store_history(data["loadcel"], data["current_weight"], data["timestamp"]):
+                        upload_history(data["loadcel"], data["current_weight"], data["remaining_sec"], data["timestamp"])
+            # 처리가 끝난 변경분까지 체크포인트를 저장하여 재시작 시 다시 읽지 않도록 합니다
+            if change_source is not None:
+                await run_aws(change_source.commit)
         except Exception as e:
             print(f"DynamoDB 폴링/브로드캐스트 오류: {e}")
-        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        if time.monotonic() - last_stats >= STATS_INTERVAL_SECONDS:
+            print(format_stats(clients))
+            if timings:
+                print(format_timings(timings))
+            print(f"[히스토리 기록 통계] {history_writer.stats}, 대기: {len(history_writer.buffer)}개")
+            print(history_compressor.format_stats())
+            print(alert_engine.format_stats())
+            print(tare_scheduler.format_stats())
+            print(outlier_detector.format_stats())
+            last_stats = time.monotonic()
+        await asyncio.sleep(interval)
+
+def send_resume(channel, last_seq=None, epoch=None):
+    """hello 메시지 뒤에 전체 스냅샷 또는 last_seq 이후의 빠진 변경분을 대기열에 넣습니다. (구독한 로드셀만)"""
+    channel.enqueue(("hello",), state_log.hello())
+    for loadcel_id, message in state_log.resume(last_seq, epoch):
+        if subscriptions.matches(channel, loadcel_id):
+            channel.enqueue(loadcel_id, message)
+    send_alert_snapshot(channel)
+
+def send_topic_snapshot(channel, topics):
+    """새로 구독한 토픽에 해당하는 로드셀의 최신 상태를 보냅니다."""
+    for loadcel_id, message in state_log.snapshot():
+        if subscriptions.matches(channel, loadcel_id, topics):
+            channel.enqueue(loadcel_id, message)
+    send_alert_snapshot(channel)
+
+def send_alert_snapshot(channel):
+    """구독한 로드셀의 현재 발생 중인 알림 목록, 장비별 임계값, 영점 상태를 보냅니다. (클라이언트는 목록을 통째로 교체합니다)"""
+    alerts = [event for event in alert_engine.active_events() if subscriptions.matches(channel, event["loadcel"])]
+    channel.enqueue(("alert_snapshot",), json.dumps({"type": "alert_snapshot", "alerts": alerts}))
+    channel.enqueue(("alert_thresholds",), alert_engine.thresholds_message())
+    tares = [tare for tare in tare_scheduler.active() if subscriptions.matches(channel, tare["loadcel"])]
+    channel.enqueue(("tare_snapshot",), json.dumps({"type": "tare_snapshot", "tares": tares}))
+
+def parse_seq(value):
+    """클라이언트가 보낸 시퀀스 번호를 int로 바꿉니다. 없거나 잘못된 값이면 None (전체 스냅샷을 보냅니다)"""
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+def parse_connect_query(websocket, path):
+    """접속 경로의 ?last_seq=N&epoch=E&topics=1,2,W3-* 를 읽습니다."""
+    if path is None:
+        # websockets 13 이상의 새 API는 path 인자 대신 request 객체를 제공합니다
+        request = getattr(websocket, "request", None)
+        path = getattr(request, "path", None) or getattr(websocket, "path", "") or ""
+    # 빈 값(?topics=)도 남겨야 "아무것도 받지 않음"과 "지정하지 않음"을 구별할 수 있습니다
+    query = parse_qs(urlparse(path).query, keep_blank_values=True)
+    last_seq = parse_seq(query.get("last_seq", [None])[0])
+    epoch = query.get("epoch", [None])[0] or None
+    # topics를 지정하지 않으면 모든 로드셀을 받습니다 (빈 값이면 아무것도 받지 않음)
+    topics = parse_topics(query["topics"][0]) if "topics" in query else [ALL_TOPICS]
+    return last_seq, epoch, topics
+
+def handle_control(channel, message):
+    """클라이언트가 보낸 제어 메시지를 처리합니다."""
+    try:
+        control = json.loads(message)
+    except (TypeError, ValueError):
+        return
+    # 중계기(dynamodb_to_websocket.py)가 보내는 데이터 프레임(JSON 배열)은 무시합니다
+    if not isinstance(control, dict):
+        return
+    message_type = control.get("type")
+    if message_type == "resume":
+        send_resume(channel, parse_seq(control.get("last_seq")), control.get("epoch"))
+    elif message_type == "subscribe":
+        added = subscriptions.subscribe(channel, parse_topics(control.get("topics")))
+        send_topic_snapshot(channel, added)
+    elif message_type == "unsubscribe":
+        subscriptions.unsubscribe(channel, parse_topics(control.get("topics")))
+        send_alert_snapshot(channel)
+    elif message_type == "set_alert_thresholds":
+        # 설정 페이지에서 바꾼 장비별 임계값을 저장하고 모든 대시보드에 알립니다
+        loadcel_id = control.get("loadcel")
+        if not loadcel_id:
+            return
+        if not alert_engine.set_thresholds(str(loadcel_id), control.get("almost_weight"), control.get("done_weight")):
+            return
+        message = alert_engine.thresholds_message()
+        for other in clients:
+            other.enqueue(("alert_thresholds",), message)
+    elif message_type == "tare":
+        # 대시보드의 영점 버튼: 이후 절차(요청 해제, 수액팩 무게 기록)는 타이머 휠이 진행합니다
+        loadcel_id = control.get("loadcel")
+        if not loadcel_id or tare_scheduler.request(str(loadcel_id)) is None:
+            print(f"[영점 절차] 최신 읽기가 없어 시작할 수 없습니다: {loadcel_id}")
 
 async def handler(websocket, path=None):
-    clients.add(websocket)
+    channel = ClientChannel(websocket)
+    channel.start()
+    clients.add(channel)
     try:
-        await websocket.wait_closed()
+        last_seq, epoch, topics = parse_connect_query(websocket, path)
+        subscriptions.subscribe(channel, topics)
+        # 새 클라이언트에게는 즉시 스냅샷을, 재접속 클라이언트에게는 빠진 부분만 보냅니다
+        send_resume(channel, last_seq, epoch)
+        async for message in websocket:
+            handle_control(channel, message)
+    except websockets.ConnectionClosed:
+        pass
     finally:
-        clients.remove(websocket)
+        clients.discard(channel)
+        subscriptions.remove_client(channel)
+        channel.close()
 
 async def main():
     print("WebSocket + DynamoDB 브로드캐스트 서버 실행!")
-    async with websockets.serve(handler, "0.0.0.0", 6789):
-        await broadcast_data()  # 폴링 및 브로드캐스트 루프 실행
+    history_writer.start()
+    tare_writer.start()
+    polestat_writer.start()
+    anomaly_writer.start()
+    timer_task = asyncio.create_task(timer_wheel.run())
+    try:
+        async with websockets.serve(handler, "0.0.0.0", 6789):
+            await broadcast_data()  # 폴링 및 브로드캐스트 루프 실행
+    finally:
+        timer_task.cancel()
+        # 종료 시 버퍼에 남은 히스토리/영점/이상 기록을 모두 기록합니다
+        await history_writer.close()
+        await tare_writer.close()
+        await polestat_writer.close()
+        await anomaly_writer.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
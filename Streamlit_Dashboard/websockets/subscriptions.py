@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+# 모든 로드셀을 받는 토픽 (접속 시 기본값)
+ALL_TOPICS = "*"
+
+def parse_topics(value):
+    """"1,2,W3-*" 형식의 문자열이나 목록을 토픽 목록으로 바꿉니다."""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(topic).strip() for topic in (value or []) if str(topic).strip()]
+
+class SubscriptionIndex:
+    """토픽 -> 구독 클라이언트 집합 색인
+
+    토픽은 로드셀 ID("12") 또는 '*'로 끝나는 접두사("W3-*", 병동 단위)입니다.
+    '*' 하나는 빈 접두사이므로 모든 로드셀과 일치합니다.
+    """
+
+    def __init__(self):
+        self.exact = defaultdict(set)
+        self.prefixes = defaultdict(set)
+        # 클라이언트 -> 구독 중인 토픽
+        self.topics = defaultdict(set)
+
+    def subscribe(self, channel, topics):
+        """새로 구독한 토픽 목록을 반환합니다."""
+        added = []
+        for topic in topics:
+            if topic in self.topics[channel]:
+                continue
+            if topic.endswith("*"):
+                self.prefixes[topic[:-1]].add(channel)
+            else:
+                self.exact[topic].add(channel)
+            self.topics[channel].add(topic)
+            added.append(topic)
+        return added
+
+    def unsubscribe(self, channel, topics):
+        for topic in topics:
+            if topic not in self.topics.get(channel, ()):
+                continue
+            index, key = (self.prefixes, topic[:-1]) if topic.endswith("*") else (self.exact, topic)
+            index[key].discard(channel)
+            if not index[key]:
+                del index[key]
+            self.topics[channel].discard(topic)
+
+    def remove_client(self, channel):
+        self.unsubscribe(channel, list(self.topics.get(channel, ())))
+        self.topics.pop(channel, None)
+
+    def recipients(self, loadcel):
+        """이 로드셀의 변경을 받아야 하는 클라이언트 집합 (로드셀 ID 길이에 비례하는 비용)"""
+        result = set(self.exact.get(loadcel, ()))
+        for end in range(len(loadcel) + 1):
+            channels = self.prefixes.get(loadcel[:end])
+            if channels:
+                result |= channels
+        return result
+
+    @staticmethod
+    def topic_matches(topic, loadcel):
+        return loadcel.startswith(topic[:-1]) if topic.endswith("*") else loadcel == topic
+
+    def matches(self, channel, loadcel, topics=None):
+        """channel(또는 주어진 토픽 목록)이 이 로드셀을 구독하고 있는지 확인합니다."""
+        topics = self.topics.get(channel, ()) if topics is None else topics
+        return any(self.topic_matches(topic, loadcel) for topic in topics)
@@ -0,0 +1,201 @@
+import asyncio
+import math
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# 타이머 휠 한 칸의 시간 (초)과 칸 수. 한 바퀴(칸 수 × 틱)보다 긴 타이머는 여러 바퀴 뒤에 실행됩니다
+TIMER_TICK_SECONDS = float(os.environ.get("TIMER_TICK_SECONDS", "0.5"))
+TIMER_WHEEL_SLOTS = int(os.environ.get("TIMER_WHEEL_SLOTS", "256"))
+# 영점 요청(tare_required=True)을 유지하는 시간 (초), 이후 False로 되돌립니다
+TARE_REQUIRED_SECONDS = float(os.environ.get("TARE_REQUIRED_SECONDS", "10"))
+# 영점 후 수액팩을 거는 데 주는 시간 (초), 이후의 무게를 수액팩 전체 무게로 기록합니다
+TARE_HANG_SECONDS = float(os.environ.get("TARE_HANG_SECONDS", "30"))
+# 수액팩이 아직 걸리지 않았으면 이 간격으로 다시 확인합니다
+TARE_RETRY_SECONDS = 5.0
+# 이 시간 안에 수액팩 무게를 잡지 못하면 영점 절차를 만료시킵니다 (상태가 무한히 남지 않도록)
+TARE_CAPTURE_TIMEOUT_SECONDS = float(os.environ.get("TARE_CAPTURE_TIMEOUT_SECONDS", "600"))
+
+KST = timezone(timedelta(hours=9))
+
+# 영점 절차 상태: 영점 요청 -> 수액팩 대기 -> 전체 무게 기록 (또는 만료)
+TARE_REQUIRED = "tare_required"
+TARE_PENDING = "pending"
+TARE_CAPTURED = "captured"
+TARE_EXPIRED = "expired"
+
+class TimerWheel:
+    """해시 타이머 휠
+
+    타이머는 만료 틱을 칸 수로 나눈 나머지 칸에 들어가므로 예약/취소가 O(1)이고,
+    틱마다 현재 칸만 확인합니다. 스레드 없이 이벤트 루프의 run() 태스크 하나로 모든 타이머를 처리합니다.
+    """
+
+    def __init__(self, tick=TIMER_TICK_SECONDS, slots=TIMER_WHEEL_SLOTS, clock=time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        # 칸마다 타이머 ID -> (만료 틱, 콜백, 인자)
+        self.slots = [{} for _ in range(slots)]
+        # 타이머 ID -> 칸 번호 (취소용)
+        self.timers = {}
+        self.current_tick = int(clock() / tick)
+        self.next_id = 0
+
+    def schedule(self, delay, callback, *args):
+        """delay초 뒤에 callback(*args)를 실행하도록 예약하고 타이머 ID를 반환합니다."""
+        due_tick = max(math.ceil((self.clock() + delay) / self.tick), self.current_tick + 1)
+        self.next_id += 1
+        slot = due_tick % len(self.slots)
+        self.slots[slot][self.next_id] = (due_tick, callback, args)
+        self.timers[self.next_id] = slot
+        return self.next_id
+
+    def cancel(self, timer_id):
+        slot = self.timers.pop(timer_id, None)
+        if slot is None:
+            return False
+        del self.slots[slot][timer_id]
+        return True
+
+    def advance(self, now=None):
+        """now(기본: 현재 시각)까지 만료된 타이머를 실행하고 실행한 개수를 반환합니다."""
+        target = int((self.clock() if now is None else now) / self.tick)
+        fired = 0
+        while self.current_tick < target:
+            self.current_tick += 1
+            bucket = self.slots[self.current_tick % len(self.slots)]
+            due = [timer_id for timer_id, (due_tick, _, _) in bucket.items() if due_tick <= self.current_tick]
+            for timer_id in due:
+                _, callback, args = bucket.pop(timer_id)
+                del self.timers[timer_id]
+                try:
+                    callback(*args)
+                except Exception as e:
+                    print(f"[타이머 오류] {e}")
+                fired += 1
+        return fired
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.advance()
+
+    def __len__(self):
+        return len(self.timers)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class TareScheduler:
+    """로드셀별 영점 절차(영점 요청 -> 수액팩 대기 -> 전체 무게 기록)를 타이머 휠로 진행하는 상태 기계
+
+    latest(loadcel)은 로드셀의 최신 읽기(dict)를, publish(event)는 상태가 바뀔 때마다 호출되어 대시보드에 알립니다.
+    tare / pole_stat 기록은 BatchWriter에 넣기만 하므로 절차 하나가 스레드나 요청을 붙잡지 않습니다.
+    """
+
+    def __init__(self, wheel, tare_writer, polestat_writer, latest, publish, clock=time.time):
+        self.wheel = wheel
+        # 대시보드가 남은 시간을 계산하도록 requested_at / capture_at은 epoch 초로 보냅니다
+        self.clock = clock
+        self.tare_writer = tare_writer
+        self.polestat_writer = polestat_writer
+        self.latest = latest
+        self.publish = publish
+        # loadcel -> 영점 상태 (대시보드로 보내는 메시지와 같은 dict)
+        self.tares = {}
+        # loadcel -> 진행 중인 타이머 ID 목록
+        self.timers = {}
+        self.stats = {"requested": 0, "captured": 0, "expired": 0}
+
+    def request(self, loadcel):
+        """현재 무게를 영점으로 잡고 절차를 (다시) 시작합니다. 최신 읽기가 없으면 None을 반환합니다."""
+        reading = self.latest(loadcel)
+        weight = _to_float(reading.get("current_weight")) if reading else None
+        if weight is None:
+            return None
+        self._cancel_timers(loadcel)
+        now = self.clock()
+        self.stats["requested"] += 1
+        self._write_tare(loadcel, True)
+        self.timers[loadcel] = [
+            self.wheel.schedule(TARE_REQUIRED_SECONDS, self._release, loadcel),
+            self.wheel.schedule(TARE_HANG_SECONDS, self._capture, loadcel, now + TARE_CAPTURE_TIMEOUT_SECONDS),
+        ]
+        return self._set(loadcel, {
+            "type": "tare", "loadcel": loadcel, "state": TARE_REQUIRED,
+            "tare_offset": weight, "tare_timestamp": reading.get("timestamp"),
+            "requested_at": now, "capture_at": now + TARE_HANG_SECONDS, "full_weight": None
+        })
+
+    def _release(self, loadcel):
+        """영점 요청 시간이 지나면 tare_required / tare_requested를 False로 되돌립니다."""
+        tare = self.tares.get(loadcel)
+        if tare is None or tare["state"] != TARE_REQUIRED:
+            return
+        self._write_tare(loadcel, False)
+        self._write_polestat(loadcel, self.latest(loadcel) or {})
+        self._set(loadcel, dict(tare, state=TARE_PENDING))
+
+    def _capture(self, loadcel, expires_at):
+        """수액팩 대기 시간이 지나면 (현재 무게 - 영점)을 전체 무게로 기록합니다. 아직 0 이하면 다시 확인합니다."""
+        tare = self.tares.get(loadcel)
+        if tare is None or tare["state"] not in (TARE_REQUIRED, TARE_PENDING):
+            return
+        reading = self.latest(loadcel) or {}
+        weight = _to_float(reading.get("current_weight"))
+        full_weight = weight - tare["tare_offset"] if weight is not None else 0
+        if full_weight > 0:
+            self.timers.pop(loadcel, None)
+            self.stats["captured"] += 1
+            self._set(loadcel, dict(tare, state=TARE_CAPTURED, full_weight=round(full_weight, 1)))
+        elif self.clock() >= expires_at:
+            self.timers.pop(loadcel, None)
+            self.stats["expired"] += 1
+            self._set(loadcel, dict(tare, state=TARE_EXPIRED))
+        else:
+            self.timers[loadcel] = [self.wheel.schedule(TARE_RETRY_SECONDS, self._capture, loadcel, expires_at)]
+
+    def _cancel_timers(self, loadcel):
+        for timer_id in self.timers.pop(loadcel, []):
+            self.wheel.cancel(timer_id)
+
+    def _set(self, loadcel, tare):
+        self.tares[loadcel] = tare
+        self.publish(tare)
+        return tare
+
+    def _write_tare(self, loadcel, value):
+        self.tare_writer.add({
+            'loadcel': {'S': str(loadcel)},
+            'tare_required': {'BOOL': value},
+            'updated_at': {'S': _now_kst()}
+        })
+
+    def _write_polestat(self, loadcel, reading):
+        item = {
+            'pole_id': {'N': str(loadcel)} if str(loadcel).isdigit() else {'S': str(loadcel)},
+            'timestamp': {'S': _now_kst()},
+            'tare_requested': {'BOOL': False}
+        }
+        # 상세 정보 페이지가 최신 pole_stat의 배터리 값을 읽으므로 알고 있는 값은 함께 기록합니다
+        battery = _to_float(reading.get("battery"))
+        if battery is not None:
+            item['battery_level'] = {'N': str(battery)}
+        if "is_lost" in reading:
+            item['is_lost'] = {'BOOL': reading["is_lost"] in (True, "true", "True", "1", 1)}
+        self.polestat_writer.add(item)
+
+    def active(self):
+        """모든 로드셀의 현재 영점 상태 목록"""
+        return list(self.tares.values())
+
+    def format_stats(self):
+        in_progress = sum(1 for tare in self.tares.values() if tare["state"] in (TARE_REQUIRED, TARE_PENDING))
+        return f"[영점 절차] 진행 중: {in_progress}개, 타이머: {len(self.wheel)}개, 누적: {self.stats}"
+
+def _now_kst():
+    # 대시보드가 기록하던 것과 같은 KST ISO 형식
+    return datetime.now(KST).isoformat()
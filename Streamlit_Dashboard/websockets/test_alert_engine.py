@@ -0,0 +1,79 @@
+"""AlertEngine 상태 기계: 히스테리시스, 회복 시 해제, 장비별 임계값 저장"""
+
+from alert_engine import (ALERT_HYSTERESIS_G, BATTERY_HYSTERESIS_PERCENT, DEFAULT_ALMOST_WEIGHT, DEFAULT_DONE_WEIGHT,
+                          LOW_BATTERY_PERCENT, RULE_ALMOST_DONE, RULE_DONE, RULE_LOW_BATTERY, RULE_NURSE_CALL,
+                          AlertEngine)
+
+def reading(weight, t=0, **extra):
+    return dict(current_weight=str(weight), remaining_sec="600", timestamp=f"t{t}", **extra)
+
+def states(events):
+    return sorted((event["rule"], event["state"]) for event in events)
+
+def test_no_refire_inside_hysteresis_band(tmp_path):
+    engine = AlertEngine(thresholds_path=str(tmp_path / "thresholds.json"))
+    threshold = DEFAULT_ALMOST_WEIGHT
+    assert states(engine.evaluate("1", reading(threshold + 1))) == []
+    assert states(engine.evaluate("1", reading(threshold))) == [(RULE_ALMOST_DONE, "active")]
+    # 기준 위로 올라가도 히스테리시스 경계(기준 + ALERT_HYSTERESIS_G)까지는 해제/재발생하지 않습니다
+    for weight in (threshold + 1, threshold - 5, threshold + ALERT_HYSTERESIS_G, threshold, threshold + ALERT_HYSTERESIS_G / 2):
+        assert engine.evaluate("1", reading(weight)) == [], weight
+    assert [event["rule"] for event in engine.active_events()] == [RULE_ALMOST_DONE]
+    assert engine.seq == 1
+
+def test_refires_after_leaving_band(tmp_path):
+    engine = AlertEngine(thresholds_path=str(tmp_path / "thresholds.json"))
+    first = engine.evaluate("1", reading(DEFAULT_ALMOST_WEIGHT))[0]
+    assert states(engine.evaluate("1", reading(DEFAULT_ALMOST_WEIGHT + ALERT_HYSTERESIS_G + 1))) == [(RULE_ALMOST_DONE, "cleared")]
+    second = engine.evaluate("1", reading(DEFAULT_ALMOST_WEIGHT))[0]
+    assert second["state"] == "active" and second["id"] != first["id"]
+
+def test_clear_on_recovery(tmp_path):
+    engine = AlertEngine(thresholds_path=str(tmp_path / "thresholds.json"))
+    assert states(engine.evaluate("1", reading(DEFAULT_DONE_WEIGHT - 30))) == [(RULE_DONE, "active"), (RULE_ALMOST_DONE, "active")]
+    # 0g(수액 분리)에서는 무게 알림 상태를 그대로 둡니다
+    assert engine.evaluate("1", reading(0)) == []
+    # 새 수액팩을 걸면 두 알림이 모두 해제됩니다
+    cleared = engine.evaluate("1", reading(1000))
+    assert states(cleared) == [(RULE_DONE, "cleared"), (RULE_ALMOST_DONE, "cleared")]
+    assert not engine.active_events()
+    # 해제 이벤트는 발생 이벤트와 같은 ID를 씁니다
+    assert {event["id"] for event in cleared} == {event["id"] for event in engine.history if event["state"] == "active"}
+
+    battery_low, battery_ok = LOW_BATTERY_PERCENT, LOW_BATTERY_PERCENT + BATTERY_HYSTERESIS_PERCENT + 1
+    assert states(engine.evaluate("2", reading(0, battery=str(battery_low), nurse_call=True))) == [
+        (RULE_LOW_BATTERY, "active"), (RULE_NURSE_CALL, "active")]
+    assert engine.evaluate("2", reading(0, battery=str(battery_low + 1))) == []
+    assert states(engine.evaluate("2", reading(0, battery=str(battery_ok), nurse_call=False))) == [
+        (RULE_LOW_BATTERY, "cleared"), (RULE_NURSE_CALL, "cleared")]
+
+def test_threshold_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "thresholds.json")
+    engine = AlertEngine(thresholds_path=path)
+    assert engine.get_thresholds("2") == (DEFAULT_ALMOST_WEIGHT, DEFAULT_DONE_WEIGHT)
+    engine.set_thresholds("2", almost_weight=400, done_weight=100)
+    engine.set_thresholds("2", done_weight=120)
+    # 다시 시작한 엔진도 같은 임계값을 읽고, 그 값으로 평가합니다
+    restarted = AlertEngine(thresholds_path=path)
+    assert restarted.get_thresholds("2") == (400, 120)
+    assert restarted.get_thresholds("3") == (DEFAULT_ALMOST_WEIGHT, DEFAULT_DONE_WEIGHT)
+    assert states(restarted.evaluate("2", reading(390))) == [(RULE_ALMOST_DONE, "active")]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["thresholds.json"]
+
+def test_state_and_history_bounded(tmp_path):
+    engine = AlertEngine(thresholds_path=str(tmp_path / "thresholds.json"), history_size=50)
+    for cycle in range(20):
+        for pole in range(100):
+            for weight in (1000, 250, 100, 1000):
+                engine.evaluate(f"p{pole}", reading(weight, cycle))
+    assert not engine.active and len(engine.history) == 50
+
+def test_invalid_thresholds_are_ignored(tmp_path):
+    path = str(tmp_path / "thresholds.json")
+    engine = AlertEngine(thresholds_path=path)
+    assert engine.set_thresholds("2", almost_weight="400", done_weight=100)
+    for bad in ({"almost_weight": "abc"}, {"done_weight": [1]}, {"almost_weight": {"g": 1}}, {"done_weight": "nan"}):
+        assert not engine.set_thresholds("2", **bad), bad
+    # 잘못된 값이 섞인 요청은 아무것도 바꾸지 않습니다
+    assert not engine.set_thresholds("2", almost_weight=500, done_weight="x")
+    assert AlertEngine(thresholds_path=path).get_thresholds("2") == (400, 100)
@@ -0,0 +1,44 @@
+"""BatchWriter: 기록에 실패한 묶음을 되돌릴 때 버퍼가 가득 차 있으면 가장 오래된 항목부터 버리고 셉니다."""
+
+import asyncio
+
+from batch_writer import BatchWriter
+
+def item(i):
+    return {"k": {"S": str(i)}}
+
+def keys(writer):
+    return [int(entry["k"]["S"]) for entry in writer.buffer]
+
+class FailingClient:
+    """batch_write_item이 진행되는 동안 새 항목이 쌓인 뒤 실패하는 클라이언트 대역"""
+
+    def __init__(self, writer, arriving):
+        self.writer = writer
+        self.arriving = arriving
+        self.calls = 0
+
+    def batch_write_item(self, RequestItems):
+        self.calls += 1
+        for i in self.arriving:
+            self.writer.add(item(i))
+        raise RuntimeError("ProvisionedThroughputExceededException")
+
+def flush_failing(max_buffer, initial, arriving):
+    writer = BatchWriter(None, "t", key_attrs=("k",), max_buffer=max_buffer)
+    writer.client = FailingClient(writer, arriving)
+    for i in initial:
+        writer.add(item(i))
+    asyncio.run(writer.flush())
+    return writer
+
+def test_requeue_keeps_order_when_there_is_room():
+    writer = flush_failing(100, range(30), range(30, 40))
+    assert keys(writer) == list(range(40))
+    assert writer.stats["dropped"] == 0 and writer.client.calls == 1
+
+def test_requeue_on_full_buffer_drops_oldest_and_counts():
+    writer = flush_failing(30, range(30), range(30, 50))
+    # 가장 새 항목(49)은 남고, 되돌릴 묶음의 앞쪽 20개(0~19)를 버립니다
+    assert keys(writer) == list(range(20, 50))
+    assert writer.stats["dropped"] == 20
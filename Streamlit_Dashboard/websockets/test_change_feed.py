@@ -0,0 +1,94 @@
+"""변경 스트림 소스: 소비자별 체크포인트, commit() 전에 실패하면 같은 레코드를 다시 읽는지 확인합니다."""
+
+from change_feed import (CheckpointStore, DynamoDBStreamSource, FileStreamSource, append_record, checkpoint_path,
+                         create_change_source)
+
+def image(loadcel, weight):
+    return {"loadcel": {"S": loadcel}, "current_weight": {"N": str(weight)}}
+
+class FakeStreams:
+    """샤드 하나에 레코드 목록을 두고, 이터레이터 "it:<위치>"로 Limit개씩 돌려주는 DynamoDB Streams 대역"""
+
+    def __init__(self, records, closed=False):
+        self.records = records
+        self.closed = closed
+
+    def describe_stream(self, StreamArn, **kwargs):
+        return {"StreamDescription": {"Shards": [{"ShardId": "shard-1"}]}}
+
+    def get_shard_iterator(self, StreamArn, ShardId, ShardIteratorType, SequenceNumber=None):
+        position = 0 if ShardIteratorType == "TRIM_HORIZON" else len(self.records)
+        if SequenceNumber is not None:
+            position = int(SequenceNumber)
+        return {"ShardIterator": f"it:{position}"}
+
+    def get_records(self, ShardIterator, Limit):
+        position = int(ShardIterator.split(":")[1])
+        records = self.records[position:position + Limit]
+        end = position + len(records)
+        next_iterator = None if self.closed and end == len(self.records) else f"it:{end}"
+        return {"Records": records, "NextShardIterator": next_iterator}
+
+def stream_records(count):
+    return [{"eventName": "MODIFY", "dynamodb": {"NewImage": image(str(i), i), "SequenceNumber": str(i + 1)}}
+            for i in range(count)]
+
+def test_checkpoint_path_per_consumer(tmp_path, monkeypatch):
+    assert checkpoint_path("relay", "stream_checkpoints.json") == "stream_checkpoints.relay.json"
+    # 같은 스트림 파일을 읽는 두 소비자가 서로의 위치를 덮어쓰지 않습니다
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("change_feed.STREAM_FILE_PATH", "stream.jsonl")
+    for i in range(3):
+        append_record("stream.jsonl", image(str(i), i))
+    broadcaster = create_change_source("file", None, "loadcell", "ap-northeast-2", consumer="broadcaster")
+    relay = create_change_source("file", None, "loadcell", "ap-northeast-2", consumer="relay")
+    assert len(broadcaster.poll()) == 3
+    broadcaster.commit()
+    assert len(relay.poll()) == 3
+    relay.commit()
+    append_record("stream.jsonl", image("3", 3))
+    assert len(relay.poll()) == 1
+    relay.commit()
+    restarted = create_change_source("file", None, "loadcell", "ap-northeast-2", consumer="broadcaster")
+    assert [item["loadcel"]["S"] for item in restarted.poll()] == ["3"]
+    assert sorted(p.name for p in tmp_path.glob("stream_checkpoints*")) == [
+        "stream_checkpoints.broadcaster.json", "stream_checkpoints.relay.json"]
+
+def test_stream_rereads_until_commit(tmp_path):
+    streams = FakeStreams(stream_records(5))
+    source = DynamoDBStreamSource(streams, "arn", CheckpointStore(str(tmp_path / "checkpoints.json")))
+    source.iterators["shard-1"] = "it:0"
+    source.last_refresh = float("inf")
+    assert len(source.poll()) == 5
+    # 처리 도중 실패하여 commit()하지 못했으면 다음 폴링에서 같은 레코드를 다시 받습니다
+    assert len(source.poll()) == 5
+    source.commit()
+    assert source.checkpoints.get("shard-1") == "5"
+    assert source.poll() == []
+    streams.records += stream_records(7)[5:]
+    assert [item["loadcel"]["S"] for item in source.poll()] == ["5", "6"]
+    source.commit()
+    # 재시작하면 체크포인트 다음 레코드부터 읽습니다
+    restarted = DynamoDBStreamSource(streams, "arn", CheckpointStore(str(tmp_path / "checkpoints.json")))
+    streams.records += stream_records(8)[7:]
+    assert [item["loadcel"]["S"] for item in restarted.poll()] == ["7"]
+
+def test_closed_shard_finishes_on_commit(tmp_path):
+    source = DynamoDBStreamSource(FakeStreams(stream_records(2), closed=True), "arn",
+                                  CheckpointStore(str(tmp_path / "checkpoints.json")))
+    source.iterators["shard-1"] = "it:0"
+    source.last_refresh = float("inf")
+    assert len(source.poll()) == 2
+    assert "shard-1" in source.iterators and not source.finished
+    assert len(source.poll()) == 2
+    source.commit()
+    assert source.finished == {"shard-1"} and not source.iterators
+
+def test_file_source_rereads_until_commit(tmp_path):
+    path = str(tmp_path / "stream.jsonl")
+    source = FileStreamSource(path, CheckpointStore(path=None))
+    append_record(path, image("1", 100))
+    assert len(source.poll()) == 1
+    assert len(source.poll()) == 1
+    source.commit()
+    assert source.poll() == []
@@ -0,0 +1,52 @@
+"""클라이언트 제어 메시지: 잘못된 값이 와도 예외로 연결을 끊지 않고 무시하거나 전체 스냅샷으로 처리합니다."""
+
+import json
+
+from streamlit_websocket import alert_engine, clients, handle_control, parse_seq, state_log, subscriptions
+from subscriptions import ALL_TOPICS
+
+class FakeChannel:
+    def __init__(self):
+        self.queued = []
+
+    def enqueue(self, key, message):
+        self.queued.append((key, message))
+
+def resume(last_seq):
+    channel = FakeChannel()
+    subscriptions.subscribe(channel, [ALL_TOPICS])
+    try:
+        handle_control(channel, json.dumps({"type": "resume", "last_seq": last_seq, "epoch": state_log.epoch}))
+    finally:
+        subscriptions.remove_client(channel)
+    return channel.queued
+
+def test_parse_seq():
+    assert parse_seq("42") == 42 and parse_seq(7) == 7 and parse_seq(3.0) == 3
+    for value in (None, "", "abc", "3.5", [1], {"seq": 1}):
+        assert parse_seq(value) is None, value
+
+def test_resume_with_invalid_last_seq_sends_full_snapshot():
+    state_log.record("1", {"loadcel": "1", "current_weight": "500"})
+    # 문자열 시퀀스 번호도 정수처럼 처리하여 빠진 변경분만 보냅니다
+    assert [key for key, _ in resume(str(state_log.seq))][0] == ("hello",)
+    assert "1" not in [key for key, _ in resume(str(state_log.seq))]
+    # 숫자로 읽을 수 없는 값은 지정하지 않은 것과 같아서 전체 스냅샷을 보냅니다
+    for last_seq in ("abc", [1], {"seq": 1}):
+        assert "1" in [key for key, _ in resume(last_seq)], last_seq
+
+def test_invalid_alert_thresholds_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(alert_engine, "thresholds_path", str(tmp_path / "thresholds.json"))
+    monkeypatch.setattr(alert_engine, "thresholds", {})
+    channel = FakeChannel()
+    clients.add(channel)
+    try:
+        for bad in ("abc", [1], {"g": 1}):
+            handle_control(channel, json.dumps({"type": "set_alert_thresholds", "loadcel": "1", "almost_weight": bad}))
+        assert channel.queued == [] and alert_engine.thresholds == {}
+        # 올바른 값은 저장하고 모든 클라이언트에 알립니다
+        handle_control(channel, json.dumps({"type": "set_alert_thresholds", "loadcel": "1", "almost_weight": "250"}))
+        assert [key for key, _ in channel.queued] == [("alert_thresholds",)]
+        assert alert_engine.get_thresholds("1")[0] == 250
+    finally:
+        clients.discard(channel)
@@ -0,0 +1,29 @@
+"""ClientChannel 대기열: 같은 로드셀은 병합하고, 가득 차면 가장 오래된 로드셀 데이터만 버리고 셉니다."""
+
+from fanout import ClientChannel
+
+def test_coalesces_same_loadcel():
+    channel = ClientChannel(websocket=None, max_pending=4)
+    channel.enqueue(("hello",), "h")
+    channel.enqueue("1", "a")
+    channel.enqueue("2", "b")
+    channel.enqueue("1", "c")
+    assert list(channel.pending.items()) == [(("hello",), "h"), ("1", "c"), ("2", "b")]
+    assert channel.coalesced == 1 and channel.dropped_updates == 0
+
+def test_full_queue_keeps_hello_and_alerts():
+    channel = ClientChannel(websocket=None, max_pending=2)
+    channel.enqueue(("hello",), "h")
+    channel.enqueue("1", "a")
+    channel.enqueue(("alert", "e1", "active"), "alert")
+    channel.enqueue("2", "b")
+    channel.enqueue("3", "c")
+    # 가장 오래된 로드셀(1)만 버리고, 먼저 들어온 hello/알림은 순서대로 남습니다
+    assert list(channel.pending) == [("hello",), ("alert", "e1", "active"), "2", "3"]
+    for i in range(10):
+        channel.enqueue(("alert", f"e{i + 2}", "active"), "alert")
+    channel.enqueue("4", "d")
+    assert list(channel.pending)[:2] == [("hello",), ("alert", "e1", "active")]
+    assert [key for key in channel.pending if isinstance(key, str)] == ["3", "4"]
+    assert sum(isinstance(key, tuple) for key in channel.pending) == 12
+    assert channel.dropped_updates == 2
@@ -0,0 +1,64 @@
+"""
+히스토리 압축 재생 테스트
+
+가상의 수액 투여 기록을 1초 간격으로 재생하여 DeadbandCompressor를 통과시키고,
+통계 페이지(3_수액 사용 통계 분석.py)와 같은 방식으로 계산한 사용량 합계가
+압축 전후로 허용 오차 안에 있는지 확인합니다.
+"""
+
+import random
+
+from history_compression import DeadbandCompressor
+
+DEADBAND_G = 2.0
+MAX_SILENCE_SEC = 60
+
+def simulate_pole(seed, duration_sec=4 * 3600):
+    """수액 투여 -> 정지 -> 수액 교체 -> 재투여 패턴의 (초, 무게) 목록을 만듭니다."""
+    rng = random.Random(seed)
+    rate_gps = rng.uniform(80, 300) / 3600
+    weight = rng.uniform(800, 1000)
+    pause_start = rng.randint(3000, 5000)
+    pause_end = pause_start + rng.randint(300, 900)
+    refill_at = pause_end + 1
+    readings = []
+    for t in range(duration_sec):
+        if t == refill_at:
+            weight = 1000.0
+        elif not (pause_start <= t < pause_end):
+            weight = max(0.0, weight - rate_gps)
+        # 로드셀은 0.1g 단위로 보고합니다
+        readings.append((t, round(weight, 1)))
+    return readings
+
+def usage_total(readings):
+    """통계 페이지와 같은 방식: 직전 값 대비 감소량(음수는 0)의 합계 (g)"""
+    total = 0.0
+    prev = None
+    for _, weight in sorted(readings):
+        if prev is not None:
+            total += max(prev - weight, 0.0)
+        prev = weight
+    return total
+
+def replay(pole_count=20):
+    compressor = DeadbandCompressor(DEADBAND_G, MAX_SILENCE_SEC)
+    results = {}
+    for pole in range(pole_count):
+        loadcel = str(pole + 1)
+        raw = simulate_pole(seed=pole)
+        kept = [(t, w) for t, w in raw if compressor.offer(loadcel, t, w)]
+        results[loadcel] = (raw, kept)
+    return compressor, results
+
+def test_usage_totals_within_tolerance():
+    compressor, results = replay()
+    for loadcel, (raw, kept) in results.items():
+        # 단조 구간마다 마지막 저장점은 실제 값과 최대 데드밴드만큼 차이 날 수 있습니다
+        # (감소 구간 2개: 교체 전, 교체 후)
+        tolerance = DEADBAND_G * 2
+        assert abs(usage_total(raw) - usage_total(kept)) <= tolerance, loadcel
+        # 마지막 저장점 이후로도 데드밴드/무음 시간 조건이 지켜졌는지 확인합니다
+        last_t, last_w = kept[-1]
+        assert abs(raw[-1][1] - last_w) < DEADBAND_G or raw[-1][0] - last_t < MAX_SILENCE_SEC
+        assert compressor.ratio(loadcel) > 10, loadcel
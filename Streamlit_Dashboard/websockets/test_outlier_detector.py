@@ -0,0 +1,157 @@
+"""
+이상 탐지기 재생 테스트
+
+폴대 수백 개의 수 시간 기록(수액팩 교체, 연결 해제, 공백 포함)에 순간 급변, 계속 남는 급변,
+서서히 막히는 투여, 잡음이 큰 센서를 섞어 재생하여
+- 주입한 급변과 막힘을 모두 찾는지 (20분에 걸쳐 멈추는 막힘은 시작 후 45분 안에)
+- 잡음이 큰 센서에서 고정 기준(diff > 50g)처럼 이벤트가 쏟아지지 않는지
+- 폴대별 상태 크기가 일정한지
+- 일괄 모드(detect_frame)가 읽기마다 update()를 부른 것과 같은 이벤트를 만드는지
+확인합니다.
+"""
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+from history_compression import parse_timestamp
+from outlier_detector import KIND_DRIFT, KIND_JUMP, SEVERITY_CRITICAL, OutlierDetector, anomaly_item, detect_frame
+
+POLE_COUNT = 200
+INTERVAL_SEC = 5
+HOURS = 4
+START = datetime(2025, 1, 1, 8, 0, 0)
+
+def make_readings(rng):
+    """(loadcel, timestamp 문자열, 무게) 목록과 주입한 이상 {(loadcel, 종류): 시작 시각}"""
+    steps = HOURS * 3600 // INTERVAL_SEC
+    rows, injected, noisy = [], {}, set()
+    for pole in range(1, POLE_COUNT + 1):
+        loadcel = str(pole)
+        rate = rng.uniform(100, 300) / 3600 * INTERVAL_SEC
+        noise = 20.0 if pole % 10 in (0, 3) else 1.0
+        if noise > 1:
+            noisy.add(loadcel)
+        kind = ("spike", "drop", "occlusion", None, None)[pole % 5]
+        event_at = int(rng.integers(steps // 4, steps * 3 // 4))
+        gap = range(steps // 2, steps // 2 + 180) if pole % 7 == 0 else range(0)
+        if gap and gap.start - 1800 // INTERVAL_SEC <= event_at < gap.stop:
+            # 주입한 이상은 공백(속도를 새로 시작) 뒤 기준 속도가 다시 잡힌 뒤로 옮깁니다
+            event_at = gap.stop + 1800 // INTERVAL_SEC
+        weight = 1000.0
+        for i in range(steps):
+            flow = rate
+            if kind == "occlusion" and i >= event_at:
+                # 20분에 걸쳐 투여가 멈춥니다
+                flow = rate * max(0.0, 1 - (i - event_at) * INTERVAL_SEC / 1200)
+            weight -= flow
+            if weight < 150:
+                # 연결 해제(0g) 뒤 새 수액팩
+                rows.append((loadcel, i - 0.5, 0.0))
+                weight = 1000.0
+            measured = weight + rng.normal(0, noise)
+            if kind == "spike" and i == event_at:
+                measured -= 80
+            if kind == "drop" and i == event_at:
+                weight -= 25
+                measured -= 25
+            if i in gap:
+                continue
+            rows.append((loadcel, i, round(measured, 1)))
+        if kind:
+            injected[(loadcel, kind)] = event_at
+    readings = [(loadcel, (START + timedelta(seconds=i * INTERVAL_SEC)).isoformat(timespec="milliseconds"), w)
+                for loadcel, i, w in rows]
+    return readings, injected, noisy
+
+def at(i):
+    return (START + timedelta(seconds=i * INTERVAL_SEC)).isoformat(timespec="milliseconds")
+
+@lru_cache(maxsize=None)
+def replay():
+    """모든 읽기를 update()에 차례로 넣고 (읽기 목록, 주입한 이상, 잡음 센서, 탐지기, 이벤트 목록)을 반환합니다."""
+    readings, injected, noisy = make_readings(np.random.default_rng(0))
+    detector = OutlierDetector()
+    events = []
+    for loadcel, timestamp, weight in readings:
+        event = detector.update(loadcel, parse_timestamp(timestamp), weight, timestamp)
+        if event:
+            events.append(event)
+    return readings, injected, noisy, detector, events
+
+def events_by_pole():
+    by_pole = {}
+    for event in replay()[4]:
+        by_pole.setdefault(event["loadcel"], []).append(event)
+    return by_pole
+
+def test_injected_anomalies_detected():
+    _, injected, noisy, _, _ = replay()
+    by_pole = events_by_pole()
+    for (loadcel, kind), event_at in injected.items():
+        if loadcel in noisy:
+            # 잡음(20g)이 큰 센서에서 80g 순간 변화는 잡음과 구별되지 않습니다
+            continue
+        pole_events = by_pole.get(loadcel, [])
+        if kind in ("spike", "drop"):
+            # 주입한 읽기에서 바로 급변(아래 방향)으로 찾습니다
+            assert any(e["kind"] == KIND_JUMP and e["timestamp"] == at(event_at) and e["direction"] == "down"
+                       for e in pole_events), (loadcel, kind, pole_events)
+        else:
+            found = [e for e in pole_events if e["kind"] == KIND_DRIFT and e["direction"] == "up"
+                     and at(event_at) <= e["timestamp"] <= at(event_at + 2700 // INTERVAL_SEC)]
+            assert found, (loadcel, kind, pole_events)
+
+def test_event_counts():
+    readings, injected, noisy, _, _ = replay()
+    by_pole = events_by_pole()
+    # 이상을 주입하지 않은 폴대의 이벤트 수 (잡음 센서 포함)와 고정 기준의 이벤트 수 비교
+    quiet = {str(p) for p in range(1, POLE_COUNT + 1)} - {loadcel for loadcel, _ in injected}
+    frame = pd.DataFrame(readings, columns=["loadcel", "timestamp", "current_weight"])
+    old_flags = frame.groupby("loadcel")["current_weight"].diff().abs() > 50
+    old_noisy = int(old_flags[frame["loadcel"].isin(noisy & quiet)].sum())
+    new_noisy = sum(len(by_pole.get(loadcel, [])) for loadcel in noisy & quiet)
+    new_quiet = sum(len(by_pole.get(loadcel, [])) for loadcel in quiet - noisy)
+    assert noisy & quiet and new_noisy * 10 < old_noisy, (new_noisy, old_noisy)
+    assert new_quiet <= len(quiet - noisy) // 10, new_quiet
+
+def test_state_is_bounded():
+    _, _, _, detector, _ = replay()
+    assert len(detector.state) == POLE_COUNT and all(len(state) == 11 for state in detector.state.values())
+
+def test_batch_matches_streaming():
+    readings, _, _, _, events = replay()
+    frame = pd.DataFrame(readings, columns=["loadcel", "timestamp", "current_weight"])
+    frame["t"] = [parse_timestamp(timestamp) for timestamp in frame["timestamp"]]
+    batch = detect_frame(frame)
+    key = lambda e: (e["loadcel"], e["timestamp"], e["kind"], e["severity"], e["direction"], e["diff"])
+    assert sorted(map(key, batch)) == sorted(map(key, events)), set(map(key, batch)) ^ set(map(key, events))
+    scores = {key(e): e["score"] for e in events}
+    assert all(abs(scores[key(e)] - e["score"]) <= 0.01 for e in batch)
+    # 순서가 섞이고 0g / 중복 읽기가 끼어도 같은 결과입니다
+    shuffled = pd.concat([frame, frame.head(1000), frame.head(10).assign(current_weight=0.0)]).sample(frac=1, random_state=0)
+    assert sorted(map(key, detect_frame(shuffled))) == sorted(map(key, batch))
+
+def test_skips_disconnected_and_out_of_order_readings():
+    detector = OutlierDetector()
+    assert detector.update("1", 0.0, 1000.0, "t0") is None
+    for t in range(1, 60):
+        assert detector.update("1", t * 5.0, 1000.0 - t * 0.3, f"t{t}") is None
+    # 0g(연결 해제), 같은 시각, 이전 시각의 읽기는 상태를 바꾸지 않습니다
+    state = list(detector.state["1"])
+    assert detector.update("1", 300.0, 0.0, "t60") is None
+    assert detector.update("1", 295.0, 500.0, "t59") is None
+    assert detector.update("1", 100.0, 500.0, "t20") is None
+    assert detector.state["1"] == state
+
+def test_jump_event_item():
+    detector = OutlierDetector()
+    for t in range(60):
+        detector.update("7", t * 5.0, 1000.0 - t * 0.3, f"t{t}")
+    event = detector.update("7", 300.0, 1000.0 - 60 * 0.3 - 200, "t60")
+    assert event["kind"] == KIND_JUMP and event["severity"] == SEVERITY_CRITICAL and event["direction"] == "down"
+    assert event["diff"] == -200.0
+    item = anomaly_item(event)
+    assert item["loadcel"] == {"S": "7"} and item["timestamp"] == {"S": "t60"} and item["diff"] == {"N": "-200.0"}
+    assert float(item["score"]["N"]) < 0
@@ -0,0 +1,79 @@
+"""
+투여 속도 추정기 테스트
+
+속도가 서로 다른 가상의 폴대 여러 개를 1초 간격으로 재생하여 RateEstimator에 한 주기씩 묶어 넣고,
+추정한 투여 속도/남은 시간이 실제 값에 수렴하는지, 신뢰 구간이 실제 값을 포함하는지,
+수액팩 교체 후 다시 수렴하는지 확인합니다.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+from rate_estimator import DEFAULT_RATE_G_PER_H, RESET_GAP_SEC, RateEstimator
+
+POLE_COUNT = 1000
+DURATION_SEC = 30 * 60
+REFILL_AT_SEC = 20 * 60
+NOISE_G = 1.5
+START_TS = 1_700_000_000.0
+
+@lru_cache(maxsize=None)
+def replay():
+    """모든 폴대를 재생하고 {교체 직전 / 교체 후 10분: (추정값 dict, 실제 속도, 실제 무게)}를 반환합니다."""
+    rng = np.random.default_rng(0)
+    loadcels = [str(i) for i in range(POLE_COUNT)]
+    true_rate = rng.uniform(60, 400, POLE_COUNT)      # g/h
+    start_weight = rng.uniform(700, 1000, POLE_COUNT)
+    estimator = RateEstimator()
+    snapshots = {}
+    for t in range(DURATION_SEC):
+        # REFILL_AT_SEC에 모든 폴대의 수액팩을 1000g짜리로 교체합니다
+        since_start = t if t < REFILL_AT_SEC else t - REFILL_AT_SEC
+        base = start_weight if t < REFILL_AT_SEC else np.full(POLE_COUNT, 1000.0)
+        weight = np.maximum(base - true_rate / 3600 * since_start, 0)
+        # 로드셀은 잡음이 섞인 0.1g 단위 값을 보고합니다
+        reading = np.round(weight + rng.normal(0, NOISE_G, POLE_COUNT), 1)
+        estimator.update_batch(loadcels, np.full(POLE_COUNT, START_TS + t), reading)
+        if t in (REFILL_AT_SEC - 1, DURATION_SEC - 1):
+            estimates = estimator.estimates()
+            snapshots[t] = ([estimates[l] for l in loadcels], true_rate, weight)
+    return snapshots
+
+def check_converged(t):
+    estimates, true_rate, weight = replay()[t]
+    flow = np.array([e["flow_rate"] for e in estimates])
+    low = np.array([e["flow_rate_low"] for e in estimates])
+    high = np.array([e["flow_rate_high"] for e in estimates])
+    remaining = np.array([e["est_remaining_sec"] for e in estimates], dtype=float)
+    true_remaining = weight / true_rate * 3600
+    assert np.median(np.abs(flow - true_rate) / true_rate) < 0.03, "속도 추정이 수렴하지 않았습니다"
+    assert np.median(np.abs(remaining - true_remaining) / true_remaining) < 0.03, "남은 시간 추정이 수렴하지 않았습니다"
+    assert np.mean((low <= true_rate) & (true_rate <= high)) > 0.85, "신뢰 구간이 너무 좁습니다"
+
+def test_converges():
+    check_converged(REFILL_AT_SEC - 1)
+
+def test_reconverges_after_bag_change():
+    check_converged(DURATION_SEC - 1)
+
+def test_first_reading_uses_default_rate():
+    # 처음 읽은 로드셀은 기존 고정 속도(250 g/h)로 시작합니다
+    estimator = RateEstimator()
+    first = estimator.update("new", 0.0, 500.0)
+    assert first["flow_rate"] == DEFAULT_RATE_G_PER_H and first["est_remaining_sec"] == 7200, first
+    assert estimator.estimate("unknown") is None
+
+def test_batch_applies_repeated_loadcel_in_order():
+    # 같은 주기에 같은 로드셀 읽기가 여러 개 있어도 순서대로 반영합니다
+    estimator = RateEstimator()
+    estimator.update("new", 0.0, 500.0)
+    estimator.update_batch(["new", "new"], [1.0, 2.0], [499.9, 499.8])
+    assert estimator.last_ts[estimator.slots["new"]] == 2.0
+
+def test_long_gap_restarts_from_default_rate():
+    estimator = RateEstimator()
+    for t in range(600):
+        estimator.update("1", float(t), 1000.0 - t * 0.1)  # 360 g/h
+    assert abs(estimator.estimate("1")["flow_rate"] - 360) < 20
+    after_gap = estimator.update("1", 600 + RESET_GAP_SEC + 1, 900.0)
+    assert after_gap["flow_rate"] == DEFAULT_RATE_G_PER_H
@@ -0,0 +1,29 @@
+"""
+접속 쿼리와 토픽 구독 테스트
+
+?topics= 처럼 빈 값을 주면 아무 로드셀도 구독하지 않고(중계기 dynamodb_to_websocket.py가 이렇게 접속합니다),
+topics를 생략하면 모든 로드셀을, 목록을 주면 그 로드셀/접두사만 받는지 확인합니다.
+"""
+
+from streamlit_websocket import parse_connect_query
+from subscriptions import ALL_TOPICS, SubscriptionIndex
+
+def recipients_of(path, loadcels=("1", "12", "W3-7")):
+    index = SubscriptionIndex()
+    _, _, topics = parse_connect_query(None, path)
+    index.subscribe("client", topics)
+    return [loadcel for loadcel in loadcels if "client" in index.recipients(loadcel)]
+
+def test_blank_topics_subscribe_to_nothing():
+    assert parse_connect_query(None, "/?topics=") == (None, None, [])
+    assert recipients_of("/?topics=") == []
+
+def test_missing_topics_subscribe_to_all():
+    assert parse_connect_query(None, "/") == (None, None, [ALL_TOPICS])
+    assert recipients_of("/?last_seq=5") == ["1", "12", "W3-7"]
+
+def test_topic_list_and_resume():
+    assert parse_connect_query(None, "/?last_seq=42&epoch=abc&topics=1,W3-*") == (42, "abc", ["1", "W3-*"])
+    assert recipients_of("/?topics=1,W3-*") == ["1", "W3-7"]
+    # 빈 last_seq / epoch는 지정하지 않은 것과 같습니다
+    assert parse_connect_query(None, "/?last_seq=&epoch=") == (None, None, [ALL_TOPICS])
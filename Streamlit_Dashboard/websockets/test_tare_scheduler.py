@@ -0,0 +1,124 @@
+"""TareScheduler 영점 절차(tare_required -> pending -> captured / expired)와 TimerWheel을 가상의 시계로 진행합니다."""
+
+from tare_scheduler import (TARE_CAPTURE_TIMEOUT_SECONDS, TARE_CAPTURED, TARE_EXPIRED, TARE_HANG_SECONDS, TARE_PENDING,
+                            TARE_REQUIRED, TARE_REQUIRED_SECONDS, TARE_RETRY_SECONDS, TareScheduler, TimerWheel)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+class FakeWriter:
+    def __init__(self):
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+
+class Harness:
+    """가상의 시계와 작성기로 만든 스케줄러. readings[loadcel]을 바꿔 무게를 흉내 냅니다."""
+
+    def __init__(self, readings):
+        self.clock = FakeClock()
+        self.wheel = TimerWheel(tick=0.5, slots=64, clock=self.clock)
+        self.tare_writer, self.polestat_writer = FakeWriter(), FakeWriter()
+        self.readings = readings
+        self.published = []
+        self.scheduler = TareScheduler(self.wheel, self.tare_writer, self.polestat_writer, readings.get,
+                                       self.published.append, clock=self.clock)
+
+    def elapse(self, seconds):
+        self.clock.now += seconds
+        self.wheel.advance()
+
+    def states(self, loadcel):
+        return [event["state"] for event in self.published if event["loadcel"] == loadcel]
+
+def test_request_and_release():
+    harness = Harness({"1": {"current_weight": "120", "timestamp": "t0", "battery": "80"}})
+    tare = harness.scheduler.request("1")
+    assert tare["state"] == TARE_REQUIRED and tare["tare_offset"] == 120 and tare["tare_timestamp"] == "t0"
+    assert [item["tare_required"]["BOOL"] for item in harness.tare_writer.items] == [True]
+    assert len(harness.wheel) == 2
+    # 최신 읽기가 없는 폴대는 요청할 수 없습니다
+    assert harness.scheduler.request("unknown") is None
+
+    harness.elapse(TARE_REQUIRED_SECONDS)
+    assert harness.scheduler.tares["1"]["state"] == TARE_PENDING
+    assert [item["tare_required"]["BOOL"] for item in harness.tare_writer.items] == [True, False]
+    # pole_stat에는 tare_requested=False와 알고 있는 배터리 값을 기록합니다
+    polestat, = harness.polestat_writer.items
+    assert polestat["tare_requested"] == {"BOOL": False} and polestat["battery_level"] == {"N": "80.0"}
+
+def test_pending_to_captured():
+    harness = Harness({"1": {"current_weight": "120", "timestamp": "t0"}})
+    harness.scheduler.request("1")
+    harness.elapse(TARE_REQUIRED_SECONDS)
+    harness.readings["1"] = {"current_weight": "620.04", "timestamp": "t1"}
+    harness.elapse(TARE_HANG_SECONDS - TARE_REQUIRED_SECONDS)
+    tare = harness.scheduler.tares["1"]
+    assert tare["state"] == TARE_CAPTURED and tare["full_weight"] == 500.0
+    assert harness.states("1") == [TARE_REQUIRED, TARE_PENDING, TARE_CAPTURED]
+    assert len(harness.wheel) == 0 and not harness.scheduler.timers
+
+def test_capture_retries_until_bag_is_hung():
+    harness = Harness({"1": {"current_weight": "120", "timestamp": "t0"}})
+    harness.scheduler.request("1")
+    harness.elapse(TARE_HANG_SECONDS)
+    # 아직 수액팩이 걸리지 않았으면 대기 상태로 남아 TARE_RETRY_SECONDS마다 다시 확인합니다
+    assert harness.scheduler.tares["1"]["state"] == TARE_PENDING and len(harness.wheel) == 1
+    harness.elapse(TARE_RETRY_SECONDS)
+    assert harness.scheduler.tares["1"]["state"] == TARE_PENDING
+    harness.readings["1"] = {"current_weight": "370", "timestamp": "t1"}
+    harness.elapse(TARE_RETRY_SECONDS)
+    assert harness.scheduler.tares["1"]["state"] == TARE_CAPTURED and harness.scheduler.tares["1"]["full_weight"] == 250
+    assert harness.states("1") == [TARE_REQUIRED, TARE_PENDING, TARE_CAPTURED]
+
+def test_pending_to_expired():
+    harness = Harness({"1": {"current_weight": "120", "timestamp": "t0"}})
+    harness.scheduler.request("1")
+    harness.elapse(TARE_CAPTURE_TIMEOUT_SECONDS - 1)
+    assert harness.scheduler.tares["1"]["state"] == TARE_PENDING
+    harness.elapse(TARE_RETRY_SECONDS + 1)
+    assert harness.scheduler.tares["1"]["state"] == TARE_EXPIRED
+    assert harness.states("1") == [TARE_REQUIRED, TARE_PENDING, TARE_EXPIRED]
+    # 만료된 절차는 타이머를 남기지 않고, 나중에 수액팩을 걸어도 기록하지 않습니다
+    assert len(harness.wheel) == 0 and not harness.scheduler.timers
+    harness.readings["1"] = {"current_weight": "620", "timestamp": "t1"}
+    harness.elapse(TARE_HANG_SECONDS)
+    assert harness.scheduler.tares["1"]["state"] == TARE_EXPIRED
+    assert harness.scheduler.stats == {"requested": 1, "captured": 0, "expired": 1}
+
+def test_rerequest_restarts_procedure():
+    harness = Harness({"1": {"current_weight": "120", "timestamp": "t0"}})
+    harness.scheduler.request("1")
+    harness.elapse(TARE_REQUIRED_SECONDS)
+    harness.readings["1"] = {"current_weight": "130", "timestamp": "t1"}
+    tare = harness.scheduler.request("1")
+    # 이전 타이머는 취소되고 새 영점으로 처음부터 다시 시작합니다
+    assert tare["state"] == TARE_REQUIRED and tare["tare_offset"] == 130
+    assert len(harness.wheel) == 2
+    harness.readings["1"] = {"current_weight": "630", "timestamp": "t2"}
+    # 첫 요청의 기록 타이머가 울렸을 시각에도 아직 기록하지 않습니다
+    harness.elapse(TARE_HANG_SECONDS - TARE_REQUIRED_SECONDS)
+    assert harness.scheduler.tares["1"]["state"] != TARE_CAPTURED
+    harness.elapse(TARE_REQUIRED_SECONDS)
+    assert harness.scheduler.tares["1"]["full_weight"] == 500
+    assert harness.states("1") == [TARE_REQUIRED, TARE_PENDING, TARE_REQUIRED, TARE_PENDING, TARE_CAPTURED]
+
+def test_timer_wheel_long_timer_and_cancel():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=0.5, slots=64, clock=clock)
+    fired = []
+    # 휠 한 바퀴(32초)보다 긴 타이머는 여러 바퀴 뒤에 실행됩니다
+    long_timer = wheel.schedule(100, fired.append, "long")
+    cancelled = wheel.schedule(1, fired.append, "cancelled")
+    assert wheel.cancel(cancelled) and not wheel.cancel(cancelled)
+    clock.now += 99
+    wheel.advance()
+    assert fired == []
+    clock.now += 1
+    assert wheel.advance() == 1
+    assert fired == ["long"] and long_timer not in wheel.timers and len(wheel) == 0
@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+import time
+import streamlit as st
+import websocket
+from loadcell_store import LoadcellStore
+
+WS_URL = os.environ.get("WS_URL", "ws://localhost:6789")
+# 이 대시보드가 받을 로드셀 ID / 병동 접두사 (예: "1,2,W3-*", 비우면 전체)
+WS_SUBSCRIBE_TOPICS = os.environ.get("WS_SUBSCRIBE_TOPICS", "")
+# 연결이 끊겼을 때 재접속까지 대기 시간 (초)
+WS_RECONNECT_DELAY = 2
+
+class LoadcellIngestService:
+    """WebSocket 서버에 한 번만 접속하여 받은 데이터를 모든 세션과 공유하는 수신 서비스"""
+
+    def __init__(self, url=WS_URL, topics=WS_SUBSCRIBE_TOPICS):
+        self.url = url
+        self.topics = topics
+        self.store = LoadcellStore()
+        # 재접속 시 서버에 알려 줄 마지막 수신 위치 (서버 epoch, 시퀀스 번호)
+        self.epoch = None
+        self.last_seq = 0
+        self.thread = None
+        self.ws = None
+
+    def _on_message(self, ws, message):
+        # 서버는 한 주기의 변경분을 JSON 배열 하나로 묶어 보냅니다
+        try:
+            frame = json.loads(message)
+        except Exception as e:
+            print(f"메시지 파싱 오류: {message} | 오류: {e}")
+            return
+        items = []
+        alerts = []
+        for data in (frame if isinstance(frame, list) else [frame]):
+            # 객체가 아닌 항목(숫자, 문자열, null 등)은 건너뛰고 나머지 항목은 그대로 처리합니다
+            if not isinstance(data, dict):
+                print(f"[WebSocket] 객체가 아닌 항목을 건너뜁니다: {data!r}")
+                continue
+            message_type = data.get("type")
+            if message_type == "hello":
+                # 서버가 재시작되었으면 시퀀스 번호를 처음부터 다시 셉니다
+                if data.get("epoch") != self.epoch:
+                    self.epoch = data.get("epoch")
+                    self.last_seq = 0
+                continue
+            if message_type == "alert":
+                alerts.append(data)
+                continue
+            if message_type == "alert_snapshot":
+                self.store.replace_active_alerts(data.get("alerts", []))
+                continue
+            if message_type == "alert_thresholds":
+                self.store.set_alert_thresholds(data.get("thresholds", {}))
+                continue
+            if message_type == "tare":
+                # 영점 상태는 드물게 바뀌므로 스냅샷과의 순서가 섞이지 않도록 받는 즉시 반영합니다
+                self.store.update_tares([data])
+                continue
+            if message_type == "tare_snapshot":
+                self.store.update_tares(data.get("tares", []), replace=True)
+                continue
+            self.last_seq = max(self.last_seq, data.get("seq", 0))
+            items.append(data)
+        if items:
+            self.store.ingest(items)
+        if alerts:
+            self.store.ingest_alerts(alerts)
+
+    def _on_error(self, ws, error):
+        print(f"[WebSocket] 오류 발생: {error}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        print(f"[WebSocket] 연결 종료됨: {close_status_code} {close_msg}")
+
+    def _on_open(self, ws):
+        print("[WebSocket] 연결 성공")
+
+    def _connect_url(self):
+        # 재접속이면 마지막 시퀀스 번호를 보내 빠진 변경분만 받습니다 (처음 접속하면 전체 스냅샷)
+        params = []
+        if self.topics:
+            params.append(f"topics={self.topics}")
+        if self.epoch is not None:
+            params.append(f"epoch={self.epoch}&last_seq={self.last_seq}")
+        return f"{self.url}/?{'&'.join(params)}" if params else self.url
+
+    def _run(self):
+        while True:
+            ws = websocket.WebSocketApp(self._connect_url(),
+                                      on_message=self._on_message,
+                                      on_error=self._on_error,
+                                      on_close=self._on_close,
+                                      on_open=self._on_open)
+            self.ws = ws
+            ws.run_forever()
+            time.sleep(WS_RECONNECT_DELAY)
+
+    def send_control(self, message):
+        """서버에 제어 메시지(dict)를 보냅니다. 연결되어 있지 않으면 False를 반환합니다."""
+        ws = self.ws
+        if ws is None or ws.sock is None or not ws.sock.connected:
+            return False
+        try:
+            ws.send(json.dumps(message))
+            return True
+        except Exception as e:
+            print(f"[WebSocket] 제어 메시지 전송 실패: {e}")
+            return False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True, name="ws-ingest")
+        self.thread.start()
+        print("[Main] WebSocket 수신 서비스 시작됨")
+
+@st.cache_resource
+def get_ingest_service():
+    """서버 프로세스당 하나의 수신 서비스를 만들어 모든 세션이 공유합니다."""
+    service = LoadcellIngestService()
+    service.start()
+    return service